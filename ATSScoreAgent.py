@@ -1,98 +1,90 @@
 import json
-import google.generativeai as genai
-from config import embedding_model
+from ats_scoring import LocalATSScorer
+from config import ATS_OFFLINE_SCORING, PROMPT_TOKEN_BUDGET, embedding_model, llm_client
+from prompt_budget import PromptBuilder, changed_lines, compact_json
 
 class ATSScoreAgent:
-    def calculate_ats_score(self, resume_json, job_description):
-        """Calculates ATS compatibility score (1-10) and suggests improvements."""
-        prompt = f"""
-        You are an ATS scoring expert.
-        Compare the **resume** and **job description**.
-        Identify **missing skills**, **keyword matches**, and **alignment score**.
-        Provide **suggestions** to improve the resume.
+    def __init__(self, offline=ATS_OFFLINE_SCORING, scorer=None):
+        self.offline = offline
+        self.scorer = scorer or LocalATSScorer(embedding_model)
 
-        Resume (JSON format):
-        {json.dumps(resume_json, indent=2)}
+    def calculate_ats_score(self, resume_json, job_description, job_embedding=None, section_embeddings=None):
+        """Calculates ATS compatibility score (1-10) and suggests improvements.
 
-        Job Description:
-        {job_description}
-
-        Return structured JSON:
-        {{
-            "ats_score": number (1-10),
-            "missing_skills": [list of strings],
-            "keyword_matches": [list of strings],
-            "improvement_suggestions": [list of strings],
-            "section_scores": {{
-                "skills": number (1-10),
-                "experience": number (1-10),
-                "education": number (1-10),
-                "overall_format": number (1-10)
-            }},
-            "detailed_analysis": "string describing why the resume received this score",
-            "keyword_density": {{
-                "resume_keyword_count": number,
-                "job_description_keyword_count": number,
-                "match_percentage": number
-            }}
-        }}
+        Scores, keyword matches, missing skills and keyword density are computed locally
+        and are reproducible; Gemini only writes the suggestions and the analysis, and is
+        skipped entirely in offline mode. Precomputed embeddings are passed on to
+        LocalATSScorer.score.
         """
+        result = self.scorer.score(resume_json, job_description, job_embedding=job_embedding,
+                                   section_embeddings=section_embeddings)
+        if self.offline:
+            result["improvement_suggestions"] = self.scorer.suggestions(result)
+            result["detailed_analysis"] = self.scorer.analysis(result)
+            return result
+
+        # The job description is cut to the sentences closest to the measured keywords
+        keywords = ", ".join(result["missing_skills"] + result["keyword_matches"][:30])
+        prompt = (PromptBuilder("ats_narrative", PROMPT_TOKEN_BUDGET, embedding_model)
+                  .add(f"""
+                  You are an ATS scoring expert.
+                  A resume was scored against a job description. The measured results are:
+                  - ATS score: {result["ats_score"]}/10
+                  - Section scores: {compact_json(result["section_scores"])}
+                  - Keyword matches: {", ".join(result["keyword_matches"][:30])}
+                  - Missing skills: {", ".join(result["missing_skills"])}
+                  """)
+                  .section("Resume (JSON format)", compact_json(resume_json))
+                  .section("Job Description", job_description, query=keywords or job_description)
+                  .add("""
+                  Do not re-score the resume. Return structured JSON:
+                  {
+                      "improvement_suggestions": [list of strings],
+                      "detailed_analysis": "string describing why the resume received this score"
+                  }
+                  """)
+                  .build())
         try:
-            model = genai.GenerativeModel("gemini-1.5-flash")
-            response = model.generate_content([prompt])
-            return json.loads(response.text.replace("```json", "").replace("```", "").strip())
+            response_text = llm_client.generate(prompt)
+            narrative = json.loads(response_text.replace("```json", "").replace("```", "").strip())
+            result["improvement_suggestions"] = list(narrative.get("improvement_suggestions", []))
+            result["detailed_analysis"] = str(narrative.get("detailed_analysis", ""))
         except Exception as e:
-            return {
-                "ats_score": 5,
-                "missing_skills": ["Error extracting skills"],
-                "keyword_matches": [],
-                "improvement_suggestions": ["Please try again"],
-                "section_scores": {
-                    "skills": 5,
-                    "experience": 5,
-                    "education": 5,
-                    "overall_format": 5
-                },
-                "detailed_analysis": f"Error analyzing resume: {str(e)}",
-                "keyword_density": {
-                    "resume_keyword_count": 0,
-                    "job_description_keyword_count": 0,
-                    "match_percentage": 0
-                },
-                "error": str(e)
-            }
+            result["improvement_suggestions"] = self.scorer.suggestions(result)
+            result["detailed_analysis"] = self.scorer.analysis(result)
+            result["error"] = str(e)
+        return result
     
     def compare_before_after(self, original_resume, optimized_resume, job_description):
         """Compares original and optimized resumes to show improvements"""
-        prompt = f"""
-        You are an ATS scoring expert.
-        Compare the **original resume**, **optimized resume** and **job description**.
-        Identify how the optimization improved the resume's ATS score.
-
-        Original Resume:
-        {original_resume}
-
-        Optimized Resume:
-        {optimized_resume}
-
-        Job Description:
-        {job_description}
-
-        Return structured JSON:
-        {{
-            "original_score": number (1-10),
-            "optimized_score": number (1-10),
-            "score_improvement": number,
-            "key_improvements": [list of strings],
-            "added_keywords": [list of strings],
-            "reformatted_sections": [list of strings],
-            "before_after_analysis": "string analyzing the key differences"
-        }}
-        """
+        # Lines both versions share are sent once, in the optimized resume
+        prompt = (PromptBuilder("ats_comparison", PROMPT_TOKEN_BUDGET, embedding_model)
+                  .add("""
+                  You are an ATS scoring expert.
+                  Compare the **original resume**, **optimized resume** and **job description**.
+                  Identify how the optimization improved the resume's ATS score.
+                  The original resume is the optimized resume with the "+" lines of the changes
+                  removed and the "-" lines restored.
+                  """)
+                  .section("Optimized Resume", optimized_resume)
+                  .section("Changes from the Original Resume", changed_lines(original_resume, optimized_resume))
+                  .section("Job Description", job_description, query=optimized_resume)
+                  .add("""
+                  Return structured JSON:
+                  {
+                      "original_score": number (1-10),
+                      "optimized_score": number (1-10),
+                      "score_improvement": number,
+                      "key_improvements": [list of strings],
+                      "added_keywords": [list of strings],
+                      "reformatted_sections": [list of strings],
+                      "before_after_analysis": "string analyzing the key differences"
+                  }
+                  """)
+                  .build())
         try:
-            model = genai.GenerativeModel("gemini-1.5-flash")
-            response = model.generate_content([prompt])
-            return json.loads(response.text.replace("```json", "").replace("```", "").strip())
+            response_text = llm_client.generate(prompt)
+            return json.loads(response_text.replace("```json", "").replace("```", "").strip())
         except Exception as e:
             return {
                 "original_score": 5,
@@ -1,20 +1,27 @@
-import io
 import json
-import PyPDF2
-import docx
-import google.generativeai as genai
 import re
 import numpy as np
-from sklearn.feature_extraction.text import CountVectorizer
-from config import embedding_model
+from ats_scoring import flatten_skills
+from config import RESUME_PARSE_MODE, embedding_model, llm_client
+from extraction import extract_text
+
+PARSE_MODES = ("single", "two_call")
 
 class ResumeParserAgent:
-    def __init__(self):
-        self.keyword_extractor = CountVectorizer(stop_words='english', max_features=100)
+    def __init__(self, parse_mode=RESUME_PARSE_MODE):
+        if parse_mode not in PARSE_MODES:
+            raise ValueError(f"Unknown parse mode {parse_mode!r}, expected one of {PARSE_MODES}")
+        self.parse_mode = parse_mode
 
     def parse_resume(self, file_bytes, filename):
         """Extracts text, skills, and structured JSON from a resume file."""
         resume_text = self._extract_text(file_bytes, filename)
+        if self.parse_mode == "single":
+            resume_json = self._parse_structured(resume_text)
+            if resume_json is not None:
+                return resume_text, self._skills_from_json(resume_json), resume_json
+
+        # Two-call path, also the fallback when the single structured call fails
         skills = self._extract_skills(resume_text)
         resume_json = self._convert_to_json(resume_text)
 
@@ -22,27 +29,34 @@ class ResumeParserAgent:
 
     def _extract_text(self, file_bytes, filename):
         """Extracts text from PDFs, DOCX, or TXT files."""
-        text = ""
+        return extract_text(file_bytes, filename)
+
+    def _parse_structured(self, resume_text):
+        """Gets structured JSON, including a flat skills list, from a single Gemini call."""
+        prompt = (
+            "Convert this resume into structured JSON with the keys \"summary\" (string), "
+            "\"skills\" (list of individual skill names), \"experience\" (list) and "
+            "\"education\" (list). Return only the JSON.\n\n" + resume_text[:5000]
+        )
         try:
-            if filename.endswith(".pdf"):
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-                text = "\n".join([page.extract_text() for page in pdf_reader.pages if page.extract_text()])
-            elif filename.endswith(".docx"):
-                doc = docx.Document(io.BytesIO(file_bytes))
-                text = "\n".join([para.text for para in doc.paragraphs])
-            elif filename.endswith(".txt"):
-                text = file_bytes.decode("utf-8")
-            return text
-        except Exception as e:
-            return f"Error extracting text: {e}"
+            response_text = llm_client.generate(prompt, response_mime_type="application/json")
+            resume_json = json.loads(response_text.strip().strip("```json").strip("```"))
+        except Exception:
+            return None
+        if not isinstance(resume_json, dict) or not self._skills_from_json(resume_json):
+            return None
+        return resume_json
+
+    def _skills_from_json(self, resume_json):
+        """Flattens the skills section, whether it is a list, a dict of categories or named objects."""
+        return flatten_skills(resume_json.get("skills", []))
 
     def _extract_skills(self, resume_text):
         """Extracts skills using Google Gemini AI."""
         prompt = f"Extract a list of skills from the following resume:\n\n{resume_text[:5000]}"
         try:
-            model = genai.GenerativeModel("gemini-1.5-flash")
-            response = model.generate_content([prompt])
-            skills = re.split(r',|\n', response.text.strip())
+            response_text = llm_client.generate(prompt)
+            skills = re.split(r',|\n', response_text.strip())
             return [skill.strip() for skill in skills if skill.strip()]
         except Exception:
             return []
@@ -51,8 +65,7 @@ class ResumeParserAgent:
         """Converts resume text into structured JSON format."""
         prompt = f"Convert this resume into structured JSON:\n\n{resume_text[:5000]}"
         try:
-            model = genai.GenerativeModel("gemini-1.5-flash")
-            response = model.generate_content([prompt])
-            return json.loads(response.text.strip("```json").strip("```"))
+            response_text = llm_client.generate(prompt)
+            return json.loads(response_text.strip("```json").strip("```"))
         except Exception:
             return {"summary": resume_text[:200], "skills": [], "experience": [], "education": []}
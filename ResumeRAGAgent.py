@@ -1,151 +1,417 @@
 import json
-import faiss
+import os
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import google.generativeai as genai
-from config import GOOGLE_API_KEY, embedding_model
+from chunking import chunk_document
+from config import (GOOGLE_API_KEY, EMBEDDING_DIM, INDEX_CONFIG, PROMPT_TOKEN_BUDGET, RAG_NEAR_DUPLICATE_COSINE,
+                    embedding_model, llm_client)
+from index_factory import logistic_relevance
+from lexical_index import LexicalIndex, LexicalOverlay, reciprocal_rank_fusion
+from metadata_filter import DEFAULT_FILTER_FIELDS
+from persistence import atomic_directory, resolve_directory
+from prompt_budget import PromptBuilder, changed_lines
+from vector_store import VectorStore, VectorStoreOverlay
+
+CHUNKS_DIR = "chunks"
+PARENTS_FILE = "parents.npy"
+CHUNK_FILTER_FIELDS = DEFAULT_FILTER_FIELDS + ("section",)
+CHUNK_FANOUT = 8  # Passages fetched per requested document before pooling
+POOLING_MODES = ("max", "sum")
+RETRIEVAL_MODES = ("hybrid", "dense", "lexical")
+
+
+def _chunk_store(**kwargs):
+    # The same passage may belong to several documents, so passages are never deduplicated
+    return VectorStore(embedding_model, EMBEDDING_DIM, INDEX_CONFIG, filter_fields=CHUNK_FILTER_FIELDS,
+                       deduplicate=False, **kwargs)
+
+
+class ParentColumn:
+    """The id of the document each passage belongs to, as a dense int64 column indexed by
+    passage id.
+
+    Passage ids are never reused, so the column is only ever appended to; a removed
+    passage keeps its entry. A column made with ``base`` continues that column's ids
+    without copying or changing it, for the passages of an overlay.
+    """
+
+    def __init__(self, parents=None, base=None):
+        self.base = base
+        self.offset = len(base) if base is not None else 0
+        self._parents = parents if parents is not None else np.empty(0, dtype=np.int64)
+        self._count = len(self._parents)
+
+    def __len__(self):
+        return self.offset + self._count
+
+    def __getitem__(self, chunk_id):
+        if chunk_id < self.offset:
+            return self.base[chunk_id]
+        return int(self._parents[chunk_id - self.offset])
+
+    def extend(self, parents):
+        count = self._count + len(parents)
+        if count > len(self._parents):
+            grown = np.empty(max(count, 2 * len(self._parents), 1024), dtype=np.int64)
+            grown[:self._count] = self._parents[:self._count]
+            self._parents = grown
+        self._parents[self._count:count] = parents
+        self._count = count
+
+    def children(self, doc_id):
+        """Sorted int64 ids of every passage ever added for ``doc_id``, removed ones included."""
+        ids = np.flatnonzero(self._parents[:self._count] == doc_id) + self.offset
+        return ids if self.base is None else np.concatenate([self.base.children(doc_id), ids])
+
+    def save(self, directory):
+        np.save(os.path.join(directory, PARENTS_FILE), self._parents[:self._count])
+
+    @classmethod
+    def load(cls, directory, mmap=False):
+        return cls(np.load(os.path.join(directory, PARENTS_FILE), mmap_mode="r" if mmap else None))
+
 
 class ResumeRAGAgent:
-    def __init__(self):
-        self.dimension = 384  # Size of embeddings from all-MiniLM-L6-v2
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.document_store = []  # Stores text and metadata
+    def __init__(self, store=None, chunks=None, lexical=None, parents=None):
+        self.dimension = EMBEDDING_DIM  # Size of embeddings from all-MiniLM-L6-v2
+        self.store = store if store is not None else VectorStore(embedding_model, self.dimension, INDEX_CONFIG,
+                                                                 near_duplicate_cosine=RAG_NEAR_DUPLICATE_COSINE)
+        # Section-aware passages of each document, each linked to it by self.parents
+        self.chunks = chunks if chunks is not None else _chunk_store()
+        self.parents = parents if parents is not None else ParentColumn()
+        # BM25 over the same passages, ids aligned with the rows of self.chunks
+        self.lexical = lexical if lexical is not None else LexicalIndex()
+        if len(self.lexical) < len(self.chunks):
+            missing = range(len(self.lexical), len(self.chunks))
+            self.lexical.add_many(self.chunks.documents[i]["text"] for i in missing)
+            self.lexical.remove(i for i in missing if i not in self.chunks)
+        self._lock = threading.RLock()  # Serializes updates that touch the store, chunks and lexical index
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """Open a corpus previously written with save() instead of re-embedding it.
+
+        Corpora saved before passages were indexed get them built on load, unless the
+        store is memory-mapped read-only; retrieval then ranks whole documents.
+        """
+        store = VectorStore.load(path, embedding_model, mmap=mmap, index_config=INDEX_CONFIG,
+                                 near_duplicate_cosine=RAG_NEAR_DUPLICATE_COSINE)
+        chunks_path = os.path.join(resolve_directory(path), CHUNKS_DIR)
+        if os.path.isdir(chunks_path):
+            chunks = VectorStore.load(chunks_path, embedding_model, mmap=mmap, index_config=INDEX_CONFIG,
+                                      filter_fields=CHUNK_FILTER_FIELDS, deduplicate=False)
+            lexical = LexicalIndex.load(chunks_path) if LexicalIndex.exists(chunks_path) else None
+            parents = ParentColumn.load(chunks_path, mmap=mmap)
+            if len(parents) != len(chunks):
+                raise ValueError(f"Passages and their parent ids in {chunks_path} do not match")
+            return cls(store, chunks, lexical, parents)
+        agent = cls(store)
+        if not mmap:
+            agent._add_chunks((doc_id, doc["text"], doc["metadata"])
+                              for doc_id, doc in enumerate(store.documents) if doc_id in store)
+        return agent
+
+    def overlay(self):
+        """A writable view of this corpus for one user session, e.g. of one loaded with ``mmap=True``.
+
+        Nothing is copied and this agent is never written: the session's additions,
+        removals and replacements are kept in small indexes of the view's own (see
+        VectorStoreOverlay and LexicalOverlay), and its searches merge both. This agent
+        must not be changed while views of it are in use.
+        """
+        with self._lock:
+            return type(self)(VectorStoreOverlay(self.store), VectorStoreOverlay(self.chunks),
+                              LexicalOverlay(self.lexical), ParentColumn(base=self.parents))
+
+    def save(self, path):
+        """Persist the FAISS indexes and document stores to the directory at path."""
+        with atomic_directory(path) as tmp_path:
+            self.store.write_to(tmp_path)
+            os.makedirs(os.path.join(tmp_path, CHUNKS_DIR))
+            self.chunks.write_to(os.path.join(tmp_path, CHUNKS_DIR))
+            self.lexical.save(os.path.join(tmp_path, CHUNKS_DIR))
+            self.parents.save(os.path.join(tmp_path, CHUNKS_DIR))
+
+    @property
+    def has_passages(self):
+        """Whether every document's passages are indexed."""
+        return len(self.chunks) > 0 or len(self.store) == 0
+
+    @property
+    def index(self):
+        return self.store.index
+
+    @property
+    def document_store(self):
+        """Stores text and metadata, in index order."""
+        return self.store.documents
         
     def add_to_index(self, text, metadata=None):
         """Add a document to the vector index with optional metadata."""
         if not text:
             return
             
-        embedding = embedding_model.encode(text).astype('float32').reshape(1, -1)
-        self.index.add(embedding)
-        self.document_store.append({
-            "text": text,
-            "metadata": metadata or {}
-        })
-        return len(self.document_store) - 1  # Return index of added document
-        
-    def retrieve_similar(self, query_text, top_k=3):
-        """Retrieve top-k most similar documents to the query."""
-        if self.index.ntotal == 0:
-            return []
-            
-        query_embedding = embedding_model.encode(query_text).astype('float32').reshape(1, -1)
-        distances, indices = self.index.search(query_embedding, min(top_k, self.index.ntotal))
+        return self.add_many([text], [metadata])[0]  # Return index of added document
+
+    def add_many(self, texts, metadatas=None, batch_size=None):
+        """Add many documents with batched encoding and a single FAISS add.
+
+        Each new document is also split into section passages (see chunking) that are
+        indexed separately. Returns the index of each added document (None for empty texts).
+        """
+        texts = list(texts)
+        metadatas = list(metadatas) if metadatas is not None else [None] * len(texts)
+        with self._lock:
+            first_new = len(self.store)
+            ids = self.store.add_many(texts, metadatas, batch_size=batch_size)
+            added = {}
+            for i, doc_id in enumerate(ids):
+                if doc_id is not None and doc_id >= first_new:  # Duplicates already have passages
+                    added.setdefault(doc_id, (doc_id, texts[i], metadatas[i]))
+            self._add_chunks(added.values(), batch_size)
+            return ids
+
+    def remove(self, doc_id):
+        """Remove a document and its passages, e.g. a withdrawn candidate.
+
+        Returns False if there is no such document. Ids of other documents do not change.
+        """
+        with self._lock:
+            if not self.store.remove(doc_id):
+                return False
+            self._remove_chunks(doc_id)
+            return True
+
+    def upsert(self, doc_id, text, metadata=None):
+        """Replace a document's text and metadata under the same id and re-index its passages."""
+        if not text:
+            raise ValueError("upsert needs a non-empty text; use remove to delete a document")
+        if not 0 <= doc_id < len(self.store):
+            raise KeyError(doc_id)
+        with self._lock:
+            # Old passages go first: a query running meanwhile can miss the document, but
+            # never pairs passages of one version with the text of another
+            self._remove_chunks(doc_id)
+            self.store.upsert(doc_id, text, metadata)
+            self._add_chunks([(doc_id, text, metadata)])
+            return doc_id
+
+    def _remove_chunks(self, doc_id):
+        chunk_ids = [chunk_id for chunk_id in self.parents.children(doc_id).tolist() if chunk_id in self.chunks]
+        for chunk_id in chunk_ids:
+            self.chunks.remove(chunk_id)
+        self.lexical.remove(chunk_ids)
+
+    def _add_chunks(self, documents, batch_size=None):
+        texts, metadatas, parents = [], [], []
+        for doc_id, text, metadata in documents:
+            inherited = {field: value for field, value in (metadata or {}).items() if field in DEFAULT_FILTER_FIELDS}
+            for section, passage in chunk_document(text):
+                texts.append(passage)
+                metadatas.append({**inherited, "section": section})
+                parents.append(doc_id)
+        if texts:
+            self.chunks.add_many(texts, metadatas, batch_size=batch_size)
+            self.parents.extend(parents)
+            self.lexical.add_many(texts)
         
+    def duplicate_stats(self):
+        """How many adds were skipped as exact duplicates or merged as near-duplicates."""
+        return self.store.dedup.stats()
+
+    def retrieve_similar(self, query_text, top_k=3, where=None, pooling="max", passages=2, mode="hybrid",
+                         min_score=None):
+        """Retrieve top-k most similar documents to the query.
+
+        where filters on metadata during the search, e.g. {"type": "resume"}.
+        ``mode`` picks how passages are ranked: "dense" by embedding similarity, "lexical"
+        by BM25, which catches literal terms such as "PySpark" or "SOC 2", or "hybrid",
+        which fuses the two rankings with reciprocal-rank fusion.
+        Documents are ranked by their best-matching passages: ``pooling="max"`` uses the
+        single best passage, ``"sum"`` adds up the ranking values of all retrieved passages
+        and so favours documents that match in several sections (the pooled value is
+        returned as ``"rank_score"``). Each result carries up to ``passages`` of those
+        passages, best first.
+
+        In every mode ``"score"`` is the cosine similarity of the document's best passage
+        to the query and ``"relevance"`` that squashed into (0, 1) (see
+        index_factory.logistic_relevance). Documents scoring below ``min_score`` are
+        left out.
+        """
+        if pooling not in POOLING_MODES:
+            raise ValueError(f"Unknown pooling {pooling!r}, expected one of {POOLING_MODES}")
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {mode!r}, expected one of {RETRIEVAL_MODES}")
+        if not self.has_passages:
+            return [{"text": doc["text"], "metadata": doc["metadata"], "score": score,
+                     "relevance": float(logistic_relevance(score)), "passages": []}
+                    for doc, score in self.store.search(query_text, top_k, where=where, min_score=min_score)]
+
+        candidates = top_k * CHUNK_FANOUT
+        query_embedding = self.chunks.embed_query(query_text)
+        dense = self.chunks.search_ids(query_embedding, candidates, where=where) if mode != "lexical" else []
+        if mode != "dense":
+            allowed = self.chunks.match(where) if where else None
+            lexical_ids, lexical_scores = self.lexical.search(query_text, candidates, allowed)
+        if mode == "dense":
+            ranking = dict(dense)
+        elif mode == "lexical":
+            ranking = dict(zip(lexical_ids.tolist(), lexical_scores.tolist()))
+        else:
+            ranking = reciprocal_rank_fusion([[i for i, _ in dense], lexical_ids.tolist()])
+
+        # Passages and documents are read before checking they still exist, so one removed
+        # or replaced by a concurrent update is either skipped or seen as it was before;
+        # one added meanwhile is skipped until its parent id is recorded
+        hits_by_chunk = {}
+        for chunk_id in sorted(ranking, key=ranking.get, reverse=True):
+            chunk = self.chunks.documents[chunk_id].load()
+            if chunk_id in self.chunks and chunk_id < len(self.parents):
+                hits_by_chunk[chunk_id] = (ranking[chunk_id], chunk_id, chunk)
+
+        # Cosines of passages only BM25 found too, so that scores mean the same in every mode
+        chunk_ids = list(hits_by_chunk)
+        similarities = self.chunks.similarities(query_embedding, chunk_ids)
+        cosines = {chunk_id: cosine for chunk_id, cosine in zip(chunk_ids, similarities.tolist())
+                   if not np.isnan(cosine)}
+        by_parent, documents = {}, {}
+        for chunk_id, hit in hits_by_chunk.items():
+            parent = self.parents[chunk_id]
+            if chunk_id in cosines and parent not in documents:
+                documents[parent] = self.store.documents[parent].load()
+            if chunk_id in cosines and parent in self.store:
+                by_parent.setdefault(parent, []).append(hit)
+
+        def pooled(hits):
+            return hits[0][0] if pooling == "max" else sum(value for value, _, _ in hits)
+
+        def score(hits):
+            return max(cosines[chunk_id] for _, chunk_id, _ in hits)
+
+        ranked = [(parent, hits) for parent, hits in by_parent.items() if min_score is None or score(hits) >= min_score]
+        ranked = sorted(ranked, key=lambda item: pooled(item[1]), reverse=True)[:top_k]
         results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.document_store):
-                results.append({
-                    "text": self.document_store[idx]["text"],
-                    "metadata": self.document_store[idx]["metadata"],
-                    "score": float(distances[0][i])
-                })
+        for parent, hits in ranked:
+            doc = documents[parent]
+            results.append({
+                "text": doc["text"],
+                "metadata": doc["metadata"],
+                "score": score(hits),
+                "relevance": float(logistic_relevance(score(hits))),
+                "rank_score": pooled(hits),
+                "passages": [{"section": chunk["metadata"]["section"], "text": chunk["text"],
+                              "score": cosines[chunk_id]} for _, chunk_id, chunk in hits[:passages]],
+            })
                 
         return results
     
     def enhance_resume(self, resume_text, job_description):
         """Enhance a resume using RAG with job description and similar documents."""
-        # First, try to find similar successful resumes (if available)
-        similar_resumes = self.retrieve_similar(job_description, top_k=2)
-        
-        # Prepare context with similar resumes as examples
-        context = ""
-        if similar_resumes:
-            context = "Here are examples of successful resumes for similar roles:\n\n"
-            for i, resume in enumerate(similar_resumes):
-                context += f"Example {i+1}:\n{resume['text'][:500]}...\n\n"
-        
-        # Use Gemini to enhance the resume
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        prompt = f"""
-        You are an expert resume optimization AI that helps candidates optimize their resumes for specific job descriptions.
-        
-        Job Description:
-        {job_description}
-        
-        {context}
-        
-        Candidate's Current Resume:
-        {resume_text}
-        
-        Task: Enhance this resume to better align with the job description while maintaining honesty and accuracy.
-        - Improve the formatting and structure
-        - Highlight relevant skills and experience
-        - Use industry-specific keywords from the job description
-        - Make bullet points more achievement-oriented
-        - Remove irrelevant information
-        - Fix any grammar or spelling issues
-        
-        Return only the enhanced resume without explanations.
-        """
-        
-        response = model.generate_content([prompt])
-        enhanced_resume = response.text
-        
-        # Create an explanation of changes separately
-        explanation_prompt = f"""
-        You previously optimized this resume for a job. Explain the key changes you made and why they improve the candidate's chances.
-        
-        Original Resume:
-        {resume_text}
-        
-        Enhanced Resume:
-        {enhanced_resume}
-        
-        Job Description:
-        {job_description}
-        
-        Provide a concise explanation of:
-        1. The main improvements made
-        2. How these changes better align with the job requirements
-        3. Any key keywords that were added
-        4. Which aspects of the resume were strengthened
-        """
-        
-        explanation_response = model.generate_content([explanation_prompt])
-        
+        enhanced = self.generate_enhanced_resume(resume_text, job_description)
+        enhanced["explanation"] = self.explain_changes(
+            resume_text, enhanced["enhanced_resume"], job_description
+        )
+        return enhanced
+
+    def generate_enhanced_resume(self, resume_text, job_description):
+        """First half of enhance_resume: the rewritten resume, without the explanation."""
+        prompt, similar_resumes = self._enhancement_prompt(resume_text, job_description)
+        enhanced_resume = llm_client.generate(prompt)
+
         return {
             "enhanced_resume": enhanced_resume,
-            "explanation": explanation_response.text,
             "similar_resumes_count": len(similar_resumes)
         }
+
+    def stream_enhanced_resume(self, resume_text, job_description):
+        """Streaming variant of generate_enhanced_resume.
+
+        Returns (chunks, similar_resumes_count); chunks yields the enhanced resume text as
+        Gemini produces it.
+        """
+        prompt, similar_resumes = self._enhancement_prompt(resume_text, job_description)
+        return llm_client.generate_stream(prompt), len(similar_resumes)
+
+    def _enhancement_prompt(self, resume_text, job_description):
+        # First, try to find similar successful resumes (if available)
+        similar_resumes = self.retrieve_similar(job_description, top_k=2, where={"type": "resume"})
+        
+        # Use Gemini to enhance the resume; the job description and the examples of
+        # successful resumes for similar roles are cut to their sentences most relevant
+        # to the resume and the job respectively
+        builder = (PromptBuilder("enhance_resume", PROMPT_TOKEN_BUDGET, embedding_model)
+                   .add("You are an expert resume optimization AI that helps candidates optimize their resumes "
+                        "for specific job descriptions.")
+                   .section("Job Description", job_description, query=resume_text))
+        for i, resume in enumerate(similar_resumes):
+            excerpt = "\n...\n".join(passage["text"] for passage in resume["passages"])
+            builder.section(f"Example of a successful resume for a similar role {i+1}",
+                            excerpt or resume["text"][:500], query=job_description)
+        prompt = (builder
+                  .section("Candidate's Current Resume", resume_text)
+                  .add("""
+                  Task: Enhance this resume to better align with the job description while maintaining honesty and accuracy.
+                  - Improve the formatting and structure
+                  - Highlight relevant skills and experience
+                  - Use industry-specific keywords from the job description
+                  - Make bullet points more achievement-oriented
+                  - Remove irrelevant information
+                  - Fix any grammar or spelling issues
+
+                  Return only the enhanced resume without explanations.
+                  """)
+                  .build())
+        return prompt, similar_resumes
+
+    def explain_changes(self, resume_text, enhanced_resume, job_description):
+        """Second half of enhance_resume; independent of anything but the enhanced resume."""
+        # Create an explanation of changes separately; the original resume is sent as
+        # the lines that changed, not as a second copy
+        explanation_prompt = (PromptBuilder("explain_changes", PROMPT_TOKEN_BUDGET, embedding_model)
+                              .add("You previously optimized this resume for a job. Explain the key changes you "
+                                   "made and why they improve the candidate's chances.")
+                              .section("Enhanced Resume", enhanced_resume)
+                              .section("Changes from the Original Resume (- removed, + added)",
+                                       changed_lines(resume_text, enhanced_resume))
+                              .section("Job Description", job_description, query=enhanced_resume)
+                              .add("""
+                              Provide a concise explanation of:
+                              1. The main improvements made
+                              2. How these changes better align with the job requirements
+                              3. Any key keywords that were added
+                              4. Which aspects of the resume were strengthened
+                              """)
+                              .build())
+        
+        return llm_client.generate(explanation_prompt)
         
     def seed_with_sample_data(self, job_titles=None):
         """Seed the RAG database with some initial example resumes."""
         if job_titles is None:
             job_titles = ["Software Engineer", "Data Scientist", "Project Manager"]
             
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        resumes, job_descriptions = [], []
         
         for title in job_titles:
             # Generate a sample job description
             job_prompt = f"Write a realistic job description for a {title} position."
-            job_response = model.generate_content([job_prompt])
-            job_description = job_response.text
+            job_description = llm_client.generate(job_prompt)
             
             # Generate a sample good resume
             resume_prompt = f"Write a strong resume for a {title} that would match well with this job description:\n\n{job_description}"
-            resume_response = model.generate_content([resume_prompt])
-            resume_text = resume_response.text
-            
-            # Add to index
-            self.add_to_index(
-                resume_text, 
-                metadata={
-                    "type": "resume", 
-                    "job_title": title,
-                    "quality": "high",
-                    "matching_job": job_description
-                }
-            )
+            resume_text = llm_client.generate(resume_prompt)
             
-            # Add job description to index
-            self.add_to_index(
-                job_description,
-                metadata={
-                    "type": "job_description",
-                    "job_title": title
-                }
-            )
+            resumes.append(resume_text)
+            job_descriptions.append(job_description)
             
+        # Job descriptions go in first so each resume can point at its job by id
+        # instead of carrying a second copy of the text
+        job_ids = self.add_many(job_descriptions, [{"type": "job_description", "job_title": title}
+                                                   for title in job_titles])
+        self.add_many(resumes, [{
+            "type": "resume",
+            "job_title": title,
+            "quality": "high",
+            "matching_job_id": job_id
+        } for title, job_id in zip(job_titles, job_ids)])
         return len(self.document_store)
\ No newline at end of file
@@ -1,12 +1,19 @@
 import streamlit as st
 import io
+import os
+import queue
+import time
 import base64
 import pdf2image
 from PIL import Image
-from crew_backend import JobSearchAgent, ResumeSearchAgent, ResumeRetrievalAgent, ResumeOptimizationAgent
+from crew_backend import (JobSearchAgent, ResumeSearchAgent, ResumeRetrievalAgent, ResumeOptimizationAgent,
+                          canonical_link)
 from ResumeParserAgent import ResumeParserAgent
 from ATSScoreAgent import ATSScoreAgent
 from ResumeRAGAgent import ResumeRAGAgent
+from config import RAG_INDEX_PATH
+from persistence import resolve_directory
+from pipeline import Pipeline
 
 # Set page config
 st.set_page_config(page_title="Resume Optimizer", layout="wide")
@@ -58,12 +65,21 @@ for key in ["resume_text", "extracted_skills", "job_descriptions", "optimized_re
     if key not in st.session_state:
         st.session_state[key] = "" if key != "extracted_skills" and key != "ats_results" else []
 
-# Initialize RAG agent and seed with sample data if first run
+@st.cache_resource(show_spinner=False)
+def load_corpus():
+    """The saved RAG corpus, memory-mapped once per process and shared read-only by all sessions."""
+    if not os.path.isdir(resolve_directory(RAG_INDEX_PATH)):
+        # No corpus built ahead of time (see build_seed_index.py): seed one, once per deployment
+        with st.spinner("Initializing AI engine..."):
+            agent = ResumeRAGAgent()
+            agent.seed_with_sample_data()
+            agent.save(RAG_INDEX_PATH)
+    return ResumeRAGAgent.load(RAG_INDEX_PATH, mmap=True)
+
+
+# Each session works on its own overlay of the shared corpus, so its additions stay its own
 if "rag_agent" not in st.session_state:
-    st.session_state.rag_agent = ResumeRAGAgent()
-    # Seed with initial data in background
-    with st.spinner("Initializing AI engine..."):
-        st.session_state.rag_agent.seed_with_sample_data()
+    st.session_state.rag_agent = load_corpus().overlay()
 
 # Title and description
 st.title("🔍 AI-Powered Resume Optimization with RAG")
@@ -154,22 +170,30 @@ with tab2:
         col1, col2 = st.columns([1, 1])
         
         with col1:
-            job_title = st.text_input("Job Title:", "")
+            job_title = st.text_input("Job Title(s), comma-separated:", "")
         with col2:
-            location = st.text_input("Location (optional):", "")
+            location = st.text_input("Location(s) (optional):", "")
 
         if st.button("Find Matching Jobs"):
             with st.spinner("Searching for relevant job descriptions..."):
                 job_agent = JobSearchAgent()
-                search_query = job_title if job_title else " ".join(st.session_state.extracted_skills[:3])
-                job_descriptions = job_agent.search_jobs(search_query, location)
+                search_queries = [title.strip() for title in job_title.split(",") if title.strip()]
+                if not search_queries:
+                    search_queries = [" ".join(st.session_state.extracted_skills[:3])]
+                locations = [place.strip() for place in location.split(",") if place.strip()] or [""]
+                # Every title x location pair is searched concurrently
+                results = job_agent.search_jobs_many(search_queries, locations)
+                job_descriptions = [job for jobs in results.values() for job in jobs]
                 
-                # Add job descriptions to RAG index
-                for job in job_descriptions:
-                    st.session_state.rag_agent.add_to_index(
-                        job["description"],
-                        metadata={"type": "job_description", "title": job["title"]}
-                    )
+                # Add job descriptions to RAG index, skipping postings this session already indexed
+                indexed_links = st.session_state.setdefault("indexed_job_links", set())
+                new_jobs = [job for job in job_descriptions
+                            if canonical_link(job["link"]) is None or canonical_link(job["link"]) not in indexed_links]
+                st.session_state.rag_agent.add_many(
+                    [job["description"] for job in new_jobs],
+                    [{"type": "job_description", "title": job["title"], "link": job["link"]} for job in new_jobs]
+                )
+                indexed_links.update(canonical_link(job["link"]) for job in new_jobs)
                 
                 st.session_state.job_descriptions = job_descriptions
                 st.success(f"Found {len(job_descriptions)} relevant job postings!")
@@ -221,35 +245,82 @@ with tab3:
         
         if standard_optimize or rag_optimize:
             with st.spinner("Analyzing ATS score and optimizing resume..."):
-                # Calculate ATS score
+                # Stages run on worker threads, so read session state up front
+                resume_text = st.session_state.resume_text
+                resume_json = st.session_state.resume_json
+                rag_agent = st.session_state.rag_agent
                 ats_agent = ATSScoreAgent()
-                ats_results = ats_agent.calculate_ats_score(st.session_state.resume_json, selected_job)
-                st.session_state.ats_results = ats_results
                 
-                # Process optimization
+                # ATS scoring of the original resume does not depend on optimization,
+                # and the RAG explanation and before/after comparison only need the optimized text
+                optimization = Pipeline("optimization")
+                optimization.add("ats_score", lambda: ats_agent.calculate_ats_score(resume_json, selected_job))
+                
+                # The optimize stage streams chunks to the main thread, which renders them live
+                chunks = queue.Queue()
+                optimization_agent = ResumeOptimizationAgent()
+                def optimize():
+                    try:
+                        if rag_optimize:
+                            # Use RAG-enhanced optimization
+                            stream, similar_resumes_count = rag_agent.stream_enhanced_resume(resume_text, selected_job)
+                        else:
+                            # Use standard optimization
+                            stream, similar_resumes_count = optimization_agent.optimize_resume_stream(resume_text, selected_job), 0
+                        parts = []
+                        for chunk in stream:
+                            parts.append(chunk)
+                            chunks.put(chunk)
+                        return {"enhanced_resume": "".join(parts), "similar_resumes_count": similar_resumes_count}
+                    finally:
+                        chunks.put(None)
+                optimization.add("optimize", optimize)
                 if rag_optimize:
-                    # Use RAG-enhanced optimization
-                    rag_results = st.session_state.rag_agent.enhance_resume(
-                        st.session_state.resume_text, 
-                        selected_job
+                    optimization.add(
+                        "explanation",
+                        lambda optimize: rag_agent.explain_changes(resume_text, optimize["enhanced_resume"], selected_job),
+                        depends_on=["optimize"]
                     )
-                    st.session_state.optimized_resume = rag_results["enhanced_resume"]
-                    st.session_state.rag_results = rag_results
-                else:
-                    # Use standard optimization
-                    optimization_agent = ResumeOptimizationAgent()
-                    optimized_resume = optimization_agent.optimize_resume(st.session_state.resume_text, selected_job)
-                    st.session_state.optimized_resume = optimized_resume
                 
                 # Compare before and after
-                comparison = ats_agent.compare_before_after(
-                    st.session_state.resume_text,
-                    st.session_state.optimized_resume,
-                    selected_job
+                optimization.add(
+                    "comparison",
+                    lambda optimize: ats_agent.compare_before_after(resume_text, optimize["enhanced_resume"], selected_job),
+                    depends_on=["optimize"]
                 )
-                st.session_state.before_after_comparison = comparison
                 
-                st.success("Resume optimization complete!")
+                started = time.perf_counter()
+                first_token = []
+                def live_chunks():
+                    for chunk in iter(chunks.get, None):
+                        if not first_token:
+                            first_token.append(time.perf_counter() - started)
+                        yield chunk
+                
+                live_resume = st.empty()
+                run_future = optimization.start()
+                with live_resume.container():
+                    st.markdown("#### ✍️ Optimized Resume (live)")
+                    st.write_stream(live_chunks())
+                run = run_future.result()
+                live_resume.empty()
+                
+                st.session_state.ats_results = run["ats_score"]
+                st.session_state.optimized_resume = run["optimize"]["enhanced_resume"]
+                if rag_optimize:
+                    st.session_state.rag_results = dict(run["optimize"], explanation=run["explanation"])
+                st.session_state.before_after_comparison = run["comparison"]
+                st.session_state.optimization_timings = run.breakdown()
+                st.session_state.optimization_ttft = first_token[0] if first_token else None
+                
+                st.success(f"Resume optimization complete in {run.wall_seconds:.1f}s!")
+        
+        if st.session_state.get("optimization_timings"):
+            with st.expander("⏱️ Stage Timings"):
+                if st.session_state.get("optimization_ttft") is not None:
+                    st.caption(f"First optimized text appeared after {st.session_state.optimization_ttft:.2f}s.")
+                st.caption("Stages marked critical are on the longest dependency chain.")
+                st.table(st.session_state.optimization_timings)
         
         # Display ATS Score Analysis
         if st.session_state.ats_results:
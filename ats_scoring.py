@@ -0,0 +1,230 @@
+import re
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+# Multi-word and punctuated skills are matched as whole phrases, case-insensitively
+SKILL_LEXICON = (
+    "python", "java", "javascript", "typescript", "c++", "c#", "golang", "rust", "scala",
+    "kotlin", "swift", "ruby", "php", "matlab", "sql", "nosql", "bash", "html", "css",
+    "react", "angular", "vue", "node.js", "django", "flask", "fastapi", "spring", "spring boot",
+    ".net", "graphql", "rest api", "restful", "grpc", "microservices",
+    "aws", "azure", "gcp", "google cloud", "docker", "kubernetes", "terraform", "ansible",
+    "jenkins", "ci/cd", "github actions", "linux", "git", "helm", "serverless",
+    "postgresql", "mysql", "mongodb", "redis", "elasticsearch", "cassandra", "dynamodb",
+    "snowflake", "bigquery", "redshift", "kafka", "spark", "pyspark", "hadoop", "airflow",
+    "dbt", "etl", "data warehousing", "data modeling", "tableau", "power bi", "looker", "excel",
+    "machine learning", "deep learning", "nlp", "computer vision", "pytorch", "tensorflow",
+    "keras", "scikit-learn", "pandas", "numpy", "statistics", "a/b testing", "llm",
+    "generative ai", "mlops", "data analysis", "data visualization",
+    "agile", "scrum", "kanban", "jira", "project management", "product management",
+    "stakeholder management", "risk management", "budgeting", "pmp", "prince2",
+    "soc 2", "iso 27001", "gdpr", "hipaa", "security", "penetration testing",
+    "communication", "leadership", "mentoring", "problem solving", "teamwork",
+)
+
+K1 = 1.2  # BM25 term-frequency saturation
+
+
+def make_keyword_extractor():
+    """A fresh keyword vectorizer; fitting one mutates it, so every scoring call gets its own."""
+    return CountVectorizer(stop_words="english", max_features=100, ngram_range=(1, 2))
+
+
+def flatten_text(value):
+    """All string content of a (possibly nested) resume JSON value, space-joined."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return " ".join(flatten_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(flatten_text(v) for v in value)
+    return "" if value is None else str(value)
+
+
+def flatten_skills(value):
+    """Skill names from a skills section that is a string, a list, a dict of categories or named objects."""
+    skills = []
+
+    def collect(value):
+        if isinstance(value, str):
+            skills.extend(part.strip() for part in re.split(r",|\n", value) if part.strip())
+        elif isinstance(value, dict):
+            if "name" in value:
+                collect(value["name"])
+            else:
+                for item in value.values():
+                    collect(item)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                collect(item)
+
+    collect(value)
+    return list(dict.fromkeys(skills))
+
+
+def _phrase_pattern(phrase):
+    return re.compile(r"(?<![\w+#.])" + re.escape(phrase) + r"(?![\w+#])", re.IGNORECASE)
+
+
+_SKILL_PATTERNS = {skill: _phrase_pattern(skill) for skill in SKILL_LEXICON}
+
+
+def find_skills(text, skills=SKILL_LEXICON):
+    """Skills from ``skills`` that occur in ``text`` as whole phrases."""
+    found = []
+    for skill in skills:
+        pattern = _SKILL_PATTERNS.get(skill) or _phrase_pattern(skill)
+        if pattern.search(text):
+            found.append(skill)
+    return found
+
+
+def similarity_to_score(cosine, low=0.1, high=0.7):
+    """Map a MiniLM cosine similarity onto the 1-10 ATS scale.
+
+    Unrelated resume/job pairs sit around ``low`` and strong matches around ``high``.
+    """
+    return int(round(1 + 9 * min(1.0, max(0.0, (cosine - low) / (high - low)))))
+
+
+class LocalATSScorer:
+    """Deterministic ATS metrics computed without the LLM.
+
+    Keyword coverage uses the job description's top terms (CountVectorizer, unigrams and
+    bigrams) weighted by sublinear job-description frequency with BM25 saturation of the
+    resume frequency. Skills are matched as phrases from SKILL_LEXICON plus the resume's
+    own skills list. Section scores come from embedding cosine similarity between resume
+    sections and the job description.
+    """
+
+    SECTIONS = ("summary", "skills", "experience", "education")
+
+    def __init__(self, embedder=None, max_missing_skills=10):
+        self.embedder = embedder
+        self.max_missing_skills = max_missing_skills
+
+    def keyword_metrics(self, resume_text, job_description):
+        extractor = make_keyword_extractor()
+        try:
+            job_counts = extractor.fit_transform([job_description]).toarray()[0]
+        except ValueError:  # Empty vocabulary, e.g. a blank job description
+            return [], {"resume_keyword_count": 0, "job_description_keyword_count": 0,
+                        "match_percentage": 0}, 0.0
+        resume_counts = extractor.transform([resume_text]).toarray()[0]
+        terms = extractor.get_feature_names_out()
+
+        weights = 1 + np.log(job_counts.astype("float64"))
+        saturation = resume_counts * (K1 + 1) / (resume_counts + K1)
+        coverage = float((weights * saturation).sum() / ((K1 + 1) * weights.sum()))
+
+        matched = np.flatnonzero(resume_counts > 0)
+        matched = matched[np.argsort(-weights[matched], kind="stable")]
+        keyword_density = {
+            "resume_keyword_count": int(resume_counts.sum()),
+            "job_description_keyword_count": int(job_counts.sum()),
+            "match_percentage": round(100 * len(matched) / len(terms), 1),
+        }
+        return [str(terms[i]) for i in matched], keyword_density, coverage
+
+    def skill_metrics(self, resume_text, resume_skills, job_description):
+        candidates = {}
+        for skill in SKILL_LEXICON + tuple(resume_skills):
+            candidates.setdefault(skill.lower(), skill)
+        wanted = find_skills(job_description, tuple(candidates.values()))
+        if not wanted:
+            return [], 1.0
+        have = set(find_skills(resume_text, wanted))
+        missing = [skill for skill in wanted if skill not in have]
+        return missing, 1 - len(missing) / len(wanted)
+
+    def section_texts(self, resume_json):
+        """Text of each non-empty section in SECTIONS, plus the whole resume as ``"overall"``."""
+        sections = {name: flatten_text(resume_json.get(name)) for name in self.SECTIONS}
+        sections = {name: text for name, text in sections.items() if text.strip()}
+        sections["overall"] = flatten_text(resume_json)
+        return sections
+
+    def section_similarities(self, resume_json, job_description, job_embedding=None, section_embeddings=None):
+        """Cosine similarity of each of ``section_texts`` to the job description.
+
+        ``job_embedding`` and ``section_embeddings`` (section name -> unit vector) are used
+        instead of embedding those texts when a caller scoring many pairs already has them.
+        """
+        texts = []
+        if job_embedding is None:
+            texts.append(job_description)
+        if section_embeddings is None:
+            sections = self.section_texts(resume_json)
+            texts.extend(sections.values())
+        if texts:
+            if self.embedder is None:
+                return {}
+            embeddings = self.embedder.embed(texts)
+            if job_embedding is None:
+                job_embedding, embeddings = embeddings[0], embeddings[1:]
+            if section_embeddings is None:
+                section_embeddings = dict(zip(sections, embeddings))
+        return {name: float(vector @ job_embedding) for name, vector in section_embeddings.items()}
+
+    def score(self, resume_json, job_description, resume_text=None, job_embedding=None, section_embeddings=None):
+        """Return the ATS result fields that can be computed locally; see ``section_similarities``
+        for the optional embeddings."""
+        resume_json = resume_json if isinstance(resume_json, dict) else {"summary": flatten_text(resume_json)}
+        resume_text = resume_text or flatten_text(resume_json)
+        resume_skills = flatten_skills(resume_json.get("skills"))
+
+        keyword_matches, keyword_density, coverage = self.keyword_metrics(resume_text, job_description)
+        missing_skills, skill_match = self.skill_metrics(resume_text, resume_skills, job_description)
+        similarities = self.section_similarities(resume_json, job_description, job_embedding, section_embeddings)
+        semantic = similarities.get("overall")
+
+        word_count = len(resume_text.split())
+        present = sum(1 for name in self.SECTIONS if flatten_text(resume_json.get(name)).strip())
+        format_score = 10 - 2 * (len(self.SECTIONS) - present) - (2 if word_count < 150 else 0)
+
+        def section_score(name, fallback):
+            return similarity_to_score(similarities[name]) if name in similarities else fallback
+
+        components = [coverage, skill_match]
+        if semantic is not None:
+            components.append((similarity_to_score(semantic) - 1) / 9)
+        ats_score = max(1, min(10, int(round(10 * sum(components) / len(components)))))
+
+        return {
+            "ats_score": ats_score,
+            "missing_skills": missing_skills[: self.max_missing_skills],
+            "keyword_matches": keyword_matches,
+            "section_scores": {
+                "skills": max(1, int(round(10 * skill_match))),
+                "experience": section_score("experience", max(1, int(round(10 * coverage)))),
+                # Education rarely echoes the job description, so presence carries most of the score
+                "education": (min(10, 5 + similarity_to_score(similarities["education"], 0.0, 0.5) // 2)
+                              if "education" in similarities else 3),
+                "overall_format": max(1, min(10, format_score)),
+            },
+            "keyword_density": keyword_density,
+            "semantic_similarity": round(semantic, 3) if semantic is not None else None,
+        }
+
+    def suggestions(self, result):
+        """Templated improvement suggestions for fully offline scoring."""
+        suggestions = []
+        if result["missing_skills"]:
+            suggestions.append("If you have experience with them, mention these skills from the job "
+                               "description: " + ", ".join(result["missing_skills"]))
+        if result["keyword_density"]["match_percentage"] < 40:
+            suggestions.append("Reuse more of the job description's wording in your experience bullets.")
+        weakest = min(result["section_scores"], key=result["section_scores"].get)
+        suggestions.append(f"Strengthen the {weakest.replace('_', ' ')} section; it scores lowest "
+                           f"({result['section_scores'][weakest]}/10) against this job.")
+        return suggestions
+
+    def analysis(self, result):
+        density = result["keyword_density"]
+        text = (f"Matched {len(result['keyword_matches'])} of the job description's top keywords "
+                f"({density['match_percentage']}%) and is missing {len(result['missing_skills'])} "
+                f"required skills.")
+        if result.get("semantic_similarity") is not None:
+            text += f" Semantic similarity to the job description is {result['semantic_similarity']:.2f}."
+        return text
+
@@ -0,0 +1,213 @@
+"""Batch screening: rank every resume in a directory against every job description in another.
+
+All documents are embedded once, the full job x resume cosine-similarity matrix is computed
+with a single FAISS inner-product search, and only the top-N resumes per job go on to ATS
+scoring (local metrics for all of them, Gemini narrative for the first --llm-top-n). The
+sections of those resumes are embedded once too, in one batch, and every pair is scored
+from the stored vectors.
+Each row carries the raw cosine similarity and its logistic relevance in (0, 1); pairs
+below --min-similarity are dropped before scoring. Rows are streamed to CSV or Parquet one job at a time.
+
+    python batch_screening.py resumes/ jobs/ --top-n 50 --llm-top-n 5 --output ranking.csv
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import faiss
+import numpy as np
+from ATSScoreAgent import ATSScoreAgent
+from ats_scoring import flatten_skills
+from chunking import split_sections
+from config import embedding_model
+from extraction import SUPPORTED_EXTENSIONS, ParallelExtractor
+from index_factory import logistic_relevance, normalize
+
+OUTPUT_COLUMNS = [
+    "job_file", "rank", "resume_file", "similarity", "relevance", "ats_score", "skills_score",
+    "keyword_match_percentage", "keyword_matches", "missing_skills", "improvement_suggestions",
+]
+
+
+def resume_json_from_text(text):
+    """Resume JSON with the summary/experience/skills/education keys the scorer reads, built
+    from the text's headings instead of a Gemini parse; skills become a list of names."""
+    resume_json = {}
+    for section, body in split_sections(text):
+        resume_json[section] = f"{resume_json[section]}\n{body}" if section in resume_json else body
+    if "skills" in resume_json:
+        resume_json["skills"] = flatten_skills(resume_json["skills"])
+    return resume_json
+
+
+def load_directory(directory, extractor=None):
+    """Return (relative paths, texts) for every supported file under ``directory``."""
+    files = []
+    for root, _, names in os.walk(directory):
+        files.extend(os.path.join(root, name) for name in sorted(names)
+                     if name.lower().endswith(SUPPORTED_EXTENSIONS))
+    paths, texts = [], []
+    for result in (extractor or ParallelExtractor()).extract_all(files):
+        if result.error or not result.text.strip():
+            print(f"Skipping {result.path}: {result.error or 'no text'}", file=sys.stderr)
+            continue
+        paths.append(os.path.relpath(result.path, directory))
+        texts.append(result.text)
+    return paths, texts
+
+
+def similarity_top_n(job_embeddings, resume_embeddings, top_n):
+    """Top-N resumes per job by cosine similarity, as (similarities, resume indices)."""
+    index = faiss.IndexFlatIP(resume_embeddings.shape[1])
+    index.add(normalize(resume_embeddings))
+    return index.search(normalize(job_embeddings), min(top_n, index.ntotal))
+
+
+def embed_sections(scorer, resume_jsons, resume_embeddings, resume_indices, batch_size=None):
+    """Section name -> unit vector for each of ``resume_indices``, keyed by index, from one
+    embedding call over all their sections. ``"overall"`` reuses the resume's own embedding."""
+    sections = {i: scorer.section_texts(resume_jsons[i]) for i in resume_indices.tolist()}
+    for texts in sections.values():
+        del texts["overall"]
+    embeddings = embedding_model.embed([text for texts in sections.values() for text in texts.values()],
+                                       batch_size=batch_size)
+    by_resume, row = {}, 0
+    for i, texts in sections.items():
+        by_resume[i] = dict(zip(texts, embeddings[row:row + len(texts)]))
+        by_resume[i]["overall"] = resume_embeddings[i]
+        row += len(texts)
+    return by_resume
+
+
+class _CsvSink:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=OUTPUT_COLUMNS)
+        self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetSink:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        self._writer = pq.ParquetWriter(path, pa.schema([
+            ("job_file", pa.string()), ("rank", pa.int32()), ("resume_file", pa.string()),
+            ("similarity", pa.float32()), ("relevance", pa.float32()), ("ats_score", pa.int32()),
+            ("skills_score", pa.int32()), ("keyword_match_percentage", pa.float32()),
+            ("keyword_matches", pa.string()),
+            ("missing_skills", pa.string()), ("improvement_suggestions", pa.string()),
+        ]))
+
+    def write(self, rows):
+        if rows:
+            self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self._writer.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def open_sink(path):
+    return _ParquetSink(path) if path.endswith(".parquet") else _CsvSink(path)
+
+
+def screen(resume_dir, job_dir, output, top_n=50, llm_top_n=5, workers=4, batch_size=None,
+           extract_workers=None, min_similarity=None):
+    """Rank resumes against jobs and stream the results to ``output``; returns the row count."""
+    start = time.perf_counter()
+    extractor = ParallelExtractor(max_workers=extract_workers)
+    resume_paths, resume_texts = load_directory(resume_dir, extractor)
+    job_paths, job_texts = load_directory(job_dir, extractor)
+    if not resume_texts or not job_texts:
+        raise ValueError("Need at least one readable resume and one job description")
+    print(f"Loaded {len(resume_texts)} resumes and {len(job_texts)} jobs "
+          f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    local_agent = ATSScoreAgent(offline=True)
+    llm_agent = ATSScoreAgent()
+
+    start = time.perf_counter()
+    resume_embeddings = embedding_model.embed(resume_texts, batch_size=batch_size)
+    job_embeddings = embedding_model.embed(job_texts, batch_size=batch_size)
+    similarities, neighbours = similarity_top_n(job_embeddings, resume_embeddings, top_n)
+    resume_jsons = [resume_json_from_text(text) for text in resume_texts]
+    kept = neighbours >= 0
+    if min_similarity is not None:
+        kept &= similarities >= min_similarity
+    section_embeddings = embed_sections(local_agent.scorer, resume_jsons, resume_embeddings,
+                                        np.unique(neighbours[kept]), batch_size)
+    print(f"Embedded and matched in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    def score(j, resume_index, rank):
+        agent = llm_agent if rank < llm_top_n else local_agent
+        return agent.calculate_ats_score(resume_jsons[resume_index], job_texts[j], job_embeddings[j],
+                                         section_embeddings[resume_index])
+
+    sink = open_sink(output)
+    rows_written = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for j in range(len(job_texts)):
+                ranked = [(rank, int(i), float(s)) for rank, (i, s)
+                          in enumerate(zip(neighbours[j], similarities[j]))
+                          if i >= 0 and (min_similarity is None or s >= min_similarity)]
+                results = pool.map(lambda item: score(j, item[1], item[0]), ranked)
+                rows = []
+                for (rank, i, similarity), result in zip(ranked, results):
+                    rows.append({
+                        "job_file": job_paths[j],
+                        "rank": rank + 1,
+                        "resume_file": resume_paths[i],
+                        "similarity": round(similarity, 4),
+                        "relevance": round(float(logistic_relevance(similarity)), 4),
+                        "ats_score": result["ats_score"],
+                        "skills_score": result["section_scores"]["skills"],
+                        "keyword_match_percentage": result["keyword_density"]["match_percentage"],
+                        "keyword_matches": "; ".join(result["keyword_matches"][:20]),
+                        "missing_skills": "; ".join(result["missing_skills"]),
+                        "improvement_suggestions": " | ".join(result["improvement_suggestions"])
+                        if rank < llm_top_n else "",
+                    })
+                sink.write(rows)
+                rows_written += len(rows)
+    finally:
+        sink.close()
+    return rows_written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("resume_dir")
+    parser.add_argument("job_dir")
+    parser.add_argument("--output", default="screening.csv", help="a .csv or .parquet path")
+    parser.add_argument("--top-n", type=int, default=50, help="resumes kept per job")
+    parser.add_argument("--llm-top-n", type=int, default=5,
+                        help="of those, how many per job get Gemini suggestions (0 for none)")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent scoring calls")
+    parser.add_argument("--batch-size", type=int, default=None, help="embedding batch size")
+    parser.add_argument("--extract-workers", type=int, default=None,
+                        help="processes for text extraction (default: one per CPU)")
+    parser.add_argument("--min-similarity", type=float, default=None,
+                        help="drop resume/job pairs with a lower cosine similarity")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows = screen(args.resume_dir, args.job_dir, args.output, args.top_n, args.llm_top_n,
+                  args.workers, args.batch_size, args.extract_workers, args.min_similarity)
+    print(f"Wrote {rows} rows to {args.output} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
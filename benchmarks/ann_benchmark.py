@@ -0,0 +1,107 @@
+"""Recall@k versus query latency for the index modes in index_factory.
+
+Vectors are synthetic 384-d points drawn around random cluster centres and L2-normalized,
+which is roughly how sentence embeddings of a resume corpus are distributed. Every index
+uses inner product, the metric VectorStore searches with, and ground truth comes from an
+exact flat index. Each ANN mode is built once per corpus size and then swept over its
+query-time knob (nprobe for IVF, efSearch for HNSW). IVF-PQ is built once per
+``--pq-m`` and ``--max-train-points`` pair and also swept over the refine factor: like
+VectorStore, it fetches k * refine_factor candidates and re-ranks them by their exact
+vectors.
+
+    python benchmarks/ann_benchmark.py --sizes 10000 100000 1000000 --k 10
+"""
+import argparse
+import os
+import sys
+import time
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from index_factory import IndexConfig, build_index, rescore, set_search_params, train_index  # noqa: E402
+
+DIMENSION = 384
+METRIC = faiss.METRIC_INNER_PRODUCT
+SWEEPS = {
+    "flat": [None],
+    "ivf_flat": [1, 4, 16, 64],
+    "hnsw": [16, 32, 64, 128],
+    "ivf_pq": [1, 4, 16, 64],
+}
+REFINE_FACTORS = [1, 2, 4, 8]
+
+
+def synthetic_vectors(n, n_clusters=1024, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((n_clusters, DIMENSION)).astype("float32")
+    labels = rng.integers(0, n_clusters, n)
+    vectors = centres[labels] + 0.8 * rng.standard_normal((n, DIMENSION)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def builds(pq_ms, train_points):
+    """(label, config) of every index to build."""
+    for mode in SWEEPS:
+        if mode != "ivf_pq":
+            yield mode, IndexConfig(mode)
+        else:
+            for pq_m in pq_ms:
+                for points in train_points:
+                    yield f"ivf_pq{pq_m}/{points}", IndexConfig(mode, pq_m=pq_m, max_train_points=points)
+
+
+def run(sizes, k, n_queries, pq_ms, train_points):
+    print(f"{'n':>9} {'mode':<13} {'param':>6} {'refine':>6} {'build s':>8} {'ms/query':>9} {'recall@' + str(k):>9}")
+    for n in sizes:
+        # Queries come from the same clusters as the corpus but are not in it
+        vectors = synthetic_vectors(n + n_queries)
+        data, queries = vectors[:n], vectors[n:]
+        exact = build_index(IndexConfig("flat"), DIMENSION, metric=METRIC)
+        exact.add(data)
+        _, truth = exact.search(queries, k)
+
+        for label, config in builds(pq_ms, train_points):
+            start = time.perf_counter()
+            index = build_index(config, DIMENSION, n, METRIC)
+            train_index(index, data, config)
+            index.add(data)
+            build_s = time.perf_counter() - start
+
+            for param in SWEEPS[config.mode]:
+                if config.mode == "hnsw":
+                    config.ef_search = param
+                elif param is not None:
+                    config.nprobe = param
+                set_search_params(index, config)
+                for refine_factor in REFINE_FACTORS if config.mode == "ivf_pq" else [1]:
+                    start = time.perf_counter()
+                    _, found = index.search(queries, k * refine_factor)
+                    if refine_factor > 1:
+                        _, found = rescore(data, queries, found, k)
+                    ms_per_query = 1000 * (time.perf_counter() - start) / n_queries
+                    print(f"{n:>9} {label:<13} {param if param is not None else '-':>6} {refine_factor:>6} "
+                          f"{build_s:>8.1f} {ms_per_query:>9.3f} {recall_at_k(found, truth):>9.3f}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--pq-m", type=int, nargs="+", default=[IndexConfig().pq_m],
+                        help="IVF-PQ subquantizer counts to build (each must divide 384)")
+    parser.add_argument("--max-train-points", type=int, nargs="+", default=[IndexConfig().max_train_points],
+                        help="IVF-PQ training points per list to build with")
+    args = parser.parse_args()
+    run(args.sizes, args.k, args.queries, args.pq_m, args.max_train_points)
+
+
+if __name__ == "__main__":
+    main()
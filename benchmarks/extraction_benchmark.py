@@ -0,0 +1,133 @@
+"""Text extraction throughput: the old per-page double extract, single-pass serial, and ParallelExtractor.
+
+Generates a corpus of multi-page PDFs (hand-written PDF with Helvetica text streams, so
+no PDF authoring library is needed) and DOCX files (python-docx) in a temporary
+directory, then extracts every file with each strategy.
+
+    python benchmarks/extraction_benchmark.py --pdfs 40 --pages 12 --docx 40 --workers 4
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import docx
+import PyPDF2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from extraction import ParallelExtractor, extract_text  # noqa: E402
+
+WORDS = ("python sql docker kubernetes pipeline airflow spark analytics stakeholder delivered "
+         "designed reduced latency migrated platform mentoring engineers customers revenue").split()
+
+
+def _sentence(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(12)).capitalize() + "."
+
+
+def make_pdf(pages, lines_per_page, rng):
+    """A minimal valid PDF whose pages each carry ``lines_per_page`` lines of text."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        lines = [_sentence(rng) for _ in range(lines_per_page)]
+        body = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_docx(paragraphs, rng):
+    document = docx.Document()
+    for _ in range(paragraphs):
+        document.add_paragraph(_sentence(rng))
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def legacy_extract(file_bytes, filename):
+    """The previous PDF path, which called page.extract_text() twice per page."""
+    if filename.endswith(".pdf"):
+        reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
+        return "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
+    return extract_text(file_bytes, filename)
+
+
+def run_serial(paths, extract):
+    seconds = []
+    for path in paths:
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            extract(f.read(), path)
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdfs", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=12, help="pages per PDF")
+    parser.add_argument("--long-pdfs", type=int, default=2, help="extra PDFs with 10x the pages")
+    parser.add_argument("--docx", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(args.pdfs + args.long_pdfs):
+            pages = args.pages * (10 if i >= args.pdfs else 1)
+            paths.append(os.path.join(directory, f"resume_{i:04d}.pdf"))
+            with open(paths[-1], "wb") as f:
+                f.write(make_pdf(pages, 40, rng))
+        for i in range(args.docx):
+            paths.append(os.path.join(directory, f"resume_{i:04d}.docx"))
+            with open(paths[-1], "wb") as f:
+                f.write(make_docx(120, rng))
+        total_mb = sum(os.path.getsize(p) for p in paths) / 1e6
+        print(f"{len(paths)} files, {total_mb:.1f} MB, {args.workers} workers")
+
+        print(f"{'strategy':<22}{'wall s':>8}{'files/s':>9}{'file p50 ms':>13}{'file max ms':>13}")
+
+        def report(name, wall, seconds):
+            print(f"{name:<22}{wall:>8.2f}{len(paths) / wall:>9.1f}"
+                  f"{1000 * statistics.median(seconds):>13.1f}{1000 * max(seconds):>13.1f}")
+
+        for name, extract in (("serial, double pass", legacy_extract), ("serial, single pass", extract_text)):
+            start = time.perf_counter()
+            seconds = run_serial(paths, extract)
+            report(name, time.perf_counter() - start, seconds)
+
+        extractor = ParallelExtractor(max_workers=args.workers)
+        start = time.perf_counter()
+        results = extractor.extract_all(paths)
+        report("process pool", time.perf_counter() - start, [r.seconds for r in results])
+        failures = [r for r in results if r.error]
+        if failures:
+            print(f"{len(failures)} files failed, e.g. {failures[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Job search against a local mock Serper server: one-at-a-time requests vs pooled fan-out.
+
+The mock answers every POST after --latency seconds, fails a --failure-rate share of
+requests with 503 and lets a --hang-rate share hang past the client's read timeout.
+The baseline issues a plain ``requests.post`` per title x location pair, one after
+another, like the original JobSearchAgent; the pooled run calls
+``JobSearchAgent.search_jobs_many`` through the shared HttpClient.
+
+    python benchmarks/http_benchmark.py --titles 4 --locations 3 --latency 0.2 --failure-rate 0.2
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_handler(latency, failure_rate, hang_seconds, hang_rate, rng):
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, so pooled connections are reused
+
+        def do_POST(self):
+            query = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["q"]
+            with lock:
+                roll = rng.random()
+            time.sleep(hang_seconds if roll < hang_rate else latency)
+            if roll < hang_rate + failure_rate:
+                body, status = b'{"error": "unavailable"}', 503
+            else:
+                organic = [{"title": f"{query} #{i}", "snippet": f"Role {i} for {query}",
+                            "link": f"https://jobs.example/{abs(hash(query))}/{i}"} for i in range(5)]
+                body, status = json.dumps({"organic": organic}).encode(), 200
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The client timed out and hung up
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--titles", type=int, default=4)
+    parser.add_argument("--locations", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock response time in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.2, help="share of 503 responses")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="share of requests that outlive the timeout")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(
+        args.latency, args.failure_rate, 4.0, args.hang_rate, random.Random(args.seed)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/search"
+    os.environ["SERPER_URL"] = url
+    os.environ.setdefault("HTTP_READ_TIMEOUT_SECONDS", "2")
+
+    import metrics
+    from crew_backend import JobSearchAgent
+
+    titles = [f"title {i}" for i in range(args.titles)]
+    locations = [f"city {i}" for i in range(args.locations)]
+    pairs = [(t, loc) for t in titles for loc in locations]
+
+    start = time.perf_counter()
+    found = failed = 0
+    for title, location in pairs:
+        try:
+            response = requests.post(url, json={"q": f"{title} jobs in {location}", "num": 5}, timeout=30)
+            response.raise_for_status()
+            found += len(response.json()["organic"])
+        except requests.RequestException:
+            failed += 1
+    baseline = time.perf_counter() - start
+    print(f"sequential, no retries: {baseline:.2f}s, {found} jobs, {failed}/{len(pairs)} queries failed")
+
+    start = time.perf_counter()
+    results = JobSearchAgent().search_jobs_many(titles, locations)
+    pooled = time.perf_counter() - start
+    found = sum(len(jobs) for jobs in results.values())
+    empty = sum(1 for jobs in results.values() if not jobs)
+    print(f"pooled fan-out + retries: {pooled:.2f}s, {found} jobs, {empty}/{len(pairs)} queries failed")
+
+    snapshot = metrics.snapshot()
+    latency = snapshot["histograms"].get("http.serper.seconds", {})
+    print(f"attempts {latency.get('count', 0)}, retries {snapshot['counters'].get('http.serper.retries', 0)}, "
+          f"p50 {1000 * latency.get('p50', 0):.0f} ms, p99 {1000 * latency.get('p99', 0):.0f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Bursts of Gemini calls against a fake backend: unmanaged fan-out vs the shared LLMClient.
+
+The fake answers after --latency seconds plus a per-token cost and, like the real API,
+rejects requests beyond --upstream-qps in any one-second window with a 429
+(ResourceExhausted). --users callers each send one of --distinct prompts at once, so
+many requests overlap. The baseline awaits the fake directly, one request per caller
+with no retries, the way each agent used to call its own GenerativeModel; the managed
+run sends the same burst through LLMClient.generate_many with a rate limit just under
+the upstream quota, single-flight coalescing and retries. The response cache is
+disabled.
+
+    python benchmarks/llm_benchmark.py --users 60 --distinct 12 --upstream-qps 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import deque
+from google.api_core import exceptions as api_exceptions
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics  # noqa: E402
+from llm_client import LLMClient  # noqa: E402
+from prompt_budget import count_tokens  # noqa: E402
+
+
+class _Usage:
+    def __init__(self, total_token_count):
+        self.total_token_count = total_token_count
+
+
+class _Response:
+    def __init__(self, text, tokens):
+        self.text = text
+        self.usage_metadata = _Usage(tokens)
+
+
+class FakeGemini:
+    """Stand-in for genai.GenerativeModel with latency and a requests-per-second quota."""
+
+    def __init__(self, latency, upstream_qps, per_token_s=0.0001):
+        self.latency = latency
+        self.upstream_qps = upstream_qps
+        self.per_token_s = per_token_s
+        self.calls = 0
+        self.rejected = 0
+        self._window = deque()
+
+    async def generate_content_async(self, contents, generation_config=None):
+        prompt = contents[0]
+        self.calls += 1
+        now = time.monotonic()
+        while self._window and now - self._window[0] >= 1:
+            self._window.popleft()
+        if len(self._window) >= self.upstream_qps:
+            self.rejected += 1
+            await asyncio.sleep(0.02)
+            raise api_exceptions.ResourceExhausted("429 Resource has been exhausted (e.g. check quota).")
+        self._window.append(now)
+        await asyncio.sleep(self.latency + self.per_token_s * count_tokens(prompt))
+        text = f"Answer to: {prompt[:40]}"
+        return _Response(text, count_tokens(prompt) + count_tokens(text))
+
+
+def make_prompts(users, distinct):
+    return [f"Write a job description for role {i % distinct}. " + "Requirements follow. " * 50
+            for i in range(users)]
+
+
+async def unmanaged(fake, prompts):
+    results = await asyncio.gather(*(fake.generate_content_async([p]) for p in prompts), return_exceptions=True)
+    return sum(1 for r in results if isinstance(r, Exception))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=60)
+    parser.add_argument("--distinct", type=int, default=12, help="different prompts among the callers")
+    parser.add_argument("--upstream-qps", type=int, default=10, help="fake quota; more is rejected with 429")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake response time in seconds")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    args = parser.parse_args()
+    prompts = make_prompts(args.users, args.distinct)
+
+    fake = FakeGemini(args.latency, args.upstream_qps)
+    start = time.perf_counter()
+    failed = asyncio.run(unmanaged(fake, prompts))
+    print(f"unmanaged: {time.perf_counter() - start:.2f}s, {fake.calls} upstream calls, "
+          f"{fake.rejected} 429s, {failed}/{len(prompts)} callers failed")
+
+    # Let the fake's quota window drain before the second run
+    time.sleep(1.1)
+    fake = FakeGemini(args.latency, args.upstream_qps)
+    client = LLMClient(model_factory=lambda name: fake, qps=0.9 * args.upstream_qps,
+                       max_concurrency=args.max_concurrency, retries=3, backoff=0.5)
+    start = time.perf_counter()
+    results = client.generate_many(prompts)
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    print(f"LLMClient: {time.perf_counter() - start:.2f}s, {fake.calls} upstream calls, "
+          f"{fake.rejected} 429s, {failed}/{len(prompts)} callers failed")
+
+    snapshot = metrics.snapshot()
+    wait = snapshot["histograms"].get("llm.rate_limit_wait_seconds", {})
+    print(f"coalesced {snapshot['counters'].get('llm.coalesced', 0)}, retries {snapshot['counters'].get('llm.retries', 0)}, "
+          f"rate-limit wait p50 {1000 * wait.get('p50', 0):.0f} ms, max {1000 * wait.get('max', 0):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""End-to-end ResumeParserAgent.parse_resume latency: single structured call vs two calls.
+
+Gemini is replaced by a deterministic stub whose latency is a fixed round-trip cost plus
+a per-character cost on the prompt, so the comparison isolates the number and size of
+calls. The response cache is disabled.
+
+    python benchmarks/parse_benchmark.py --round-trip-ms 600 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config  # noqa: E402
+from ResumeParserAgent import PARSE_MODES, ResumeParserAgent  # noqa: E402
+
+SKILLS = ["Python", "SQL", "Docker", "Kubernetes", "PySpark", "AWS", "Airflow", "Git"]
+RESUME = "\n".join(
+    ["Jane Doe - Senior Data Engineer", "Skills: " + ", ".join(SKILLS)]
+    + [f"Built pipeline {i} processing {i * 10} GB/day with PySpark and Airflow." for i in range(120)]
+    + ["B.Sc. Computer Science, 2015"]
+).encode("utf-8")
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGemini:
+    """Deterministic stand-in for genai.GenerativeModel."""
+
+    def __init__(self, round_trip_s, per_char_s):
+        self.round_trip_s = round_trip_s
+        self.per_char_s = per_char_s
+        self.calls = 0
+
+    def generate_content(self, contents, generation_config=None):
+        prompt = contents[0]
+        self.calls += 1
+        time.sleep(self.round_trip_s + self.per_char_s * len(prompt))
+        if prompt.startswith("Extract a list of skills"):
+            return _Response(", ".join(SKILLS))
+        return _Response(json.dumps({
+            "summary": "Senior Data Engineer",
+            "skills": SKILLS,
+            "experience": [{"title": "Senior Data Engineer", "company": "Acme"}],
+            "education": [{"degree": "B.Sc. Computer Science", "year": 2015}],
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--round-trip-ms", type=float, default=600)
+    parser.add_argument("--per-char-us", type=float, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    stub = StubGemini(args.round_trip_ms / 1000, args.per_char_us / 1e6)
+    config.llm_client.cache = None
+    config.llm_client._model = stub
+
+    print(f"{'mode':<10}{'calls':>7}{'median ms':>11}{'skills':>8}")
+    for mode in PARSE_MODES:
+        agent = ResumeParserAgent(parse_mode=mode)
+        timings = []
+        stub.calls = 0
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            _, skills, _ = agent.parse_resume(RESUME, "resume.txt")
+            timings.append(time.perf_counter() - start)
+        print(f"{mode:<10}{stub.calls / args.repeat:>7.0f}{1000 * statistics.median(timings):>11.0f}"
+              f"{len(skills):>8}")
+
+
+if __name__ == "__main__":
+    main()
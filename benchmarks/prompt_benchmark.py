@@ -0,0 +1,121 @@
+"""Prompt sizes of the ATS, comparison and enhancement calls against the raw context they carry.
+
+Gemini is replaced by a stub that records every prompt, and the response cache is
+disabled. The "before" column counts the tokens of the inputs the prompts used to
+embed whole (the resume JSON indented, both resume versions, the full job description
+and examples); "after" is the prompt actually sent. Both use prompt_budget.count_tokens.
+Without --model, a bag-of-words stand-in replaces the sentence-transformers model.
+
+    python benchmarks/prompt_benchmark.py --jd-sentences 150 --budget 2000
+"""
+import argparse
+import json
+import os
+import sys
+import zlib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+import config  # noqa: E402
+import prompt_budget  # noqa: E402
+from ATSScoreAgent import ATSScoreAgent  # noqa: E402
+from crew_backend import ResumeOptimizationAgent  # noqa: E402
+from ResumeRAGAgent import ResumeRAGAgent  # noqa: E402
+
+SKILLS = ["Python", "SQL", "Airflow", "PySpark", "Kafka", "AWS", "Docker", "Terraform"]
+BOILERPLATE = [
+    "We are an equal opportunity employer and value diversity at our company.",
+    "Benefits include medical, dental and vision coverage from day one.",
+    "Enjoy a hybrid schedule with flexible hours and a generous home office budget.",
+    "Our offices have free snacks, a gym and bike storage.",
+    "We believe in a culture of ownership, curiosity and kindness.",
+]
+REQUIREMENTS = [f"You have production experience with {skill} at scale." for skill in SKILLS]
+
+
+class BagOfWords:
+    dimension = 384
+
+    def encode(self, sentences, **kwargs):
+        out = np.zeros((len(sentences), self.dimension), dtype="float32")
+        for row, sentence in enumerate(sentences):
+            for word in sentence.lower().replace(",", " ").replace(".", " ").split():
+                out[row, zlib.crc32(word.encode()) % self.dimension] += 1
+        return out
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class RecordingGemini:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        self.prompts.append(contents[0])
+        return _Response('{"improvement_suggestions": [], "detailed_analysis": ""}')
+
+
+def make_inputs(jd_sentences, resume_lines, rng):
+    job = [BOILERPLATE[i % len(BOILERPLATE)].replace("company", f"company ({i})") for i in range(jd_sentences)]
+    for requirement in REQUIREMENTS:
+        job.insert(int(rng.integers(len(job) + 1)), requirement)
+    resume_lines = [f"- Built pipeline {i} moving {10 * i} GB/day with {SKILLS[i % len(SKILLS)]}."
+                    for i in range(resume_lines)]
+    resume = "Jane Doe - Data Engineer\nSkills: " + ", ".join(SKILLS[:5]) + "\n" + "\n".join(resume_lines)
+    enhanced = "\n".join(line.replace("Built", "Designed and shipped") if i % 5 == 0 else line
+                         for i, line in enumerate(resume.splitlines()))
+    resume_json = {"name": "Jane Doe", "skills": SKILLS[:5], "summary": "", "certifications": [],
+                   "experience": [{"title": "Data Engineer", "company": "Acme", "highlights": resume_lines}]}
+    return " ".join(job), resume, enhanced, resume_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jd-sentences", type=int, default=150, help="boilerplate sentences in the job description")
+    parser.add_argument("--resume-lines", type=int, default=40)
+    parser.add_argument("--budget", type=int, default=config.PROMPT_TOKEN_BUDGET)
+    parser.add_argument("--model", action="store_true", help="use the configured embedding model")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.model:
+        config.embedding_model._model = BagOfWords()
+    prompt_budget.DEFAULT_TOKEN_BUDGET = args.budget
+    for module in ("ATSScoreAgent", "ResumeRAGAgent", "crew_backend"):
+        sys.modules[module].PROMPT_TOKEN_BUDGET = args.budget
+    stub = RecordingGemini()
+    config.llm_client._model = stub
+    config.llm_client.cache = None
+
+    job, resume, enhanced, resume_json = make_inputs(args.jd_sentences, args.resume_lines,
+                                                     np.random.default_rng(args.seed))
+    count = prompt_budget.count_tokens
+    ats = ATSScoreAgent(offline=False)
+    rag = ResumeRAGAgent()
+    calls = [
+        ("ats_narrative", lambda: ats.calculate_ats_score(resume_json, job),
+         count(json.dumps(resume_json, indent=2)) + count(job)),
+        ("ats_comparison", lambda: ats.compare_before_after(resume, enhanced, job),
+         count(resume) + count(enhanced) + count(job)),
+        ("explain_changes", lambda: rag.explain_changes(resume, enhanced, job),
+         count(resume) + count(enhanced) + count(job)),
+        ("optimize_resume", lambda: ResumeOptimizationAgent().optimize_resume(resume, job),
+         count(resume) + count(job)),
+    ]
+
+    print(f"job description {count(job)} tokens, resume {count(resume)} tokens, budget {args.budget}")
+    print(f"{'prompt':<18}{'before':>8}{'after':>8}{'saved':>8}")
+    for name, call, before in calls:
+        call()
+        after = count(stub.prompts[-1])
+        print(f"{name:<18}{before:>8}{after:>8}{1 - after / before:>8.0%}")
+    dropped = [sentence for sentence in REQUIREMENTS if any(sentence not in prompt for prompt in stub.prompts)]
+    print(f"requirement sentences missing from some prompt: {len(dropped)}/{len(REQUIREMENTS)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Dense vs BM25 vs hybrid (RRF) retrieval quality on literal skill queries, plus BM25 latency.
+
+The labelled set is synthetic: each resume belongs to a role and lists a few skills from
+that role's pool, and each query asks for two skills literally ("pyspark kubernetes").
+A resume is relevant when it mentions both. Without --model, a stand-in embedder gives
+every skill of a role nearly the same vector, which reproduces how sentence embeddings
+blur "Docker" and "Kubernetes" together; with --model the configured
+sentence-transformers model is used.
+
+    python benchmarks/retrieval_benchmark.py --docs 2000 --queries 200 --lexical-docs 100000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import zlib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")  # Measure encoding, not the cache
+import config  # noqa: E402
+from lexical_index import LexicalIndex  # noqa: E402
+from ResumeRAGAgent import RETRIEVAL_MODES, ResumeRAGAgent  # noqa: E402
+
+ROLES = {
+    "data engineer": ["pyspark", "airflow", "kafka", "snowflake", "dbt", "bigquery", "hadoop", "redshift"],
+    "devops engineer": ["kubernetes", "terraform", "docker", "ansible", "helm", "jenkins", "prometheus", "argocd"],
+    "frontend developer": ["react", "typescript", "vue", "angular", "webpack", "redux", "tailwind", "jest"],
+    "security analyst": ["soc2", "iso27001", "siem", "splunk", "pentesting", "nessus", "burp", "gdpr"],
+}
+FILLER = ("delivered projects with cross functional teams improved reliability owned roadmap "
+          "mentored engineers reduced costs drove adoption partnered with stakeholders").split()
+
+
+class RoleEmbedder:
+    """Bag of word vectors where each role's skills share one direction plus a little noise."""
+
+    def __init__(self, dimension=384, skill_noise=0.15, seed=0):
+        rng = np.random.default_rng(seed)
+        self.vectors = {}
+        for role, skills in ROLES.items():
+            centre = rng.standard_normal(dimension)
+            for word in role.split():
+                self.vectors[word] = rng.standard_normal(dimension)
+            for skill in skills:
+                self.vectors[skill] = centre + skill_noise * rng.standard_normal(dimension)
+        self.dimension = dimension
+
+    def _vector(self, word):
+        if word not in self.vectors:
+            self.vectors[word] = np.random.default_rng(zlib.crc32(word.encode())).standard_normal(self.dimension)
+        return self.vectors[word]
+
+    def encode(self, sentences, **kwargs):
+        return np.array([sum(self._vector(w) for w in s.lower().split()) for s in sentences], dtype="float32")
+
+
+def make_corpus(n_docs, rng):
+    docs, skill_sets = [], []
+    roles = list(ROLES)
+    for i in range(n_docs):
+        role = roles[i % len(roles)]
+        skills = list(rng.choice(ROLES[role], size=int(rng.integers(2, 5)), replace=False))
+        filler = " ".join(rng.choice(FILLER, size=30))
+        docs.append(f"Candidate {i}\nSummary\n{role} {filler}\nSkills: {', '.join(skills)}")
+        skill_sets.append(set(skills))
+    return docs, skill_sets
+
+
+def make_queries(n_queries, skill_sets, rng):
+    queries = []
+    roles = list(ROLES)
+    while len(queries) < n_queries:
+        pair = rng.choice(ROLES[roles[len(queries) % len(roles)]], size=2, replace=False)
+        relevant = {i for i, skills in enumerate(skill_sets) if set(pair) <= skills}
+        if relevant:
+            queries.append((" ".join(pair), relevant))
+    return queries
+
+
+def evaluate(agent, queries, mode, k):
+    recalls, reciprocal_ranks, seconds = [], [], []
+    for query, relevant in queries:
+        start = time.perf_counter()
+        results = agent.retrieve_similar(query, top_k=k, mode=mode)
+        seconds.append(time.perf_counter() - start)
+        found = [int(r["text"].split("\n")[0].split()[1]) for r in results]
+        recalls.append(len(relevant & set(found)) / min(k, len(relevant)))
+        reciprocal_ranks.append(next((1 / rank for rank, i in enumerate(found, 1) if i in relevant), 0.0))
+    return statistics.mean(recalls), statistics.mean(reciprocal_ranks), statistics.median(seconds)
+
+
+def lexical_latency(n_docs, n_queries, rng):
+    index = LexicalIndex()
+    docs, _ = make_corpus(n_docs, rng)
+    start = time.perf_counter()
+    index.add_many(docs)
+    build = time.perf_counter() - start
+    skills = [skill for pool in ROLES.values() for skill in pool]
+    timings = []
+    for _ in range(n_queries):
+        query = " ".join(rng.choice(skills, size=2, replace=False))
+        start = time.perf_counter()
+        index.search(query, 80)
+        timings.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(timings, [50, 99]) * 1e3
+    print(f"\nBM25 over {n_docs} passages: built in {build:.1f}s, search p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lexical-docs", type=int, default=100000, help="0 skips the latency run")
+    parser.add_argument("--model", action="store_true", help="use the configured embedding model")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if not args.model:
+        config.embedding_model._model = RoleEmbedder()
+    docs, skill_sets = make_corpus(args.docs, rng)
+    queries = make_queries(args.queries, skill_sets, rng)
+    agent = ResumeRAGAgent()
+    agent.add_many(docs, [{"type": "resume"}] * len(docs))
+
+    print(f"{len(docs)} resumes, {len(queries)} queries, k={args.k}")
+    print(f"{'mode':<10}{'recall@k':>10}{'MRR':>8}{'p50 ms':>9}")
+    for mode in ("dense",) + tuple(m for m in RETRIEVAL_MODES if m != "dense"):
+        recall, mrr, seconds = evaluate(agent, queries, mode, args.k)
+        print(f"{mode:<10}{recall:>10.3f}{mrr:>8.3f}{1000 * seconds:>9.2f}")
+
+    if args.lexical_docs:
+        lexical_latency(args.lexical_docs, args.queries, rng)
+
+
+if __name__ == "__main__":
+    main()
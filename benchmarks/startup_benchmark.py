@@ -0,0 +1,85 @@
+"""Startup benchmark: import-to-first-render time and peak RSS of a fresh worker.
+
+Each scenario runs in its own interpreter so module caches do not leak between runs:
+
+    legacy      imports the app modules and loads the SentenceTransformer twice at import
+                time, which is what config.py and crew_backend.py used to do
+    lazy        imports the app modules; the embedding model is not loaded yet
+    first_use   lazy import followed by the first encode (the cost moves here)
+    warm_up     lazy import with EMBEDDING_WARMUP=1 (model loads in a background thread)
+
+With --render the Streamlit script itself is executed once through AppTest, which is the
+closest thing to "first render" outside a browser. With a corpus at RAG_INDEX_PATH (see
+build_seed_index.py) that is a memory-map and an overlay; without one it includes seeding it.
+
+    python benchmarks/startup_benchmark.py --repeat 3 [--render]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+scenario = {scenario!r}
+start = time.perf_counter()
+if scenario == "legacy":
+    from sentence_transformers import SentenceTransformer
+    SentenceTransformer("all-MiniLM-L6-v2")
+    SentenceTransformer("all-MiniLM-L6-v2")
+import crew_backend, ResumeParserAgent, ATSScoreAgent, ResumeRAGAgent
+imported = time.perf_counter()
+if scenario == "first_use":
+    from config import embedding_model
+    embedding_model.encode("first query")
+if scenario == "render":
+    from streamlit.testing.v1 import AppTest
+    AppTest.from_file({app!r}, default_timeout=600).run()
+done = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "total_s": done - start,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def run_scenario(scenario, env_overrides=None):
+    env = dict(os.environ, **(env_overrides or {}))
+    code = CHILD.format(root=ROOT, scenario=scenario, app=os.path.join(ROOT, "app.py"))
+    out = subprocess.run([sys.executable, "-c", code], env=env, cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--render", action="store_true", help="also time one Streamlit AppTest run")
+    args = parser.parse_args()
+
+    scenarios = [
+        ("legacy", "legacy", {}),
+        ("lazy", "lazy", {}),
+        ("first_use", "first_use", {}),
+        ("warm_up", "lazy", {"EMBEDDING_WARMUP": "1"}),
+    ]
+    if args.render:
+        scenarios.append(("render", "render", {}))
+
+    print(f"{'scenario':<12}{'import s':>10}{'total s':>10}{'max RSS MB':>12}")
+    for label, scenario, env in scenarios:
+        runs = [run_scenario(scenario, env) for _ in range(args.repeat)]
+        print(f"{label:<12}"
+              f"{statistics.median(r['import_s'] for r in runs):>10.2f}"
+              f"{statistics.median(r['total_s'] for r in runs):>10.2f}"
+              f"{statistics.median(r['max_rss_mb'] for r in runs):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Build the seed corpus the app starts from, once, ahead of deployment.
+
+Documents are generated with Gemini, one job description and one matching resume per
+--titles entry (what ResumeRAGAgent.seed_with_sample_data does), and/or imported from
+JSONL files of {"text": ..., "metadata": {...}} records. They are embedded and saved
+with their passages and BM25 index to --index. The app memory-maps that directory once
+per process and gives each session an overlay of it, so a new session makes no Gemini or
+embedding calls before it renders.
+
+    python build_seed_index.py --titles "Software Engineer" "Data Scientist" --import extra.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+DEFAULT_TITLES = ("Software Engineer", "Data Scientist", "Project Manager")
+
+
+def read_jsonl(path):
+    """Yield (text, metadata) for every record with a non-empty text in a JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+                raise ValueError(f"{path}:{number}: expected an object with a \"text\" string")
+            if record["text"].strip():
+                yield record["text"], record.get("metadata") or {}
+
+
+def build(index_path, titles=DEFAULT_TITLES, imports=(), append=False, batch_size=None):
+    """Write the seed corpus to ``index_path``; returns the number of documents it holds."""
+    from ResumeRAGAgent import ResumeRAGAgent
+
+    if append and os.path.exists(index_path):
+        agent = ResumeRAGAgent.load(index_path)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        agent = ResumeRAGAgent()
+    if titles:
+        agent.seed_with_sample_data(list(titles))
+    for path in imports:
+        records = list(read_jsonl(path))
+        agent.add_many([text for text, _ in records], [metadata for _, metadata in records], batch_size=batch_size)
+    agent.save(index_path)
+    return sum(1 for doc_id in range(len(agent.store)) if doc_id in agent.store)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--index", default=None, help="index directory (default: RAG_INDEX_PATH)")
+    parser.add_argument("--titles", nargs="*", default=list(DEFAULT_TITLES),
+                        help="job titles to generate samples for (none to skip Gemini)")
+    parser.add_argument("--import", dest="imports", nargs="*", default=[], metavar="JSONL",
+                        help="JSONL files of {\"text\", \"metadata\"} records to add")
+    parser.add_argument("--append", action="store_true", help="add to an existing index instead of replacing it")
+    parser.add_argument("--batch-size", type=int, default=None, help="embedding batch size")
+    args = parser.parse_args(argv)
+
+    from config import RAG_INDEX_PATH
+
+    index_path = args.index or RAG_INDEX_PATH
+    start = time.perf_counter()
+    documents = build(index_path, args.titles, args.imports, args.append, args.batch_size)
+    print(f"Wrote {documents} documents to {index_path} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import re
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces; ~180 words of resume English stays under that
+MAX_CHUNK_WORDS = 180
+CHUNK_OVERLAP_WORDS = 30
+
+SECTION_ALIASES = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me"),
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history", "relevant experience"),
+    "skills": ("skills", "technical skills", "key skills", "core competencies", "competencies",
+               "technologies", "tools and technologies", "skills and tools"),
+    "education": ("education", "academic background", "education and training", "qualifications",
+                  "academic qualifications"),
+    "projects": ("projects", "key projects", "personal projects", "selected projects"),
+    "certifications": ("certifications", "certificates", "licenses and certifications", "awards",
+                       "achievements"),
+}
+_HEADING_SECTION = {alias: section for section, aliases in SECTION_ALIASES.items() for alias in aliases}
+_HEADING = re.compile(
+    r"^[#*\s]*(" + "|".join(sorted(map(re.escape, _HEADING_SECTION), key=len, reverse=True))
+    + r")[*\s]*(?:[:\-–—|]\s*(.*))?$",
+    re.IGNORECASE,
+)
+
+
+def split_sections(text):
+    """Split a resume into (section, text) pairs at recognised heading lines.
+
+    Text before the first heading (usually name and contact details) is labelled
+    ``"header"``. A heading followed by content on the same line, such as
+    ``"Skills: Python, SQL"``, starts the section with that content.
+    """
+    sections = []
+    current, lines = "header", []
+    for line in text.splitlines():
+        match = _HEADING.match(line.strip())
+        if match:
+            if any(part.strip() for part in lines):
+                sections.append((current, "\n".join(lines).strip()))
+            current = _HEADING_SECTION[" ".join(match.group(1).lower().split())]
+            lines = [match.group(2)] if match.group(2) else []
+        else:
+            lines.append(line)
+    if any(part.strip() for part in lines):
+        sections.append((current, "\n".join(lines).strip()))
+    return sections
+
+
+def _windows(body, max_words, overlap):
+    """Whole-line windows of at most ``max_words``; a longer line is cut between words."""
+    lines = []
+    for line in body.splitlines():
+        words = line.split()
+        for start in range(0, len(words), max_words):
+            lines.append(words[start:start + max_words])
+    window, size = [], 0
+    for words in lines:
+        if window and size + len(words) > max_words:
+            yield "\n".join(" ".join(line) for line in window)
+            while window and size + len(words) > max_words or size > overlap:
+                size -= len(window.pop(0))
+        window.append(words)
+        size += len(words)
+    if window:
+        yield "\n".join(" ".join(line) for line in window)
+
+
+def chunk_document(text, max_words=MAX_CHUNK_WORDS, overlap=CHUNK_OVERLAP_WORDS):
+    """Section-labelled passages of at most ``max_words`` words, as (section, text) pairs.
+
+    Longer sections are cut at line breaks into windows that repeat up to ``overlap``
+    words of trailing lines from the previous window.
+    """
+    chunks = []
+    for section, body in split_sections(text):
+        words = body.split()
+        if len(words) <= max_words:
+            chunks.append((section, body))
+        else:
+            chunks.extend((section, window) for window in _windows(body, max_words, overlap))
+    return chunks
@@ -1,8 +1,13 @@
 import os
-import faiss
 from dotenv import load_dotenv
 import google.generativeai as genai
-from sentence_transformers import SentenceTransformer
+from embedding_cache import EmbeddingCache
+from embeddings import EmbeddingProvider, EMBEDDING_DIM
+from http_client import HttpClient
+from index_factory import IndexConfig
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from vector_store import VectorStore
 
 # ✅ Load environment variables
 load_dotenv()
@@ -11,20 +16,78 @@ SERPER_API_KEY = os.getenv("SERPER_API_KEY")
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+# ✅ Search endpoints can be pointed at a local mock server
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/search")
+SERPAPI_URL = os.getenv("SERPAPI_URL", "https://serpapi.com/search")
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "3.05"))
+HTTP_READ_TIMEOUT_SECONDS = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "10"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_MAX_WORKERS = int(os.getenv("HTTP_MAX_WORKERS", "8"))
+JOB_SEARCH_CACHE_PATH = os.getenv("JOB_SEARCH_CACHE_PATH", "data/job_search_cache.sqlite")  # Empty disables
+JOB_SEARCH_CACHE_TTL_SECONDS = int(os.getenv("JOB_SEARCH_CACHE_TTL_SECONDS", str(6 * 3600)))
+JOB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("JOB_SEARCH_CACHE_MAX_ENTRIES", "5000"))
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "").lower() in ("1", "true", "yes")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache")  # Empty disables the cache
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+RAG_INDEX_PATH = os.getenv("RAG_INDEX_PATH", "data/rag_index")
+
+# ✅ FAISS index settings: exact search until RAG_INDEX_PROMOTE_AT documents, then RAG_INDEX_MODE
+INDEX_CONFIG = IndexConfig(
+    mode=os.getenv("RAG_INDEX_MODE", "hnsw"),
+    promote_at=int(os.getenv("RAG_INDEX_PROMOTE_AT", "50000")),
+    nprobe=int(os.getenv("RAG_INDEX_NPROBE", "16")),
+    ef_search=int(os.getenv("RAG_INDEX_EF_SEARCH", "64")),
+    refine_factor=int(os.getenv("RAG_INDEX_REFINE_FACTOR", "8")),
+)
+# ✅ Documents at least this cosine-similar to a stored one of the same type are merged into it ("off" disables)
+_near_duplicate_cosine = os.getenv("RAG_NEAR_DUPLICATE_COSINE", "0.98")
+RAG_NEAR_DUPLICATE_COSINE = None if _near_duplicate_cosine.lower() in ("", "off", "none") else float(_near_duplicate_cosine)
+
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-1.5-flash")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# ✅ Limits shared by all Gemini calls in this process; 0 disables a rate limit
+LLM_MAX_QPS = float(os.getenv("LLM_MAX_QPS", "5")) or None
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000")) or None
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+RESUME_PARSE_MODE = os.getenv("RESUME_PARSE_MODE", "single")  # "single" or "two_call"
+ATS_OFFLINE_SCORING = os.getenv("ATS_OFFLINE_SCORING", "").lower() in ("1", "true", "yes")
+# ✅ Estimated tokens per prompt; job descriptions and examples are cut to their most relevant sentences to fit
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2500"))
 
 # ✅ Configure Google Generative AI
 genai.configure(api_key=GOOGLE_API_KEY)
 
-# ✅ Load Sentence Transformer Model
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+# ✅ Shared rate-limited Gemini client with a persistent response cache
+llm_cache = LLMCache(LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS)
+llm_client = LLMClient(LLM_MODEL_NAME, cache=llm_cache, qps=LLM_MAX_QPS, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                       max_concurrency=LLM_MAX_CONCURRENCY, retries=LLM_MAX_RETRIES)
+
+# ✅ Shared pooled HTTP client for the job and resume search APIs
+http_client = HttpClient(timeout=(HTTP_CONNECT_TIMEOUT_SECONDS, HTTP_READ_TIMEOUT_SECONDS),
+                         retries=HTTP_MAX_RETRIES, max_workers=HTTP_MAX_WORKERS)
+
+# ✅ Shared Sentence Transformer Model (loaded lazily on first encode)
+embedding_cache = (EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_DIM, EMBEDDING_CACHE_MAX_ENTRIES)
+                   if EMBEDDING_CACHE_PATH else None)
+embedding_model = EmbeddingProvider(EMBEDDING_MODEL_NAME, EMBEDDING_DIM, batch_size=EMBEDDING_BATCH_SIZE,
+                                    cache=embedding_cache)
+if EMBEDDING_WARMUP:
+    embedding_model.warm_up(background=True)
 
 # ✅ Initialize FAISS Index
-EMBEDDING_DIM = 384  # Size of embeddings from all-MiniLM-L6-v2
-faiss_index = faiss.IndexFlatL2(EMBEDDING_DIM)
-document_store = []  # Stores text data
+vector_store = VectorStore(embedding_model, EMBEDDING_DIM, INDEX_CONFIG,
+                           near_duplicate_cosine=RAG_NEAR_DUPLICATE_COSINE)
 
 def add_to_faiss(text):
     """Adds text embeddings to FAISS index."""
-    embedding = embedding_model.encode(text).astype("float32").reshape(1, -1)
-    faiss_index.add(embedding)
-    document_store.append(text)
+    return vector_store.add(text)
+
+def add_many_to_faiss(texts, batch_size=None):
+    """Adds many texts to the FAISS index with batched encoding and a single add."""
+    return vector_store.add_many(texts, batch_size=batch_size)
@@ -1,98 +1,183 @@
+import itertools
+import json
 import os
-import requests
-import numpy as np
-import faiss
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 import google.generativeai as genai
-from sentence_transformers import SentenceTransformer
-from config import SERPER_API_KEY, SERPAPI_KEY, GOOGLE_API_KEY
+from config import (SERPER_API_KEY, SERPAPI_KEY, SERPER_URL, SERPAPI_URL, GOOGLE_API_KEY, EMBEDDING_DIM,
+                    INDEX_CONFIG, JOB_SEARCH_CACHE_MAX_ENTRIES, JOB_SEARCH_CACHE_PATH, JOB_SEARCH_CACHE_TTL_SECONDS,
+                    PROMPT_TOKEN_BUDGET, RAG_NEAR_DUPLICATE_COSINE, embedding_model, http_client, llm_client)
+from prompt_budget import PromptBuilder
+from sqlite_cache import SqliteTTLCache, content_key
+from vector_store import VectorStore
 
-# Load Embedding Model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+JOB_RESULTS_PER_QUERY = 5
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = frozenset({"gclid", "fbclid", "msclkid", "ref", "refid", "src", "trk", "trackingid"})
 
-# Initialize FAISS index
-dimension = 384  # Size of embeddings from all-MiniLM-L6-v2
-index = faiss.IndexFlatL2(dimension)
-document_store = []  # Stores actual text of resumes/job descriptions
+# Initialize FAISS index with the actual text of resumes/job descriptions
+vector_store = VectorStore(embedding_model, EMBEDDING_DIM, INDEX_CONFIG,
+                           near_duplicate_cosine=RAG_NEAR_DUPLICATE_COSINE)
+
+# Serper results by normalized query and location, shared across sessions and restarts
+job_search_cache = (SqliteTTLCache(JOB_SEARCH_CACHE_PATH, "job_search", JOB_SEARCH_CACHE_MAX_ENTRIES,
+                                   JOB_SEARCH_CACHE_TTL_SECONDS) if JOB_SEARCH_CACHE_PATH else None)
 
 # Configure Gemini AI
 genai.configure(api_key=GOOGLE_API_KEY)
 
+
+def normalize_query(text):
+    return " ".join((text or "").split()).casefold()
+
+
+def canonical_link(link):
+    """The link with case, "www.", fragments, trailing slashes and tracking parameters removed.
+
+    Returns None for a missing link.
+    """
+    if not link or link == "#":
+        return None
+    parts = urlsplit(link.strip())
+    host = (parts.hostname or "").lower()
+    host = host[4:] if host.startswith("www.") else host
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_"))
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme, host,
+                       parts.path.rstrip("/"), urlencode(query), ""))
+
+
+def dedupe_jobs(jobs, seen=None):
+    """Drop jobs whose canonical link (or, without a link, title and description) is in ``seen``.
+
+    ``seen`` is updated, so passing the same set across calls deduplicates across queries.
+    """
+    seen = set() if seen is None else seen
+    unique = []
+    for job in jobs:
+        key = canonical_link(job.get("link")) or (job.get("title"), job.get("description"))
+        if key not in seen:
+            seen.add(key)
+            unique.append(job)
+    return unique
+
 # 1️⃣ Job Search Agent
 class JobSearchAgent:
+    """Serper job search; results are cached for a TTL by normalized query and location
+    (see ``job_search_cache``) and deduplicated by canonical link."""
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else job_search_cache
+
     def search_jobs(self, search_query, location=""):
         """Searches for job postings using Google Serper API."""
-        url = "https://google.serper.dev/search"
-        headers = {"X-API-KEY": SERPER_API_KEY}
-
-        payload = {"q": f"{search_query} jobs in {location}", "num": 5}
         try:
-            response = requests.post(url, json=payload, headers=headers)
-            response_data = response.json()
-
-            job_results = []
-            if "organic" in response_data:
-                for result in response_data["organic"]:
-                    job_results.append({
-                        "title": result.get("title", "Job Posting"),
-                        "description": result.get("snippet", "No details available"),
-                        "link": result.get("link", "#")
-                    })
-            return job_results  # ✅ Now returns a list of dictionaries
-
+            return dedupe_jobs(self._search_jobs(search_query, location))
         except Exception as e:
             print(f"Error retrieving job descriptions: {e}")
             return []
 
+    def search_jobs_many(self, search_queries, locations=("",)):
+        """Search every query x location pair concurrently.
+
+        Returns {(query, location): job results}, in the order of the pairs. A posting
+        found by several pairs is only listed under the first; a pair whose search
+        failed maps to an empty list.
+        """
+        pairs = list(itertools.product(search_queries, locations))
+        # Pairs that normalize alike share one request
+        unique = {}
+        for query, location in pairs:
+            unique.setdefault((normalize_query(query), normalize_query(location)), (query, location))
+        fetched = dict(zip(unique, http_client.fan_out(lambda pair: self._search_jobs(*pair), unique.values())))
+        seen = set()
+        found = {}
+        for pair in pairs:
+            result = fetched[tuple(map(normalize_query, pair))]
+            if isinstance(result, Exception):
+                print(f"Error retrieving job descriptions for {pair}: {result}")
+                result = []
+            found[pair] = dedupe_jobs(result, seen)
+        return found
+
+    def _search_jobs(self, search_query, location):
+        key = content_key(query=normalize_query(search_query), location=normalize_query(location),
+                          num=JOB_RESULTS_PER_QUERY)
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            return json.loads(cached)
+
+        headers = {"X-API-KEY": SERPER_API_KEY}
+        payload = {"q": f"{search_query} jobs in {location}", "num": JOB_RESULTS_PER_QUERY}
+        response_data = http_client.post(SERPER_URL, json=payload, headers=headers, name="serper").json()
+
+        job_results = []
+        for result in response_data.get("organic", []):
+            job_results.append({
+                "title": result.get("title", "Job Posting"),
+                "description": result.get("snippet", "No details available"),
+                "link": result.get("link", "#")
+            })
+        if self.cache is not None:
+            self.cache.put(key, json.dumps(job_results, ensure_ascii=False))
+        return job_results  # ✅ Now returns a list of dictionaries
+
 # 2️⃣ Resume Search Agent
 class ResumeSearchAgent:
     def search_resumes(self, skill):
-        url = "https://serpapi.com/search"
+        resumes = self._search_resumes(skill)
+
+        # Store resumes in FAISS
+        vector_store.add_many(resumes, [{"type": "resume"} for _ in resumes])
+
+        return resumes
+
+    def search_resumes_many(self, skills):
+        """Search several skills concurrently and index all found resumes in one batch.
+
+        Returns {skill: resumes}; a skill whose search failed maps to an empty list.
+        """
+        skills = list(skills)
+        results = http_client.fan_out(self._search_resumes, skills)
+        found = {}
+        for skill, result in zip(skills, results):
+            if isinstance(result, Exception):
+                print(f"Error retrieving resumes for {skill!r}: {result}")
+                result = []
+            found[skill] = result
+        resumes = [resume for result in found.values() for resume in result]
+        vector_store.add_many(resumes, [{"type": "resume"} for _ in resumes])
+        return found
+
+    def _search_resumes(self, skill):
         params = {
             "api_key": SERPAPI_KEY,
             "engine": "google",
             "q": f"resume site:github.com {skill}",
             "num": 5
         }
-        response = requests.get(url, params=params)
-        resumes = [result["snippet"] for result in response.json()["organic"]]
-
-        # Store resumes in FAISS
-        for resume in resumes:
-            embedding = model.encode(resume).astype('float32').reshape(1, -1)
-            index.add(embedding)
-            document_store.append({"type": "resume", "text": resume})
-
-        return resumes
+        response = http_client.get(SERPAPI_URL, params=params, name="serpapi")
+        return [result["snippet"] for result in response.json()["organic"]]
 
 # 3️⃣ Resume Retrieval Agent
 class ResumeRetrievalAgent:
     def retrieve_top_resumes(self, job_description, top_k=3):
-        query_embedding = model.encode(job_description).astype('float32').reshape(1, -1)
-        distances, indices = index.search(query_embedding, top_k)
-        
-        # Filter only resume documents
-        retrieved_docs = []
-        for idx in indices[0]:
-            if idx < len(document_store):
-                doc = document_store[idx]
-                if doc["type"] == "resume":
-                    retrieved_docs.append(doc["text"])
-                    
-        # If we don't have enough resumes, just return what we have
-        return retrieved_docs[:top_k]
+        # Search only resume documents
+        results = vector_store.search(job_description, top_k, where={"type": "resume"})
+        return [doc["text"] for doc, _ in results]
 
 # 4️⃣ Resume Optimization Agent
 class ResumeOptimizationAgent:
     def optimize_resume(self, resume_text, job_description):
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        prompt = f"""
-        You are an AI that optimizes resumes for job descriptions.
-        Job Description: {job_description}
-        
-        Candidate Resume:
-        {resume_text}
-        
-        Improve the resume by aligning it with the job description.
-        """
-        response = model.generate_content([prompt])
-        return response.text
\ No newline at end of file
+        return llm_client.generate(self._optimization_prompt(resume_text, job_description))
+
+    def optimize_resume_stream(self, resume_text, job_description):
+        """Streaming variant of optimize_resume; yields text chunks as they arrive."""
+        return llm_client.generate_stream(self._optimization_prompt(resume_text, job_description))
+
+    def _optimization_prompt(self, resume_text, job_description):
+        return (PromptBuilder("optimize_resume", PROMPT_TOKEN_BUDGET, embedding_model)
+                .add("You are an AI that optimizes resumes for job descriptions.")
+                .section("Job Description", job_description, query=resume_text)
+                .section("Candidate Resume", resume_text)
+                .add("Improve the resume by aligning it with the job description.")
+                .build())
\ No newline at end of file
@@ -1,11 +1,10 @@
-import requests
-import faiss
-import numpy as np
-from sentence_transformers import SentenceTransformer
 from crewai import Agent, Task, Crew
 import google.generativeai as genai
 from dotenv import load_dotenv
 import os
+from config import (EMBEDDING_DIM, INDEX_CONFIG, RAG_NEAR_DUPLICATE_COSINE, SERPAPI_URL, SERPER_URL, embedding_model,
+                    http_client, llm_client)
+from vector_store import VectorStore
 
 # Load API Keys
 load_dotenv()
@@ -16,64 +15,50 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 # Initialize Google Gemini
 genai.configure(api_key=GOOGLE_API_KEY)
 
-# Load Embedding Model
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
 # FAISS Vector Storage
-dimension = 384  # Size of embeddings
-index = faiss.IndexFlatL2(dimension)
-document_store = []  # Stores resumes/job descriptions with indices
+vector_store = VectorStore(embedding_model, EMBEDDING_DIM, INDEX_CONFIG,
+                           near_duplicate_cosine=RAG_NEAR_DUPLICATE_COSINE)  # Stores resumes/job descriptions with indices
 
 # 1️⃣ Job Search Agent (Collects job descriptions)
 class JobSearchAgent(Agent):
     def search_jobs(self, job_title, location):
-        url = "https://google.serper.dev/search"
         headers = {"X-API-KEY": SERPER_API_KEY}
         payload = {"q": f"{job_title} jobs in {location}", "num": 5}
-        response = requests.post(url, json=payload, headers=headers)
+        response = http_client.post(SERPER_URL, json=payload, headers=headers, name="serper")
         job_descriptions = [result["snippet"] for result in response.json()["organic"]]
         
         # Store job descriptions in FAISS
-        for job in job_descriptions:
-            embedding = model.encode([job])
-            index.add(np.array(embedding))
-            document_store.append(job)
+        vector_store.add_many(job_descriptions, [{"type": "job_description"} for _ in job_descriptions])
         
         return job_descriptions
 
 # 2️⃣ Resume Search Agent (Finds resumes on GitHub)
 class ResumeSearchAgent(Agent):
     def search_resumes(self, skill):
-        url = "https://serpapi.com/search"
         params = {
             "api_key": SERPAPI_KEY,
             "engine": "google",
             "q": f"resume site:github.com {skill}",
             "num": 5
         }
-        response = requests.get(url, params=params)
+        response = http_client.get(SERPAPI_URL, params=params, name="serpapi")
         resumes = [result["snippet"] for result in response.json()["organic"]]
 
         # Store resumes in FAISS
-        for resume in resumes:
-            embedding = model.encode([resume])
-            index.add(np.array(embedding))
-            document_store.append(resume)
+        vector_store.add_many(resumes, [{"type": "resume"} for _ in resumes])
         
         return resumes
 
 # 3️⃣ Resume Retrieval Agent (Finds best resumes for a job)
 class ResumeRetrievalAgent(Agent):
     def retrieve_top_resumes(self, job_description, top_k=3):
-        query_embedding = model.encode([job_description])
-        distances, indices = index.search(np.array(query_embedding), top_k)
-        retrieved_resumes = [document_store[idx] for idx in indices[0]]
+        results = vector_store.search(job_description, top_k, where={"type": "resume"})
+        retrieved_resumes = [doc["text"] for doc, _ in results]
         return retrieved_resumes
 
 # 4️⃣ Resume Optimization Agent (Uses Gemini to enhance resumes)
 class ResumeOptimizationAgent(Agent):
     def optimize_resume(self, resume_text, job_description):
-        model = genai.GenerativeModel('gemini-1.5-flash')
         prompt = f"""
         You are an AI that optimizes resumes for job descriptions.
         Job Description: {job_description}
@@ -83,8 +68,7 @@ class ResumeOptimizationAgent(Agent):
         
         Improve the resume by aligning it with the job description.
         """
-        response = model.generate_content([prompt])
-        return response.text
+        return llm_client.generate(prompt)
 
 # Instantiate Agents
 job_agent = JobSearchAgent()
@@ -0,0 +1,109 @@
+import hashlib
+import numpy as np
+import metrics
+
+DIGEST_SIZE = 16
+REMOVED = bytes(DIGEST_SIZE)  # Digest recorded for a removed document
+DEFAULT_NEAR_DUPLICATE_COSINE = 0.98
+NEAR_DUPLICATE_CANDIDATES = 4
+
+
+def content_hash(text, kind=None):
+    """Digest of ``text`` with case and whitespace normalized, scoped to a document kind."""
+    normalized = " ".join(text.split()).casefold()
+    return hashlib.blake2b(f"{kind or ''}\0{normalized}".encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+class Deduplicator:
+    """Detects documents a VectorStore already holds.
+
+    Exact duplicates are found in O(1) from a content hash, kept in document id order so
+    it can be saved next to the index. Near-duplicates are found from the embeddings the
+    store computes anyway: a new document whose cosine similarity to an existing one of
+    the same kind (metadata ``type``) reaches ``near_duplicate_cosine`` is merged into it,
+    meaning the existing id is returned instead of adding a row. ``None`` disables this.
+    """
+
+    def __init__(self, near_duplicate_cosine=DEFAULT_NEAR_DUPLICATE_COSINE, name="vector_store"):
+        self.near_duplicate_cosine = near_duplicate_cosine
+        self.name = name
+        self._ids = {}  # digest -> first document id with that content
+        self._digests = []  # Indexed by document id
+        self.skipped = 0
+        self.merged = 0
+
+    def __len__(self):
+        return len(self._digests)
+
+    def get(self, digest):
+        return self._ids.get(digest)
+
+    def add(self, digest):
+        """Record the digest of the next document id."""
+        if digest != REMOVED:
+            self._ids.setdefault(digest, len(self._digests))
+        self._digests.append(digest)
+
+    def replace(self, doc_id, digest=None):
+        """Record new content for document ``doc_id``, or its removal when ``digest`` is None."""
+        old = self._digests[doc_id]
+        if self._ids.get(old) == doc_id:
+            del self._ids[old]
+        self._digests[doc_id] = digest or REMOVED
+        if digest:
+            self._ids.setdefault(digest, doc_id)
+
+    def count_skipped(self, n=1):
+        self.skipped += n
+        metrics.counter(f"{self.name}.duplicates_skipped").inc(n)
+
+    def count_merged(self, n=1):
+        self.merged += n
+        metrics.counter(f"{self.name}.near_duplicates_merged").inc(n)
+
+    def near_duplicates(self, nearest, embeddings, kinds, kind_of):
+        """For each embedding, the id it duplicates or None.
+
+        Matches are looked for among the nearest stored documents, which
+        ``nearest(embeddings, k)`` returns as (cosine similarities, document ids) arrays
+        (``kind_of(id)`` gives a stored document's kind), and among earlier rows of the
+        same batch, whose ids are returned as ``-1 - row``.
+        """
+        matches = [None] * len(embeddings)
+        threshold = self.near_duplicate_cosine
+        if threshold is None or not len(embeddings):
+            return matches
+
+        similarities, neighbours = nearest(embeddings, NEAR_DUPLICATE_CANDIDATES)
+        if len(neighbours):
+            for row, (cosines, ids) in enumerate(zip(similarities, neighbours)):
+                for cosine, doc_id in zip(cosines, ids):
+                    if doc_id >= 0 and cosine >= threshold and kind_of(int(doc_id)) == kinds[row]:
+                        matches[row] = int(doc_id)
+                        break
+
+        batch_cosines = embeddings @ embeddings.T
+        for row in range(1, len(embeddings)):
+            if matches[row] is not None:
+                continue
+            for earlier in range(row):
+                if (matches[earlier] is None and kinds[earlier] == kinds[row]
+                        and batch_cosines[row, earlier] >= threshold):
+                    matches[row] = -1 - earlier
+                    break
+        return matches
+
+    def save(self, path):
+        digests = np.frombuffer(b"".join(self._digests), dtype=np.uint8).reshape(-1, DIGEST_SIZE)
+        np.save(path, digests)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        dedup = cls(**kwargs)
+        for row in np.load(path):
+            dedup.add(row.tobytes())
+        return dedup
+
+    def stats(self):
+        return {"documents": len(self), "duplicates_skipped": self.skipped,
+                "near_duplicates_merged": self.merged}
@@ -0,0 +1,259 @@
+import array
+import json
+import mmap
+import os
+import numpy as np
+
+HEADER_FILE = "documents.json"
+TEXT_FILE = "documents.text.bin"
+TEXT_OFFSETS_FILE = "documents.text_offsets.npy"
+CODES_FILE = "documents.codes.npy"
+EXTRA_FILE = "documents.extra.bin"
+EXTRA_OFFSETS_FILE = "documents.extra_offsets.npy"
+FORMAT_NAME = "resume-rag-documents"
+FORMAT_VERSION = 2
+
+
+def read_header(directory):
+    with open(os.path.join(directory, HEADER_FILE), encoding="utf-8") as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT_NAME:
+        raise ValueError(f"{directory} does not contain a document store")
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported document store version {header.get('version')} "
+                         f"(expected {FORMAT_VERSION})")
+    return header
+
+
+class Document:
+    """One stored document. Supports ``doc["text"]`` and ``doc["metadata"]`` like the dicts it
+    replaces; both are decoded from the store on first access."""
+
+    __slots__ = ("id", "_store", "_text", "_metadata")
+
+    def __init__(self, store, doc_id):
+        self.id = doc_id
+        self._store = store
+        self._text = None
+        self._metadata = None
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = self._store._read_text(self.id)
+        return self._text
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            self._metadata = self._store._read_metadata(self.id)
+        return self._metadata
+
+    def load(self):
+        """Decode the text and metadata now rather than on first access; returns the document."""
+        if self._text is None:
+            self._text = self._store._read_text(self.id)
+        if self._metadata is None:
+            self._metadata = self._store._read_metadata(self.id)
+        return self
+
+    def __getitem__(self, key):
+        if key == "text":
+            return self.text
+        if key == "metadata":
+            return self.metadata
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in ("text", "metadata") else default
+
+    def __repr__(self):
+        return f"Document({self.id}, {self.text[:40]!r}, {self.metadata!r})"
+
+
+def _map_file(path):
+    if not os.path.getsize(path):
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ColumnarDocuments:
+    """Documents stored column-wise instead of as a list of dicts.
+
+    Texts are UTF-8 in one contiguous buffer addressed by an offset array. Values of the
+    ``categorical_fields`` (the metadata filter fields) are interned per field and stored
+    as an int32 code per document, -1 when absent; any other metadata is kept as a
+    compact JSON blob in a second buffer. Indexing by document id returns a ``Document``.
+    Saved columns are memory-mapped on load and documents appended afterwards go to
+    in-memory tails until the next save; documents replaced since are held as objects
+    and written into the columns on save.
+    """
+
+    def __init__(self, categorical_fields=()):
+        self.fields = tuple(categorical_fields)
+        self.header = {}
+        self._categories = {field: [] for field in self.fields}
+        self._codes = {field: {} for field in self.fields}  # field -> {(type, value): code}
+        self._base_count = 0
+        self._base = None  # (text, text offsets, codes, extra, extra offsets) from disk
+        self._text = bytearray()
+        self._text_offsets = array.array("Q", [0])
+        self._row_codes = array.array("i")
+        self._extra = bytearray()
+        self._extra_offsets = array.array("Q", [0])
+        self._replaced = {}  # id -> (text, metadata) of documents changed since they were added
+
+    def __len__(self):
+        return self._base_count + len(self._text_offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("document index out of range")
+        return Document(self, i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Document(self, i)
+
+    def _code(self, field, value):
+        key = (type(value), value)
+        code = self._codes[field].get(key)
+        if code is None:
+            code = self._codes[field][key] = len(self._categories[field])
+            self._categories[field].append(value)
+        return code
+
+    def add(self, text, metadata=None):
+        """Append a document; returns its id."""
+        extra = {}
+        codes = []
+        metadata = metadata or {}
+        for field in self.fields:
+            value = metadata.get(field)
+            if isinstance(value, (str, int, float, bool)):
+                codes.append(self._code(field, value))
+            else:
+                codes.append(-1)
+                if field in metadata:
+                    extra[field] = value
+        extra.update((key, value) for key, value in metadata.items() if key not in self._codes)
+        extra = json.dumps(extra, ensure_ascii=False, separators=(",", ":")).encode("utf-8") if extra else b""
+        return self._append_row(text.encode("utf-8"), codes, extra)
+
+    def _append_row(self, text, codes, extra):
+        self._text += text
+        self._text_offsets.append(len(self._text))
+        self._row_codes.extend(codes)
+        self._extra += extra
+        self._extra_offsets.append(len(self._extra))
+        return len(self) - 1
+
+    def replace(self, i, text, metadata=None):
+        """Give document ``i`` new text and metadata, keeping its id."""
+        self[i]  # Bounds check
+        self._replaced[i] = (text, dict(metadata or {}))
+
+    def _read_text(self, i):
+        if i in self._replaced:
+            return self._replaced[i][0]
+        if i < self._base_count:
+            text, offsets = self._base[0], self._base[1]
+        else:
+            text, offsets, i = self._text, self._text_offsets, i - self._base_count
+        return bytes(text[offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def _read_metadata(self, i):
+        if i in self._replaced:
+            return dict(self._replaced[i][1])
+        if i < self._base_count:
+            codes, extra, offsets = self._base[2][i], self._base[3], self._base[4]
+        else:
+            i -= self._base_count
+            width = len(self.fields)
+            codes = self._row_codes[i * width:(i + 1) * width]
+            extra, offsets = self._extra, self._extra_offsets
+        metadata = {field: self._categories[field][code] for field, code in zip(self.fields, codes) if code >= 0}
+        start, end = offsets[i], offsets[i + 1]
+        if end > start:
+            metadata.update(json.loads(bytes(extra[start:end])))
+        return metadata
+
+    def _raw_row(self, i):
+        """(text bytes, codes, extra bytes) of a document that has not been replaced."""
+        if i < self._base_count:
+            text, text_offsets, codes, extra, extra_offsets = self._base
+            codes = codes[i].tolist()
+        else:
+            text, text_offsets, extra, extra_offsets = self._text, self._text_offsets, self._extra, self._extra_offsets
+            i -= self._base_count
+            width = len(self.fields)
+            codes = self._row_codes[i * width:(i + 1) * width]
+        return (bytes(text[text_offsets[i]:text_offsets[i + 1]]), codes,
+                bytes(extra[extra_offsets[i]:extra_offsets[i + 1]]))
+
+    def _compacted(self):
+        """An in-memory copy with replaced documents written into the columns."""
+        documents = ColumnarDocuments(self.fields)
+        documents._categories = {field: list(values) for field, values in self._categories.items()}
+        documents._codes = {field: dict(codes) for field, codes in self._codes.items()}
+        for i in range(len(self)):
+            if i in self._replaced:
+                documents.add(*self._replaced[i])
+            else:
+                documents._append_row(*self._raw_row(i))
+        return documents
+
+    def save(self, directory, **header):
+        if self._replaced:
+            return self._compacted().save(directory, **header)
+        tail_count = len(self._text_offsets) - 1
+        tail_codes = np.frombuffer(self._row_codes, dtype=np.int32).reshape(tail_count, len(self.fields))
+        tail_text_offsets = np.asarray(self._text_offsets, dtype=np.uint64)
+        tail_extra_offsets = np.asarray(self._extra_offsets, dtype=np.uint64)
+        if self._base is None:
+            text_parts, extra_parts = [self._text], [self._extra]
+            text_offsets, codes, extra_offsets = tail_text_offsets, tail_codes, tail_extra_offsets
+        else:
+            base_text, base_text_offsets, base_codes, base_extra, base_extra_offsets = self._base
+            text_parts, extra_parts = [base_text, self._text], [base_extra, self._extra]
+            text_offsets = np.concatenate([base_text_offsets, tail_text_offsets[1:] + base_text_offsets[-1]])
+            codes = np.concatenate([base_codes, tail_codes])
+            extra_offsets = np.concatenate([base_extra_offsets, tail_extra_offsets[1:] + base_extra_offsets[-1]])
+
+        header = {"format": FORMAT_NAME, "version": FORMAT_VERSION, "count": len(self),
+                  **header, "fields": list(self.fields), "categories": self._categories}
+        for name, parts in ((TEXT_FILE, text_parts), (EXTRA_FILE, extra_parts)):
+            with open(os.path.join(directory, name), "wb") as f:
+                for part in parts:
+                    f.write(part)
+        np.save(os.path.join(directory, TEXT_OFFSETS_FILE), text_offsets)
+        np.save(os.path.join(directory, CODES_FILE), codes)
+        np.save(os.path.join(directory, EXTRA_OFFSETS_FILE), extra_offsets)
+        # Written last: a directory with a header has all of its columns
+        with open(os.path.join(directory, HEADER_FILE), "w", encoding="utf-8") as f:
+            json.dump(header, f, ensure_ascii=False)
+        return header
+
+    @classmethod
+    def load(cls, directory):
+        """Open a store written by ``save``, memory-mapping its columns."""
+        header = read_header(directory)
+        documents = cls(header["fields"])
+        documents.header = header
+        for field, values in header["categories"].items():
+            documents._categories[field] = values
+            documents._codes[field] = {(type(value), value): code for code, value in enumerate(values)}
+        documents._base = (
+            _map_file(os.path.join(directory, TEXT_FILE)),
+            np.load(os.path.join(directory, TEXT_OFFSETS_FILE), mmap_mode="r"),
+            np.load(os.path.join(directory, CODES_FILE), mmap_mode="r"),
+            _map_file(os.path.join(directory, EXTRA_FILE)),
+            np.load(os.path.join(directory, EXTRA_OFFSETS_FILE), mmap_mode="r"),
+        )
+        documents._base_count = len(documents._base[1]) - 1
+        if documents._base_count != header["count"]:
+            raise ValueError(f"Document store in {directory} is truncated")
+        return documents
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+import metrics
+
+KEY_SIZE = 16
+_SQLITE_MAX_PARAMS = 500
+
+
+def embedding_key(model_name, text):
+    return hashlib.blake2b(f"{model_name}\0{text}".encode("utf-8"), digest_size=KEY_SIZE).digest()
+
+
+class EmbeddingCache:
+    """Persistent embedding cache shared by every process that opens the same directory.
+
+    Vectors live in a fixed-size memory-mapped float32 file (``vectors.f32``, one row per
+    entry) and an SQLite table maps each text hash to its row and last access time. When
+    all ``max_entries`` rows are in use the least recently used ones are reused. Writers
+    serialize on the SQLite write lock; a parallel ``keys.bin`` map records which key each
+    row currently holds, so a reader that races with a row being reused sees a miss rather
+    than another text's vector. Hits, misses, evictions and the encode time saved are
+    reported through the metrics registry under ``<name>.*``.
+    """
+
+    def __init__(self, directory, dimension, max_entries=100000, name="embedding_cache",
+                 clock=time.time):
+        os.makedirs(directory, exist_ok=True)
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite"), timeout=30,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY, row INTEGER NOT NULL UNIQUE, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS layout (dimension INTEGER, max_entries INTEGER)")
+        self._open_arrays(directory)
+        self.hits = metrics.counter(f"{name}.hits")
+        self.misses = metrics.counter(f"{name}.misses")
+        self.evictions = metrics.counter(f"{name}.evictions")
+        self.saved_seconds = metrics.counter(f"{name}.saved_seconds")
+
+    def _open_arrays(self, directory):
+        vectors_path = os.path.join(directory, "vectors.f32")
+        keys_path = os.path.join(directory, "keys.bin")
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            layout = self._conn.execute("SELECT dimension, max_entries FROM layout").fetchone()
+            if layout != (self.dimension, self.max_entries) or not os.path.exists(vectors_path):
+                # A different model or size invalidates every row, so start over
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.execute("DELETE FROM layout")
+                self._conn.execute("INSERT INTO layout VALUES (?, ?)", (self.dimension, self.max_entries))
+                for path, row_bytes in ((vectors_path, 4 * self.dimension), (keys_path, KEY_SIZE)):
+                    with open(path, "wb") as f:
+                        f.truncate(self.max_entries * row_bytes)  # Sparse until rows are written
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._vectors = np.memmap(vectors_path, dtype="float32", mode="r+",
+                                  shape=(self.max_entries, self.dimension))
+        self._keys = np.memmap(keys_path, dtype=np.uint8, mode="r+", shape=(self.max_entries, KEY_SIZE))
+
+    def get_many(self, keys):
+        """Return {key: vector} for the keys that are cached, refreshing their LRU position."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _SQLITE_MAX_PARAMS):
+                batch = keys[start:start + _SQLITE_MAX_PARAMS]
+                rows = self._conn.execute(
+                    f"SELECT key, row FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch).fetchall()
+                for key, row in rows:
+                    vector = np.array(self._vectors[row])
+                    if self._keys[row].tobytes() == key:  # Checked after the copy, see class docstring
+                        found[key] = vector
+            if found:
+                now = self._clock()
+                self._conn.executemany("UPDATE embeddings SET accessed = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+        self.hits.inc(len(found))
+        self.misses.inc(len(keys) - len(found))
+        return found
+
+    def put_many(self, keys, vectors):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._put_locked(keys, vectors)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _put_locked(self, keys, vectors):
+        items = {}
+        for key, vector in zip(keys, vectors):
+            items[key] = vector
+        for start in range(0, len(items), _SQLITE_MAX_PARAMS):
+            batch = list(items)[start:start + _SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            for (key,) in self._conn.execute(f"SELECT key FROM embeddings WHERE key IN ({placeholders})", batch):
+                del items[key]  # Another process cached it meanwhile
+        if not items:
+            return
+        items = list(items.items())[-self.max_entries:]
+
+        used = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        rows = list(range(used, min(self.max_entries, used + len(items))))
+        overflow = len(items) - len(rows)
+        if overflow > 0:
+            evicted = self._conn.execute(
+                "SELECT key, row FROM embeddings ORDER BY accessed LIMIT ?", (overflow,)).fetchall()
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", [(key,) for key, _ in evicted])
+            rows.extend(row for _, row in evicted)
+            self.evictions.inc(overflow)
+
+        now = self._clock()
+        for (key, vector), row in zip(items, rows):
+            self._keys[row] = 0
+            self._vectors[row] = vector
+            self._keys[row] = np.frombuffer(key, dtype=np.uint8)
+        self._conn.executemany("INSERT INTO embeddings (key, row, accessed) VALUES (?, ?, ?)",
+                               [(key, row, now) for (key, _), row in zip(items, rows)])
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._keys[:] = 0
+
+    def stats(self):
+        lookups = self.hits.value + self.misses.value
+        return {
+            "entries": len(self),
+            "hits": self.hits.value,
+            "misses": self.misses.value,
+            "evictions": self.evictions.value,
+            "hit_rate": self.hits.value / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds.value,
+        }
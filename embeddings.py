@@ -0,0 +1,89 @@
+import threading
+import time
+import numpy as np
+from embedding_cache import embedding_key
+
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384  # Size of embeddings from all-MiniLM-L6-v2
+DEFAULT_BATCH_SIZE = 64
+
+
+def _load_sentence_transformer(model_name):
+    # Importing sentence_transformers pulls in torch, so it is deferred until the model is needed
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+class EmbeddingProvider:
+    """Process-wide embedding model that is only loaded on the first encode.
+
+    With an EmbeddingCache, ``embed`` only encodes texts the cache has not seen, so the
+    model is not even loaded when every text is a hit.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, dimension=EMBEDDING_DIM, loader=None,
+                 batch_size=DEFAULT_BATCH_SIZE, cache=None):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.batch_size = batch_size
+        self.cache = cache
+        self._loader = loader or _load_sentence_transformer
+        self._model = None
+        self._lock = threading.Lock()
+        self._seconds_per_text = None  # Latest measured encode cost, to estimate time saved by hits
+
+    @property
+    def is_loaded(self):
+        return self._model is not None
+
+    @property
+    def model(self):
+        """The underlying SentenceTransformer, loaded once even under concurrent first use."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._loader(self.model_name)
+        return self._model
+
+    def encode(self, sentences, **kwargs):
+        """Same call signature as SentenceTransformer.encode."""
+        return self.model.encode(sentences, **kwargs)
+
+    def embed(self, texts, batch_size=None):
+        """Encode texts in batches into a float32 matrix with unit-length rows."""
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.dimension), dtype="float32")
+        if self.cache is None:
+            return self._embed(texts, batch_size)
+
+        keys = [embedding_key(self.model_name, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            start = time.perf_counter()
+            embeddings = self._embed(list(missing.values()), batch_size)
+            self._seconds_per_text = (time.perf_counter() - start) / len(missing)
+            self.cache.put_many(list(missing), embeddings)
+            vectors.update(zip(missing, embeddings))
+        hits = sum(1 for key in keys if key not in missing)
+        if hits and self._seconds_per_text is not None:
+            self.cache.saved_seconds.inc(hits * self._seconds_per_text)
+        return np.stack([vectors[key] for key in keys])
+
+    def _embed(self, texts, batch_size):
+        embeddings = self.encode(texts, batch_size=batch_size or self.batch_size,
+                                 convert_to_numpy=True, show_progress_bar=False)
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32").reshape(len(texts), -1)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        np.divide(embeddings, np.maximum(norms, 1e-12), out=embeddings)
+        return embeddings
+
+    def warm_up(self, background=False):
+        """Load the model ahead of the first real request, optionally in a daemon thread."""
+        if background:
+            thread = threading.Thread(target=self.warm_up, name="embedding-warm-up", daemon=True)
+            thread.start()
+            return thread
+        self.encode("warm up")
+        return None
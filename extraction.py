@@ -0,0 +1,219 @@
+import contextlib
+import io
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import docx
+import PyPDF2
+import metrics
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+PAGES_PER_TASK = 16
+
+
+def _pdf_page_texts(file_bytes, start=0, end=None):
+    """Text of pages [start, end), extracting each page exactly once; also returns the page count."""
+    reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
+    page_count = len(reader.pages)
+    texts = []
+    for i in range(start, min(page_count, end if end is not None else page_count)):
+        text = reader.pages[i].extract_text()
+        if text:
+            texts.append(text)
+    return texts, page_count
+
+
+def _extract(file_bytes, filename):
+    filename = filename.lower()
+    if filename.endswith(".pdf"):
+        return "\n".join(_pdf_page_texts(file_bytes)[0])
+    if filename.endswith(".docx"):
+        doc = docx.Document(io.BytesIO(file_bytes))
+        return "\n".join([para.text for para in doc.paragraphs])
+    if filename.endswith(".txt"):
+        return file_bytes.decode("utf-8")
+    return ""
+
+
+def extract_text(file_bytes, filename):
+    """Extracts text from PDFs, DOCX, or TXT files."""
+    try:
+        return _extract(file_bytes, filename)
+    except Exception as e:
+        return f"Error extracting text: {e}"
+
+
+class _DeadlineExceeded(BaseException):
+    """Not an Exception, so parser code that catches Exception cannot swallow it."""
+
+
+@contextlib.contextmanager
+def _time_limit(seconds):
+    """Raise TimeoutError out of the block after ``seconds`` (Unix only; a no-op elsewhere)."""
+    if not seconds or not hasattr(signal, "setitimer"):
+        yield
+        return
+
+    def on_timeout(signum, frame):
+        raise _DeadlineExceeded()
+
+    previous = signal.signal(signal.SIGALRM, on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    except _DeadlineExceeded:
+        raise TimeoutError(f"extraction took longer than {seconds}s") from None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _extract_task(path, start, end, timeout):
+    """Worker entry point: one file, or one page range of a PDF."""
+    began = time.perf_counter()
+    page_count = None
+    with _time_limit(timeout):
+        with open(path, "rb") as f:
+            file_bytes = f.read()
+        if path.lower().endswith(".pdf"):
+            texts, page_count = _pdf_page_texts(file_bytes, start, end)
+            text = "\n".join(texts)
+        else:
+            text = _extract(file_bytes, path)
+    return text, time.perf_counter() - began, page_count
+
+
+def _extract_bytes_task(file_bytes, filename, timeout):
+    """Worker entry point for a file already in memory."""
+    began = time.perf_counter()
+    with _time_limit(timeout):
+        text = _extract(file_bytes, filename)
+    return text, time.perf_counter() - began
+
+
+def _record_failure(result, error):
+    result.error = result.error or f"{type(error).__name__}: {error}"
+    if isinstance(error, TimeoutError):
+        metrics.counter("extraction.timeouts").inc()
+
+
+class ExtractionResult:
+    __slots__ = ("path", "text", "seconds", "pages", "error")
+
+    def __init__(self, path, text="", seconds=0.0, pages=None, error=None):
+        self.path = path
+        self.text = text
+        self.seconds = seconds  # Worker time summed over all of the file's tasks
+        self.pages = pages
+        self.error = error
+
+    def __repr__(self):
+        return (f"ExtractionResult({self.path!r}, chars={len(self.text)}, "
+                f"seconds={self.seconds:.3f}, pages={self.pages}, error={self.error!r})")
+
+
+class _PendingFile:
+    def __init__(self, path):
+        self.result = ExtractionResult(path)
+        self.parts = {}
+        self.outstanding = 0
+
+
+class ParallelExtractor:
+    """Extracts text from many files on a process pool.
+
+    Every file starts as one task. A PDF task covers its first ``pages_per_task`` pages
+    and reports the page count, and the remaining pages are fanned out as further page
+    ranges, so one long PDF can use several cores. Each task runs under a ``timeout``
+    enforced inside the worker, so a pathological file fails instead of stalling it.
+
+    Used as a context manager, the extractor keeps one process pool for all calls made
+    inside the block; otherwise every call starts its own.
+    """
+
+    def __init__(self, max_workers=None, timeout=60, pages_per_task=PAGES_PER_TASK):
+        self.max_workers = max_workers or os.cpu_count()
+        self.timeout = timeout
+        self.pages_per_task = pages_per_task
+        self._executor = None
+
+    def __enter__(self):
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._executor.shutdown()
+        self._executor = None
+
+    @contextlib.contextmanager
+    def _pool(self):
+        if self._executor is not None:
+            yield self._executor
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                yield pool
+
+    def extract(self, paths):
+        """Yield an ExtractionResult per path, in completion order."""
+        with self._pool() as pool:
+            tasks = {}
+
+            def submit(pending, start, end):
+                future = pool.submit(_extract_task, pending.result.path, start, end, self.timeout)
+                tasks[future] = (pending, start)
+                pending.outstanding += 1
+
+            for path in paths:
+                submit(_PendingFile(path), 0, self.pages_per_task)
+
+            while tasks:
+                done, _ = wait(tasks, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending, start = tasks.pop(future)
+                    pending.outstanding -= 1
+                    result = pending.result
+                    try:
+                        text, seconds, page_count = future.result()
+                    except Exception as e:
+                        _record_failure(result, e)
+                    else:
+                        result.seconds += seconds
+                        pending.parts[start] = text
+                        if start == 0 and page_count is not None:
+                            result.pages = page_count
+                            for chunk_start in range(self.pages_per_task, page_count, self.pages_per_task):
+                                submit(pending, chunk_start, chunk_start + self.pages_per_task)
+                    if pending.outstanding == 0:
+                        if result.error is None:
+                            result.text = "\n".join(part for _, part in sorted(pending.parts.items()) if part)
+                        else:
+                            metrics.counter("extraction.failures").inc()
+                        metrics.histogram("extraction.file_seconds").observe(result.seconds)
+                        yield result
+
+    def extract_all(self, paths):
+        """Results for ``paths`` in input order."""
+        paths = list(paths)
+        by_path = {result.path: result for result in self.extract(paths)}
+        return [by_path[path] for path in paths]
+
+    def extract_bytes(self, files):
+        """ExtractionResults for (name, bytes) pairs of files already in memory, in input order.
+
+        Each file is a single task under ``timeout``; PDFs are not split into page ranges,
+        since every range would have to ship the whole file to its worker.
+        """
+        with self._pool() as pool:
+            futures = [(name, pool.submit(_extract_bytes_task, data, name, self.timeout)) for name, data in files]
+            results = []
+            for name, future in futures:
+                result = ExtractionResult(name)
+                try:
+                    result.text, result.seconds = future.result()
+                except Exception as e:
+                    _record_failure(result, e)
+                    metrics.counter("extraction.failures").inc()
+                metrics.histogram("extraction.file_seconds").observe(result.seconds)
+                results.append(result)
+        return results
@@ -0,0 +1,103 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+import metrics
+
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HttpClient:
+    """Keep-alive HTTP sessions with bounded timeouts and exponential-backoff retries.
+
+    One ``requests.Session`` with a pooled adapter is shared by all threads, so
+    concurrent calls to the same host reuse up to ``pool_size`` connections. Connection
+    errors, timeouts and ``RETRY_STATUSES`` responses are retried up to ``retries``
+    times, waiting ``backoff * 2**attempt`` seconds with full jitter (capped at
+    ``max_backoff``, and at least a numeric ``Retry-After``). Every attempt's latency is
+    recorded in the ``http.<name>.seconds`` histogram, where ``name`` defaults to the
+    host, next to ``http.<name>.retries`` and ``http.<name>.failures`` counters.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=3, backoff=0.5, max_backoff=8.0, pool_size=16,
+                 max_workers=8, session=None, sleep=time.sleep):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_workers = max_workers
+        self._sleep = sleep
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, url, name=None, **kwargs):
+        """Send a request, retrying transient failures; returns the successful response.
+
+        Raises ``requests.RequestException`` (``HTTPError`` for a final error status)
+        once retries are exhausted.
+        """
+        name = name or urlsplit(url).hostname
+        kwargs.setdefault("timeout", self.timeout)
+        latency = metrics.histogram(f"http.{name}.seconds")
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            retry_after = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                latency.observe(time.perf_counter() - start)
+                if attempt == self.retries:
+                    metrics.counter(f"http.{name}.failures").inc()
+                    raise
+            else:
+                latency.observe(time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    if response.status_code >= 400:
+                        metrics.counter(f"http.{name}.failures").inc()
+                    response.raise_for_status()
+                    return response
+                retry_after = _retry_after_seconds(response)
+                response.close()
+            metrics.counter(f"http.{name}.retries").inc()
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            self._sleep(max(delay, min(retry_after or 0, self.max_backoff)))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def fan_out(self, fn, items, max_workers=None):
+        """Call ``fn(item)`` for every item concurrently; returns results in input order.
+
+        A call that raises yields its exception in place of a result, so one failed
+        query does not lose the others.
+        """
+        items = list(items)
+
+        def call(item):
+            try:
+                return fn(item)
+            except Exception as e:
+                return e
+
+        if len(items) <= 1:
+            return [call(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(max_workers or self.max_workers, len(items))) as pool:
+            return list(pool.map(call, items))
+
+    def close(self):
+        self.session.close()
+
+
+def _retry_after_seconds(response):
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None  # HTTP-date form, rare for API rate limits
@@ -0,0 +1,240 @@
+import math
+import faiss
+import numpy as np
+
+INDEX_MODES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+# Hand-picked logistic squash of cosine similarities into (0, 1), not fitted to labelled data
+RELEVANCE_MIDPOINT = 0.3
+RELEVANCE_STEEPNESS = 10.0
+BITMAP_SELECTOR_MIN_IDS = 4096  # Below this an IDSelectorBatch is cheaper to build than a bitmap
+
+
+class IndexConfig:
+    """Settings for the FAISS index behind a VectorStore.
+
+    ``mode`` is the index the store ends up with. Every store starts exact (flat) and is
+    promoted to ``mode`` once it holds ``promote_at`` vectors, which also gives IVF/PQ
+    enough data to train on.
+    """
+
+    def __init__(self, mode="flat", promote_at=50000, nlist=None, nprobe=16, hnsw_m=32,
+                 ef_construction=80, ef_search=64, pq_m=24, pq_nbits=8, max_train_points=64, refine_factor=8):
+        if mode not in INDEX_MODES:
+            raise ValueError(f"Unknown index mode {mode!r}, expected one of {INDEX_MODES}")
+        self.mode = mode
+        self.promote_at = promote_at
+        self.nlist = nlist  # None picks 4 * sqrt(n) at promotion time
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+        self.max_train_points = max_train_points  # Training sample size per IVF list
+        self.refine_factor = refine_factor  # ivf_pq fetches k * refine_factor hits to rescore exactly
+
+    def nlist_for(self, n):
+        if self.nlist:
+            return self.nlist
+        # 4 * sqrt(n) lists, but never fewer than ~39 training points per list
+        return int(min(65536, max(16, min(4 * math.sqrt(n), n / 39))))
+
+
+def build_index(config, dimension, n=0, metric=faiss.METRIC_L2, mode=None):
+    """Create an empty, untrained index for ``mode`` (default ``config.mode``) sized for about ``n`` vectors."""
+    mode = mode or config.mode
+    if mode == "flat":
+        return faiss.IndexFlat(dimension, metric)
+    if mode == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, config.hnsw_m, metric)
+        index.hnsw.efConstruction = config.ef_construction
+        return index
+    nlist = config.nlist_for(n)
+    if mode == "ivf_flat":
+        return faiss.index_factory(dimension, f"IVF{nlist},Flat", metric)
+    return faiss.index_factory(dimension, f"IVF{nlist},PQ{config.pq_m}x{config.pq_nbits}", metric)
+
+
+def train_index(index, vectors, config, seed=1234):
+    """Train IVF/PQ indexes on a random sample of ``vectors``; a no-op for flat and HNSW."""
+    if index.is_trained:
+        return
+    ivf = faiss.extract_index_ivf(index)
+    sample_size = min(len(vectors), ivf.nlist * config.max_train_points)
+    if sample_size < len(vectors):
+        rows = np.random.default_rng(seed).choice(len(vectors), sample_size, replace=False)
+        vectors = vectors[np.sort(rows)]
+    index.train(np.ascontiguousarray(vectors, dtype="float32"))
+
+
+def id_mapped(index):
+    """Address the rows of an empty index by caller-chosen ids.
+
+    IVF indexes store ids in their inverted lists, and get a hashtable direct map so
+    vectors can be reconstructed and removed by id. Other indexes are wrapped in an
+    IndexIDMap2.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+    return faiss.IndexIDMap2(index)
+
+
+def base_index(index):
+    """The index an IndexIDMap/IndexIDMap2 wraps, or ``index`` itself."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def _list_ids(ivf):
+    """The ids stored in the inverted lists of ``ivf``, list by list."""
+    invlists = ivf.invlists
+    ids = [faiss.rev_swig_ptr(invlists.get_ids(l), invlists.list_size(l)).copy()
+           for l in range(ivf.nlist) if invlists.list_size(l)]
+    return np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+
+
+def stored_ids(index):
+    """The id of every row of an ``id_mapped`` index: in row order for an ID map, list order for IVF."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.vector_to_array(index.id_map)
+    return _list_ids(faiss.downcast_index(faiss.extract_index_ivf(index)))
+
+
+def set_search_params(index, config):
+    """Apply query-time knobs (nprobe for IVF, efSearch for HNSW) to ``index``."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(config.nprobe, ivf.nlist)
+    hnsw = getattr(base_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = config.ef_search
+
+
+def index_mode(index):
+    """Return which of INDEX_MODES an existing index implements."""
+    index = base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is None:
+        return "flat"
+    return "ivf_pq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf_flat"
+
+
+def remove_ids(ivf, ids):
+    """Remove the vectors with the int64 ``ids`` from an ``id_mapped`` IVF index, in place.
+
+    The trained quantizers and the codes of every other vector are left untouched.
+    """
+    # A hashtable direct map removes ids one by one and only accepts an IDSelectorArray
+    return ivf.remove_ids(faiss.IDSelectorArray(len(ids), faiss.swig_ptr(ids)))
+
+
+def snapshot(index):
+    """Copies of the (ids, vectors) a flat or HNSW ``index`` holds, for ``rebuild``.
+
+    The vectors are exact for those; IVF/PQ indexes are compacted with ``remove_ids``
+    instead, since their stored codes are approximations that retraining would compound.
+    """
+    base = base_index(index)
+    return stored_ids(index), base.reconstruct_n(0, base.ntotal)
+
+
+def rebuild(ids, vectors, config, mode=None, dimension=None, metric=faiss.METRIC_L2):
+    """Build an ID-mapped ``mode`` index (default ``config.mode``) holding ``vectors`` under ``ids``.
+
+    Used to promote a flat index to ANN and to compact away removed rows of flat and HNSW
+    indexes; IVF/PQ indexes are trained on the vectors they will hold.
+    """
+    mode = mode or config.mode
+    index = build_index(config, dimension or vectors.shape[1], len(vectors), metric, mode)
+    train_index(index, vectors, config)
+    index = id_mapped(index)
+    if len(vectors):
+        index.add_with_ids(np.ascontiguousarray(vectors, dtype="float32"), np.ascontiguousarray(ids, dtype=np.int64))
+    set_search_params(index, config)
+    return index
+
+
+def id_selector(ids):
+    """An ID selector for the int64 array ``ids``, plus the objects it needs kept alive.
+
+    Large sets get a bitmap, which is built in one vectorized pass instead of hashing
+    every id into an IDSelectorBatch.
+    """
+    if len(ids) < BITMAP_SELECTOR_MIN_IDS:
+        return faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids)), None
+    bits = np.zeros(int(ids.max()) + 1, dtype=bool)
+    bits[ids] = True
+    bitmap = np.packbits(bits, bitorder="little")
+    return faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bitmap)), bitmap
+
+
+def search_parameters(index, config, ids, exclude=False):
+    """Per-query parameters restricting ``index.search`` to the int64 array ``ids``, or with
+    ``exclude=True`` to every id except those."""
+    batch, storage = id_selector(ids)
+    selector = faiss.IDSelectorNot(batch) if exclude else batch
+    mode = index_mode(index)
+    if mode in ("ivf_flat", "ivf_pq"):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=config.nprobe)
+    elif mode == "hnsw":
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=config.ef_search)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    params.selector_ref = (batch, selector, storage)  # Keep the selectors alive as long as the parameters
+    return params
+
+
+def exact_search(index, query, ids, k):
+    """Brute-force top-k over just the vectors ``ids``, reconstructed from ``index``.
+
+    Under ivf_pq the reconstructions are PQ approximations, so the scores are too.
+    """
+    vectors = index.reconstruct_batch(ids)
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        scores = vectors @ query[0]
+        order = np.argsort(-scores)[:k]
+    else:
+        scores = ((vectors - query[0]) ** 2).sum(axis=1)
+        order = np.argsort(scores)[:k]
+    return scores[order][None, :], ids[order][None, :]
+
+
+def rescore(vectors, queries, labels, k):
+    """Re-rank search ``labels`` (-1 for none) by exact inner product with ``queries`` and keep
+    the top ``k`` per query, as (similarities, labels).
+
+    ``vectors`` holds the exact vector of every label by row; an ivf_pq search returns
+    candidates ranked by approximate PQ distances, and this recovers both their order
+    and their scores.
+    """
+    scores = np.einsum("qkd,qd->qk", vectors[np.maximum(labels, 0)], queries)
+    scores[labels < 0] = -np.inf
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(labels, order, axis=1)
+
+
+def normalize(vectors):
+    """``vectors`` as a contiguous float32 matrix with unit-length rows, normalized in one batch."""
+    vectors = np.array(vectors, dtype="float32", order="C", ndmin=2)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def cosine_similarity(index, distances):
+    """Cosine similarities from ``index`` search distances over unit-length vectors."""
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        return distances
+    return 1 - distances / 2  # Squared L2 between unit vectors is 2 - 2cos
+
+
+def logistic_relevance(cosines, midpoint=RELEVANCE_MIDPOINT, steepness=RELEVANCE_STEEPNESS):
+    """Squash cosine similarities into (0, 1) with a logistic centred on ``midpoint``; a
+    monotonic display scale, not a probability of relevance."""
+    return 1 / (1 + np.exp(-steepness * (np.asarray(cosines, dtype="float64") - midpoint)))
@@ -0,0 +1,211 @@
+"""Bulk-load a resume corpus into the RAG index from a directory tree or a zip/tar archive.
+
+Files are read one at a time (archive members straight from the archive, never unpacked
+to disk), extracted on a process pool and embedded and appended in chunks, so memory is
+bounded by the chunk size rather than the corpus. The index is saved after at least
+``--checkpoint-every`` chunks, and once it has grown by ``--checkpoint-growth`` since the
+last save, so the total written stays linear in the corpus size even though every save
+rewrites the whole index. After each save the SHA-256 of each processed file is appended
+to a checkpoint file; a rerun after a crash skips those files and resumes from the last
+saved index.
+
+    python ingestion.py resumes.zip --index data/rag_index --chunk-size 64
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tarfile
+import time
+import zipfile
+import metrics
+from extraction import SUPPORTED_EXTENSIONS, ParallelExtractor
+
+DEFAULT_CHUNK_SIZE = 64
+DEFAULT_CHECKPOINT_EVERY = 8
+DEFAULT_CHECKPOINT_GROWTH = 0.25  # Saves write at most 1 + 1 / growth times the final index
+
+
+def iter_source(source):
+    """Yield (name, bytes) for every supported file in a directory, zip or tar archive."""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    with open(path, "rb") as f:
+                        yield os.path.relpath(path, source), f.read()
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    with archive.open(info) as f:
+                        yield info.filename, f.read()
+    elif tarfile.is_tarfile(source):
+        # Stream mode reads members sequentially, so compressed tarballs are never seeked
+        with tarfile.open(source, "r|*") as archive:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise ValueError(f"{source} is not a directory, zip or tar archive")
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Checkpoint:
+    """Append-only file of the SHA-256 digests of files already ingested."""
+
+    def __init__(self, path):
+        self.path = path
+        self.digests = set()
+        if path and os.path.exists(path):
+            with open(path, encoding="ascii") as f:
+                # A torn last line from a crash is simply not a valid digest
+                self.digests.update(line.strip() for line in f if len(line.strip()) == 64)
+
+    def __contains__(self, digest):
+        return digest in self.digests
+
+    def commit(self, digests):
+        self.digests.update(digests)
+        if not self.path or not digests:
+            return
+        with open(self.path, "a", encoding="ascii") as f:
+            f.write("".join(f"{digest}\n" for digest in digests))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class IngestionStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.files_seen = 0
+        self.files_skipped = 0  # In the checkpoint, or a repeat within this run
+        self.files_failed = 0  # No text, an extraction error or a timeout
+        self.documents_added = 0
+        self.bytes_read = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def __str__(self):
+        elapsed = max(self.elapsed, 1e-9)
+        return (f"{self.files_seen} files ({self.files_skipped} skipped, {self.files_failed} failed), "
+                f"{self.documents_added} added, {self.bytes_read / 1e6:.1f} MB in {elapsed:.1f}s "
+                f"({(self.files_seen - self.files_skipped) / elapsed:.1f} files/s)")
+
+
+def ingest(agent, source, index_path=None, checkpoint_path=None, chunk_size=DEFAULT_CHUNK_SIZE,
+           checkpoint_every=DEFAULT_CHECKPOINT_EVERY, workers=None, batch_size=None,
+           metadata=None, on_progress=None, timeout=60, checkpoint_growth=DEFAULT_CHECKPOINT_GROWTH):
+    """Add every resume under ``source`` to ``agent`` (a ResumeRAGAgent); returns IngestionStats.
+
+    Each document gets ``{"type": "resume", "source": <name>, "sha256": <digest>}`` merged
+    with ``metadata``. Without ``index_path`` nothing is saved and the checkpoint is only
+    kept in memory. Extracting any one file may take at most ``timeout`` seconds. The
+    index is saved once ``checkpoint_every`` chunks have been added since the last save
+    and the number of documents has grown by the fraction ``checkpoint_growth``.
+    """
+    checkpoint = Checkpoint(checkpoint_path if index_path else None)
+    stats = IngestionStats()
+    seen = set()
+    uncommitted = []
+    chunks_since_save = 0
+    saved_documents = len(agent.document_store)
+
+    def new_files():
+        for name, data in iter_source(source):
+            stats.files_seen += 1
+            digest = hashlib.sha256(data).hexdigest()
+            if digest in checkpoint or digest in seen:
+                stats.files_skipped += 1
+                continue
+            seen.add(digest)
+            stats.bytes_read += len(data)
+            yield name, digest, data
+
+    def commit():
+        nonlocal chunks_since_save, saved_documents
+        chunks_since_save, saved_documents = 0, len(agent.document_store)
+        if index_path:
+            agent.save(index_path)  # The index is durable before the checkpoint says so
+        checkpoint.commit(uncommitted)
+        uncommitted.clear()
+
+    with ParallelExtractor(max_workers=workers, timeout=timeout) as extractor:
+        for chunk in _chunks(new_files(), chunk_size):
+            names, digests, blobs = zip(*chunk)
+            texts, metadatas = [], []
+            for digest, result in zip(digests, extractor.extract_bytes(zip(names, blobs))):
+                if result.error or not result.text.strip():
+                    stats.files_failed += 1
+                    continue
+                texts.append(result.text)
+                metadatas.append({"type": "resume", **(metadata or {}), "source": result.path, "sha256": digest})
+            del chunk, blobs
+            if texts:
+                agent.add_many(texts, metadatas, batch_size=batch_size)
+            stats.documents_added += len(texts)
+            uncommitted.extend(digests)
+            metrics.counter("ingestion.files").inc(len(digests))
+            metrics.counter("ingestion.documents").inc(len(texts))
+            chunks_since_save += 1
+            if (chunks_since_save >= checkpoint_every
+                    and len(agent.document_store) >= saved_documents * (1 + checkpoint_growth)):
+                commit()
+            if on_progress:
+                on_progress(stats)
+    if uncommitted:
+        commit()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="a directory, .zip, .tar, .tar.gz or .tar.bz2")
+    parser.add_argument("--index", default=None, help="index directory (default: RAG_INDEX_PATH)")
+    parser.add_argument("--checkpoint", default=None,
+                        help="processed-file checkpoint (default: <index>.ingested)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="files per embed/add")
+    parser.add_argument("--checkpoint-every", type=int, default=DEFAULT_CHECKPOINT_EVERY,
+                        help="least chunks between index saves")
+    parser.add_argument("--checkpoint-growth", type=float, default=DEFAULT_CHECKPOINT_GROWTH,
+                        help="least growth of the index, as a fraction, between saves")
+    parser.add_argument("--workers", type=int, default=None, help="extraction processes")
+    parser.add_argument("--batch-size", type=int, default=None, help="embedding batch size")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds allowed to extract one file")
+    args = parser.parse_args(argv)
+
+    from config import RAG_INDEX_PATH
+    from ResumeRAGAgent import ResumeRAGAgent
+
+    index_path = args.index or RAG_INDEX_PATH
+    checkpoint_path = args.checkpoint or f"{os.path.abspath(index_path)}.ingested"
+    if os.path.exists(index_path):
+        agent = ResumeRAGAgent.load(index_path)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        agent = ResumeRAGAgent()
+    print(f"Index at {index_path} holds {len(agent.document_store)} documents", file=sys.stderr)
+
+    stats = ingest(agent, args.source, index_path, checkpoint_path, args.chunk_size,
+                   args.checkpoint_every, args.workers, args.batch_size,
+                   on_progress=lambda s: print(f"\r{s}", end="", file=sys.stderr, flush=True),
+                   timeout=args.timeout, checkpoint_growth=args.checkpoint_growth)
+    print(f"\rDone: {stats}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
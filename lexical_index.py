@@ -0,0 +1,279 @@
+import array
+import math
+import os
+import re
+import threading
+from collections import Counter
+import numpy as np
+
+K1 = 1.2
+B = 0.75
+# Keeps skill tokens such as c++, c#, node.js, ci/cd and scikit-learn whole
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./-][a-z0-9+#]+)*")
+
+RRF_K = 60  # Reciprocal-rank fusion constant from Cormack et al., 2009
+TERMS_FILE = "lexical.terms.txt"
+OFFSETS_FILE = "lexical.offsets.npy"
+POSTINGS_FILE = "lexical.postings.npy"
+FREQS_FILE = "lexical.freqs.npy"
+LENGTHS_FILE = "lexical.lengths.npy"
+DELETED_FILE = "lexical.deleted.npy"
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked id lists into {id: sum over lists of 1 / (k + rank)}."""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1 / (k + rank)
+    return fused
+
+
+class LexicalIndex:
+    """BM25 over an inverted index whose postings are compact integer arrays.
+
+    Documents get sequential ids, so they line up with the rows of the FAISS index they
+    are kept next to. Postings loaded from disk are memory-mapped CSR arrays (one offsets
+    array into shared doc-id and term-frequency arrays); postings of documents added since
+    live in per-term ``array.array`` tails. Removed documents keep their id, are skipped by
+    searches and have their postings dropped on the next save.
+    """
+
+    def __init__(self):
+        self._terms = {}  # term -> term id
+        self._base = None  # (offsets, doc ids, freqs) loaded from disk
+        self._base_terms = 0
+        self._tail_ids = {}  # term id -> array('I') of doc ids added since load
+        self._tail_freqs = {}  # term id -> array('H')
+        self._lengths = np.zeros(1024, dtype=np.uint32)
+        self._count = 0
+        self._total_length = 0
+        self._deleted = set()
+        self._deleted_ids = None  # Sorted array of _deleted, built on demand
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def remove(self, doc_ids):
+        """Stop returning the documents ``doc_ids``."""
+        with self._lock:
+            for doc_id in doc_ids:
+                doc_id = int(doc_id)
+                if 0 <= doc_id < self._count and doc_id not in self._deleted:
+                    self._deleted.add(doc_id)
+                    self._total_length -= int(self._lengths[doc_id])
+            self._deleted_ids = None
+
+    def add_many(self, texts):
+        """Index texts as the next document ids; returns those ids."""
+        with self._lock:
+            start = self._count
+            for doc_id, text in enumerate(texts, start=start):
+                counts = Counter(tokenize(text))
+                for term, freq in counts.items():
+                    term_id = self._terms.setdefault(term, len(self._terms))
+                    if term_id not in self._tail_ids:
+                        self._tail_ids[term_id] = array.array("I")
+                        self._tail_freqs[term_id] = array.array("H")
+                    self._tail_ids[term_id].append(doc_id)
+                    self._tail_freqs[term_id].append(min(freq, 65535))
+                if doc_id >= len(self._lengths):
+                    self._lengths = np.concatenate([self._lengths, np.zeros_like(self._lengths)])
+                length = sum(counts.values())
+                self._lengths[doc_id] = length
+                self._total_length += length
+                self._count = doc_id + 1
+            return list(range(start, self._count))
+
+    def _postings(self, term_id):
+        parts_ids, parts_freqs = [], []
+        if term_id < self._base_terms:
+            offsets, ids, freqs = self._base
+            parts_ids.append(ids[offsets[term_id]:offsets[term_id + 1]])
+            parts_freqs.append(freqs[offsets[term_id]:offsets[term_id + 1]])
+        if term_id in self._tail_ids:
+            parts_ids.append(np.array(self._tail_ids[term_id], dtype=np.uint32))
+            parts_freqs.append(np.array(self._tail_freqs[term_id], dtype=np.uint16))
+        if len(parts_ids) == 1:
+            return parts_ids[0], parts_freqs[0]
+        return np.concatenate(parts_ids), np.concatenate(parts_freqs)
+
+    def _document_frequency(self, term_id):
+        count = len(self._tail_ids.get(term_id, ()))
+        if term_id < self._base_terms:
+            offsets = self._base[0]
+            count += int(offsets[term_id + 1] - offsets[term_id])
+        return count
+
+    def stats(self, query, excluded=None):
+        """(document count, total length, {term: document frequency}) for the terms of ``query``.
+
+        Documents among the sorted ``excluded`` ids are left out of the count and length.
+        ``search`` takes these, summed over several indexes, to score one of them as part
+        of the combined corpus.
+        """
+        with self._lock:
+            n, total_length = self._count - len(self._deleted), self._total_length
+            if excluded is not None and len(excluded):
+                excluded = [doc_id for doc_id in excluded.tolist() if doc_id < self._count and doc_id not in self._deleted]
+                n -= len(excluded)
+                total_length -= int(self._lengths[excluded].sum())
+            frequencies = {term: self._document_frequency(self._terms[term])
+                           for term in set(tokenize(query)) if term in self._terms}
+            return n, total_length, frequencies
+
+    def search(self, query, k, allowed=None, excluded=None, stats=None):
+        """Top-k (doc ids, BM25 scores), best first, optionally only among sorted ``allowed`` ids.
+
+        Documents among the sorted ``excluded`` ids are skipped. ``stats`` replaces this
+        index's own corpus statistics (see ``stats``).
+        """
+        with self._lock:
+            terms = {term: self._terms[term] for term in tokenize(query) if term in self._terms}
+            if stats is None:
+                n, total_length, frequencies = self._count - len(self._deleted), self._total_length, None
+            else:
+                n, total_length, frequencies = stats
+            if not n or not terms:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            average_length = total_length / n
+            lengths = self._lengths[:self._count]
+            scores = np.zeros(self._count, dtype=np.float32)
+            matched = []
+            for term, term_id in terms.items():
+                ids, freqs = self._postings(term_id)
+                ids = ids.astype(np.intp)  # Fancy indexing with uint32 converts on every use
+                df = len(ids) if frequencies is None else frequencies[term]
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                freqs = freqs.astype(np.float32)
+                norm = K1 * (1 - B + B * lengths[ids] / average_length)
+                scores[ids] += idf * freqs * (K1 + 1) / (freqs + norm)
+                matched.append(ids)
+            if self._deleted and self._deleted_ids is None:
+                self._deleted_ids = np.array(sorted(self._deleted), dtype=np.intp)
+            deleted = self._deleted_ids if self._deleted else None
+
+        # Selecting from the postings instead of all n scores keeps rare-term queries cheap.
+        # A document occurs at most once per term, so k * terms slots hold the top k.
+        candidates = matched[0] if len(matched) == 1 else np.concatenate(matched)
+        if allowed is not None:
+            candidates = candidates[np.isin(candidates, allowed)]
+        if deleted is not None:
+            candidates = candidates[~np.isin(candidates, deleted)]
+        if excluded is not None and len(excluded):
+            candidates = candidates[~np.isin(candidates, excluded)]
+        limit = k * len(matched)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = np.unique(candidates)
+        order = np.argsort(-scores[candidates], kind="stable")[:k]
+        return candidates[order].astype(np.int64), scores[candidates[order]]
+
+    def save(self, directory):
+        with self._lock:
+            offsets, ids, freqs = [0], [], []
+            deleted = np.array(sorted(self._deleted), dtype=np.uint32)
+            for term_id in range(len(self._terms)):
+                term_ids, term_freqs = self._postings(term_id)
+                if len(deleted):
+                    live = ~np.isin(term_ids, deleted)
+                    term_ids, term_freqs = term_ids[live], term_freqs[live]
+                ids.append(term_ids)
+                freqs.append(term_freqs)
+                offsets.append(offsets[-1] + len(term_ids))
+            empty = [np.empty(0, dtype=np.uint32)]
+            np.save(os.path.join(directory, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+            np.save(os.path.join(directory, POSTINGS_FILE), np.concatenate(ids or empty).astype(np.uint32))
+            np.save(os.path.join(directory, FREQS_FILE), np.concatenate(freqs or empty).astype(np.uint16))
+            np.save(os.path.join(directory, LENGTHS_FILE), self._lengths[:self._count])
+            np.save(os.path.join(directory, DELETED_FILE), deleted)
+            with open(os.path.join(directory, TERMS_FILE), "w", encoding="utf-8") as f:
+                f.write("\n".join(sorted(self._terms, key=self._terms.get)))
+
+    @classmethod
+    def exists(cls, directory):
+        return os.path.exists(os.path.join(directory, TERMS_FILE))
+
+    @classmethod
+    def load(cls, directory):
+        index = cls()
+        with open(os.path.join(directory, TERMS_FILE), encoding="utf-8") as f:
+            terms = f.read().split("\n") if os.path.getsize(f.name) else []
+        index._terms = {term: term_id for term_id, term in enumerate(terms)}
+        index._base = tuple(np.load(os.path.join(directory, name), mmap_mode="r")
+                            for name in (OFFSETS_FILE, POSTINGS_FILE, FREQS_FILE))
+        index._base_terms = len(terms)
+        lengths = np.load(os.path.join(directory, LENGTHS_FILE))
+        index._count = len(lengths)
+        index._lengths = np.zeros(max(1024, 2 * len(lengths)), dtype=np.uint32)
+        index._lengths[:len(lengths)] = lengths
+        index._total_length = int(lengths.sum())
+        deleted_path = os.path.join(directory, DELETED_FILE)
+        if os.path.exists(deleted_path):
+            index._deleted = set(np.load(deleted_path).tolist())
+            index._total_length -= int(lengths[list(index._deleted)].sum())
+        return index
+
+
+class LexicalOverlay:
+    """A writable view of a LexicalIndex that is shared and never written, for one user session.
+
+    Documents added through the overlay go to a small LexicalIndex of its own, with ids
+    after the base's, and removed base documents are hidden from this overlay only. Both
+    indexes are scored with the statistics of the combined corpus, so their BM25 scores
+    compare and the two result lists merge into one ranking.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.offset = len(base)
+        self.own = LexicalIndex()
+        self._hidden = set()
+        self._hidden_ids = None  # Sorted array of _hidden, built on demand
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.offset + len(self.own)
+
+    def add_many(self, texts):
+        return [self.offset + doc_id for doc_id in self.own.add_many(texts)]
+
+    def remove(self, doc_ids):
+        own_ids = []
+        with self._lock:
+            for doc_id in doc_ids:
+                doc_id = int(doc_id)
+                if doc_id >= self.offset:
+                    own_ids.append(doc_id - self.offset)
+                elif doc_id >= 0:
+                    self._hidden.add(doc_id)
+                    self._hidden_ids = None
+        self.own.remove(own_ids)
+
+    def search(self, query, k, allowed=None):
+        """Top-k (doc ids, BM25 scores) over the base and the overlay; see LexicalIndex.search."""
+        with self._lock:
+            if self._hidden_ids is None:
+                self._hidden_ids = np.array(sorted(self._hidden), dtype=np.int64)
+            hidden = self._hidden_ids
+        base_n, base_length, base_frequencies = self.base.stats(query, hidden)
+        own_n, own_length, frequencies = self.own.stats(query)
+        for term, count in base_frequencies.items():
+            frequencies[term] = frequencies.get(term, 0) + count
+        stats = (base_n + own_n, base_length + own_length, frequencies)
+
+        base_allowed = own_allowed = None
+        if allowed is not None:
+            split = np.searchsorted(allowed, self.offset)
+            base_allowed, own_allowed = allowed[:split], allowed[split:] - self.offset
+        base_ids, base_scores = self.base.search(query, k, base_allowed, hidden, stats)
+        own_ids, own_scores = self.own.search(query, k, own_allowed, stats=stats)
+        ids = np.concatenate([base_ids, own_ids + self.offset])
+        scores = np.concatenate([base_scores, own_scores])
+        order = np.argsort(-scores, kind="stable")[:k]
+        return ids[order], scores[order]
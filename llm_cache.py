@@ -0,0 +1,15 @@
+import time
+from sqlite_cache import SqliteTTLCache, content_key
+
+
+def cache_key(model_name, prompt, params=None):
+    """Content address of one LLM call: a hash of the model, prompt and generation parameters."""
+    return content_key(model=model_name, prompt=prompt, params=params or {})
+
+
+class LLMCache(SqliteTTLCache):
+    """Gemini response cache: a SqliteTTLCache in the ``"llm"`` namespace, keyed by ``cache_key``."""
+
+    def __init__(self, path=":memory:", max_entries=10000, ttl_seconds=7 * 24 * 3600,
+                 name="llm_cache", clock=time.time):
+        super().__init__(path, "llm", max_entries, ttl_seconds, name, clock)
@@ -0,0 +1,243 @@
+import asyncio
+import random
+import threading
+import time
+import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions
+import metrics
+from llm_cache import cache_key
+from prompt_budget import count_tokens
+
+DEFAULT_MODEL_NAME = "gemini-1.5-flash"
+DEFAULT_OUTPUT_TOKENS = 1024  # Reserved against the tokens-per-minute limit until the real usage is known
+# TooManyRequests covers ResourceExhausted, the 429 Gemini returns for quota and rate limits
+RETRY_ERRORS = (api_exceptions.TooManyRequests, api_exceptions.ServiceUnavailable,
+                api_exceptions.InternalServerError, api_exceptions.DeadlineExceeded)
+
+
+class RateLimiter:
+    """Token buckets for requests per second and tokens per minute, used from one event loop.
+
+    ``acquire`` waits, in arrival order, until both buckets hold enough. Requests are
+    spaced evenly, so no one-second window sees more than ``qps`` rounded up; tokens
+    may burst up to a minute's worth. A limit of None is not enforced.
+    """
+
+    def __init__(self, qps=None, tokens_per_minute=None, clock=time.monotonic):
+        self.qps = qps
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._requests = 1
+        self._tokens = tokens_per_minute or 0
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        elapsed, self._updated = now - self._updated, now
+        if self.qps:
+            self._requests = min(1, self._requests + elapsed * self.qps)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _wait_seconds(self, tokens):
+        self._refill()
+        wait = 0.0
+        if self.qps:
+            wait = max(wait, (1 - self._requests) / self.qps)
+        if self.tokens_per_minute:
+            wait = max(wait, (min(tokens, self.tokens_per_minute) - self._tokens) * 60 / self.tokens_per_minute)
+        return wait
+
+    async def acquire(self, tokens=0):
+        """Wait for one request and ``tokens`` tokens; returns the seconds waited."""
+        start = self._clock()
+        async with self._lock:
+            while (wait := self._wait_seconds(tokens)) > 0:
+                await asyncio.sleep(wait)
+            if self.qps:
+                self._requests -= 1
+            if self.tokens_per_minute:
+                self._tokens -= min(tokens, self.tokens_per_minute)
+        return self._clock() - start
+
+    def settle(self, reserved, used):
+        """Correct a reservation made by ``acquire`` once the tokens actually used are known."""
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + reserved - used)
+
+
+class LLMClient:
+    """Single entry point for Gemini calls, rate limited, coalesced and memoized through an optional LLMCache.
+
+    ``model_factory`` builds the model object once from its name; it defaults to
+    ``genai.GenerativeModel`` and can be swapped for a local stub that implements
+    ``generate_content(contents, generation_config=None, stream=False)`` and, optionally,
+    ``generate_content_async``.
+
+    Upstream calls run on an event loop owned by the client: ``agenerate`` awaits them
+    from that loop's caller and ``generate`` blocks on them from any thread. Every call
+    waits for a slot of ``max_concurrency`` and for the ``qps`` and ``tokens_per_minute``
+    limits (see ``RateLimiter``). Identical in-flight requests (same model, prompt and
+    generation config) share one upstream call, counted in ``llm.coalesced``. 429s and
+    transient server errors are retried up to ``retries`` times with exponential backoff
+    and full jitter; latency is recorded in ``llm.seconds`` next to the ``llm.retries``
+    and ``llm.failures`` counters and the ``llm.rate_limit_wait_seconds`` histogram.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, cache=None, model_factory=None, qps=None,
+                 tokens_per_minute=None, max_concurrency=8, retries=3, backoff=1.0, max_backoff=30.0):
+        self.model_name = model_name
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limiter = RateLimiter(qps, tokens_per_minute)
+        self._model_factory = model_factory or genai.GenerativeModel
+        self._model = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = {}
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._model_factory(self.model_name)
+        return self._model
+
+    @property
+    def loop(self):
+        """The client's event loop, started in a daemon thread on first use."""
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="llm-client", daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def run(self, coroutine):
+        """Run ``coroutine`` on the client's loop and block until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def generate(self, prompt, use_cache=True, **generation_config):
+        """Return the response text for ``prompt``; failed calls are never cached."""
+        key = cache_key(self.model_name, prompt, generation_config)
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        return self.run(self._single_flight(key, prompt, generation_config))
+
+    async def agenerate(self, prompt, use_cache=True, **generation_config):
+        """Async ``generate``; must be awaited on ``loop`` (see ``run``) or, without ever
+        using the blocking methods, on a single loop of the caller's."""
+        key = cache_key(self.model_name, prompt, generation_config)
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        return await self._single_flight(key, prompt, generation_config)
+
+    async def agenerate_many(self, prompts, use_cache=True, **generation_config):
+        """Response texts for ``prompts`` in order, requested concurrently; a failed call
+        yields its exception in place of a text."""
+        return await asyncio.gather(*(self.agenerate(prompt, use_cache, **generation_config) for prompt in prompts),
+                                    return_exceptions=True)
+
+    def generate_many(self, prompts, use_cache=True, **generation_config):
+        return self.run(self.agenerate_many(prompts, use_cache, **generation_config))
+
+    async def _single_flight(self, key, prompt, generation_config):
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._generate(key, prompt, generation_config))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            metrics.counter("llm.coalesced").inc()
+        # A caller that gives up must not cancel the call others are waiting on
+        return await asyncio.shield(future)
+
+    async def _generate(self, key, prompt, generation_config):
+        reserved = count_tokens(prompt) + generation_config.get("max_output_tokens", DEFAULT_OUTPUT_TOKENS)
+        latency = metrics.histogram("llm.seconds")
+        for attempt in range(self.retries + 1):
+            async with self._semaphore:
+                metrics.histogram("llm.rate_limit_wait_seconds").observe(await self.limiter.acquire(reserved))
+                start = time.perf_counter()
+                response = text = None
+                try:
+                    response = await self._generate_content(prompt, generation_config)
+                    text = response.text  # Raises ValueError for a blocked response
+                except RETRY_ERRORS:
+                    if attempt == self.retries:
+                        metrics.counter("llm.failures").inc()
+                        raise
+                except Exception:
+                    metrics.counter("llm.failures").inc()
+                    raise
+                else:
+                    break
+                finally:
+                    # Every outcome, cancellation included, hands back what the reservation did not use
+                    latency.observe(time.perf_counter() - start)
+                    usage = getattr(response, "usage_metadata", None)
+                    used = getattr(usage, "total_token_count", None)
+                    self.limiter.settle(reserved, used or (reserved if text is not None else 0))
+            metrics.counter("llm.retries").inc()
+            await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+        if self.cache is not None:
+            self.cache.put(key, text)
+        return text
+
+    async def _generate_content(self, prompt, generation_config):
+        model = self.model
+        if hasattr(model, "generate_content_async"):
+            return await model.generate_content_async([prompt], generation_config=generation_config or None)
+        return await asyncio.to_thread(model.generate_content, [prompt], generation_config=generation_config or None)
+
+    def generate_stream(self, prompt, use_cache=True, **generation_config):
+        """Yield the response text in chunks as Gemini produces them.
+
+        The stream holds a concurrency slot and passes the rate limiter like any other
+        call, but is neither coalesced nor retried. Time to first token is recorded in
+        the ``llm.time_to_first_token_seconds`` histogram. A cached response is yielded
+        as a single chunk, and a fully streamed response is cached like ``generate`` would.
+        """
+        key = cache_key(self.model_name, prompt, generation_config)
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        reserved = count_tokens(prompt) + generation_config.get("max_output_tokens", DEFAULT_OUTPUT_TOKENS)
+        self.run(self._semaphore.acquire())
+        chunks = []
+        acquired = False
+        try:
+            metrics.histogram("llm.rate_limit_wait_seconds").observe(self.run(self.limiter.acquire(reserved)))
+            acquired = True
+            start = time.perf_counter()
+            response = self.model.generate_content([prompt], generation_config=generation_config or None,
+                                                   stream=True)
+            for chunk in response:
+                text = chunk.text
+                if not text:
+                    continue
+                if not chunks:
+                    metrics.histogram("llm.time_to_first_token_seconds").observe(time.perf_counter() - start)
+                chunks.append(text)
+                yield text
+            metrics.histogram("llm.stream_seconds").observe(time.perf_counter() - start)
+        finally:
+            if acquired:
+                used = count_tokens(prompt) + count_tokens("".join(chunks)) if chunks else 0
+                self.loop.call_soon_threadsafe(self.limiter.settle, reserved, used)
+            self.loop.call_soon_threadsafe(self._semaphore.release)
+        if self.cache is not None:
+            self.cache.put(key, "".join(chunks))
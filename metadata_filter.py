@@ -0,0 +1,130 @@
+import array
+import json
+import threading
+import numpy as np
+
+DEFAULT_FILTER_FIELDS = ("type", "job_title", "title", "quality")
+_EMPTY = np.empty(0, dtype=np.int64)
+_EMPTY.flags.writeable = False
+MAX_CACHED_MATCHES = 256
+
+
+class MetadataIndex:
+    """Postings lists from metadata values to document ids, used to pre-filter searches.
+
+    A ``where`` clause maps field names to a value, or to a list/tuple/set of accepted
+    values. Values within a field are OR-ed and fields are AND-ed together, e.g.
+    ``{"type": "resume", "quality": ["high", "medium"]}``.
+
+    Postings are int64 arrays kept in ascending id order (ids are handed out in that
+    order, so appends rarely need a sort). Removed ids are only noted, and dropped from a
+    postings list in one pass the next time it is read, so bulk deletes stay linear. The
+    ids matching a ``where`` clause are cached until the next add or remove, since every
+    retrieval asks for the same few filters.
+    """
+
+    def __init__(self, fields=DEFAULT_FILTER_FIELDS):
+        self.fields = tuple(fields)
+        self._postings = {field: {} for field in self.fields}  # field -> {value: array('q') of ids}
+        self._unsorted = set()  # (field, value) pairs whose postings got an id out of order
+        self._removed = {}  # (field, value) -> ids removed but still in its postings
+        self._matches = {}  # where key -> read-only array of matching ids
+        self._lock = threading.Lock()
+
+    def add(self, doc_id, metadata):
+        with self._lock:
+            for field in self.fields:
+                value = (metadata or {}).get(field)
+                if isinstance(value, (str, int, float, bool)):
+                    removed = self._removed.get((field, value))
+                    if removed and doc_id in removed:
+                        removed.discard(doc_id)  # Its old entry is still in the postings
+                        continue
+                    postings = self._postings[field].setdefault(value, array.array("q"))
+                    if postings and postings[-1] > doc_id:
+                        self._unsorted.add((field, value))
+                    postings.append(doc_id)
+            self._matches.clear()
+
+    def remove(self, doc_id, metadata):
+        """Undo ``add(doc_id, metadata)``."""
+        with self._lock:
+            for field in self.fields:
+                value = (metadata or {}).get(field)
+                if isinstance(value, (str, int, float, bool)) and value in self._postings[field]:
+                    self._removed.setdefault((field, value), set()).add(doc_id)
+            self._matches.clear()
+
+    def _sorted_postings(self, field, value):
+        """The postings of ``field`` = ``value`` as a sorted int64 array, after applying
+        pending removals and sorts to them."""
+        key = (field, value)
+        postings = self._postings[field].get(value)
+        if postings is None:
+            return _EMPTY
+        removed = self._removed.pop(key, None)
+        ids = np.frombuffer(postings, dtype=np.int64).copy()
+        if not removed and key not in self._unsorted:
+            return ids
+        if key in self._unsorted:
+            ids.sort()
+            self._unsorted.discard(key)
+        if removed:
+            ids = ids[~np.isin(ids, np.fromiter(removed, dtype=np.int64, count=len(removed)))]
+        if not len(ids):
+            del self._postings[field][value]
+            return _EMPTY
+        self._postings[field][value] = array.array("q", ids.tobytes())
+        return ids
+
+    def match(self, where):
+        """Return the sorted int64 ids of documents satisfying ``where`` (a read-only array)."""
+        for field in where:
+            if field not in self._postings:
+                raise ValueError(f"Metadata field {field!r} is not filterable; "
+                                 f"filterable fields are {self.fields}")
+        key = tuple((field, tuple(accepted) if isinstance(accepted, (list, tuple, set, frozenset)) else accepted)
+                    for field, accepted in where.items())
+        with self._lock:
+            matched = self._matches.get(key)
+            if matched is not None:
+                return matched
+            for field, accepted in where.items():
+                if not isinstance(accepted, (list, tuple, set, frozenset)):
+                    accepted = [accepted]
+                postings = [self._sorted_postings(field, value) for value in accepted]
+                if len(postings) == 1:
+                    ids = postings[0]
+                else:
+                    ids = np.unique(np.concatenate(postings)) if postings else _EMPTY
+                matched = ids if matched is None else np.intersect1d(matched, ids, assume_unique=True)
+                if not len(matched):
+                    break
+            matched = matched if matched is not None else _EMPTY
+            matched.flags.writeable = False
+            if len(self._matches) >= MAX_CACHED_MATCHES:
+                self._matches.clear()
+            self._matches[key] = matched
+            return matched
+
+    def save(self, path):
+        with self._lock:
+            for field, value in self._unsorted | set(self._removed):
+                self._sorted_postings(field, value)
+            postings = {field: [[value, ids.tolist()] for value, ids in values.items()]
+                        for field, values in self._postings.items()}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "fields": list(self.fields),
+                # JSON object keys must be strings, so postings are stored as [value, ids] pairs
+                "postings": postings,
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        metadata_index = cls(data["fields"])
+        for field, pairs in data["postings"].items():
+            metadata_index._postings[field] = {value: array.array("q", sorted(ids)) for value, ids in pairs}
+        return metadata_index
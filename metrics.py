@@ -0,0 +1,71 @@
+import threading
+import numpy as np
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Keeps the most recent observations and summarizes them as percentiles."""
+
+    def __init__(self, max_samples=10000):
+        self.count = 0
+        self.total = 0.0
+        self._samples = []
+        self._max_samples = max_samples
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self._samples.append(value)
+            if len(self._samples) > self._max_samples:
+                del self._samples[: len(self._samples) - self._max_samples]
+
+    def summary(self):
+        with self._lock:
+            samples = np.asarray(self._samples, dtype="float64")
+        if not len(samples):
+            return {"count": self.count, "sum": self.total}
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+        return {"count": self.count, "sum": self.total, "mean": float(samples.mean()),
+                "p50": float(p50), "p90": float(p90), "p99": float(p99), "max": float(samples.max())}
+
+
+class MetricsRegistry:
+    """Named counters and histograms shared by the agents in this process."""
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters.setdefault(name, Counter())
+
+    def histogram(self, name):
+        with self._lock:
+            return self._histograms.setdefault(name, Histogram())
+
+    def snapshot(self):
+        with self._lock:
+            counters, histograms = dict(self._counters), dict(self._histograms)
+        return {
+            "counters": {name: c.value for name, c in sorted(counters.items())},
+            "histograms": {name: h.summary() for name, h in sorted(histograms.items())},
+        }
+
+
+registry = MetricsRegistry()
+counter = registry.counter
+histogram = registry.histogram
+snapshot = registry.snapshot
@@ -0,0 +1,60 @@
+import contextlib
+import os
+import shutil
+
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode="wb"):
+    """Write to a temporary sibling file and rename it over ``path`` on success."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextlib.contextmanager
+def atomic_directory(path):
+    """Build a directory in a temporary sibling and swap it into place on success.
+
+    Readers see either the previous directory or the complete new one. If the process
+    dies between the two renames, ``resolve_directory`` falls back to the previous copy.
+    """
+    path = os.path.abspath(path)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    old_path = f"{path}.old"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        yield tmp_path
+        for root, dirs, files in os.walk(tmp_path, topdown=False):
+            for name in files + dirs:
+                _fsync_path(os.path.join(root, name))
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def resolve_directory(path):
+    """Return the directory to load from, recovering from an interrupted atomic_directory swap."""
+    path = os.path.abspath(path)
+    if not os.path.isdir(path) and os.path.isdir(f"{path}.old"):
+        return f"{path}.old"
+    return path
@@ -0,0 +1,102 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import metrics
+
+
+class PipelineResult:
+    """Stage outputs plus when each stage started and finished, relative to the run start."""
+
+    def __init__(self, results, timings, depends_on, wall_seconds):
+        self.results = results
+        self.timings = timings
+        self.wall_seconds = wall_seconds
+        self._depends_on = depends_on
+
+    def __getitem__(self, name):
+        return self.results[name]
+
+    def critical_path(self):
+        """Stages on the longest dependency chain, i.e. the ones worth making faster."""
+        if not self.timings:
+            return []
+        name = max(self.timings, key=lambda n: self.timings[n]["end"])
+        path = [name]
+        while self._depends_on[name]:
+            name = max(self._depends_on[name], key=lambda n: self.timings[n]["end"])
+            path.append(name)
+        return path[::-1]
+
+    def breakdown(self):
+        """One row per stage, in start order, for display."""
+        critical = set(self.critical_path())
+        rows = []
+        for name, timing in sorted(self.timings.items(), key=lambda item: item[1]["start"]):
+            rows.append({"stage": name, "start_s": round(timing["start"], 3),
+                         "end_s": round(timing["end"], 3), "seconds": round(timing["seconds"], 3),
+                         "critical": name in critical})
+        return rows
+
+
+class Pipeline:
+    """Runs a DAG of stages on a thread pool, starting each one as soon as its inputs exist.
+
+    Each stage function is called with the results of its dependencies as keyword
+    arguments named after those stages. Stages are meant for I/O-bound work such as
+    LLM calls; anything touching Streamlit should stay on the caller's thread.
+    """
+
+    def __init__(self, name="pipeline", max_workers=4):
+        self.name = name
+        self.max_workers = max_workers
+        self._stages = {}
+
+    def add(self, name, func, depends_on=()):
+        if name in self._stages:
+            raise ValueError(f"Stage {name!r} already exists")
+        missing = [dep for dep in depends_on if dep not in self._stages]
+        if missing:
+            raise ValueError(f"Stage {name!r} depends on unknown stages {missing}")
+        self._stages[name] = (func, tuple(depends_on))
+        return self
+
+    def _run_stage(self, name, func, kwargs, run_start):
+        start = time.perf_counter()
+        result = func(**kwargs)
+        end = time.perf_counter()
+        metrics.histogram(f"{self.name}.{name}.seconds").observe(end - start)
+        return result, {"start": start - run_start, "end": end - run_start, "seconds": end - start}
+
+    def start(self):
+        """Run the pipeline on a background thread; returns a Future of the PipelineResult."""
+        runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{self.name}-runner")
+        future = runner.submit(self.run)
+        runner.shutdown(wait=False)
+        return future
+
+    def run(self):
+        results, timings = {}, {}
+        remaining = dict(self._stages)
+        run_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name) as pool:
+            pending = {}
+
+            def submit_ready():
+                for name, (func, depends_on) in list(remaining.items()):
+                    if all(dep in results for dep in depends_on):
+                        del remaining[name]
+                        kwargs = {dep: results[dep] for dep in depends_on}
+                        future = pool.submit(self._run_stage, name, func, kwargs, run_start)
+                        pending[future] = name
+
+            submit_ready()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    results[name], timings[name] = future.result()
+                submit_ready()
+
+        wall_seconds = time.perf_counter() - run_start
+        metrics.histogram(f"{self.name}.wall_seconds").observe(wall_seconds)
+        depends_on = {name: deps for name, (_, deps) in self._stages.items()}
+        return PipelineResult(results, timings, depends_on, wall_seconds)
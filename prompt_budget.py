@@ -0,0 +1,152 @@
+import difflib
+import json
+import re
+import textwrap
+import numpy as np
+import metrics
+
+DEFAULT_TOKEN_BUDGET = 2500
+MIN_SECTION_TOKENS = 128  # A trimmable section is never cut below this, however full the prompt is
+_TOKEN = re.compile(r"\w+|[^\w\s]|\s{2,}")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[A-Z0-9])|\s*\n\s*")
+_EMPTY = (None, "", [], {})
+
+
+def count_tokens(text):
+    """Estimated LLM tokens in ``text``: one per punctuation mark, per run of whitespace longer than
+    a space, and per four characters of a word.
+
+    Errs slightly high for English, so a prompt built to a budget stays within it
+    without a count_tokens round trip to the API.
+    """
+    return sum(1 if token[0].isspace() else (len(token) + 3) // 4 for token in _TOKEN.findall(text or ""))
+
+
+def _pruned(value):
+    if isinstance(value, dict):
+        value = {key: _pruned(item) for key, item in value.items()}
+        return {key: item for key, item in value.items() if item not in _EMPTY}
+    if isinstance(value, (list, tuple)):
+        return [item for item in map(_pruned, value) if item not in _EMPTY]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def compact_json(value):
+    """JSON without indentation, spaces after separators, or empty fields."""
+    return json.dumps(_pruned(value), ensure_ascii=False, separators=(",", ":"))
+
+
+def split_sentences(text):
+    """Sentences and lines of ``text``, stripped; bullet lists split one item per entry."""
+    return [sentence.strip() for sentence in _SENTENCE_BREAK.split(text or "") if sentence.strip()]
+
+
+def _normalized(sentence):
+    return " ".join(sentence.split()).casefold()
+
+
+def changed_lines(before, after):
+    """Lines of ``before`` removed and lines of ``after`` added, as "- " / "+ " prefixed lines.
+
+    Sent alongside ``after``, it describes ``before`` without repeating the lines both
+    versions share.
+    """
+    old = [line.strip() for line in before.splitlines() if line.strip()]
+    new = [line.strip() for line in after.splitlines() if line.strip()]
+    lines = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if tag != "equal":
+            lines.extend(["- " + line for line in old[i1:i2]] + ["+ " + line for line in new[j1:j2]])
+    return "\n".join(lines)
+
+
+def relevant_sentences(text, query, max_tokens, embedder=None, count=count_tokens):
+    """The sentences of ``text`` most similar to ``query`` that fit in ``max_tokens``, in text order.
+
+    Similarity is the cosine between ``embedder.embed`` vectors, which are unit length.
+    Without an embedder or a query, sentences are kept from the start. Text that already
+    fits is returned unchanged.
+    """
+    sentences = split_sentences(text)
+    sizes = [count(sentence) for sentence in sentences]
+    if sum(sizes) <= max_tokens:
+        return text
+    if embedder is None or not query:
+        order = range(len(sentences))
+    else:
+        vectors = embedder.embed([query] + sentences)
+        order = np.argsort(-(vectors[1:] @ vectors[0]), kind="stable")
+    keep, left = [], max_tokens
+    for i in order:
+        if sizes[i] <= left:
+            keep.append(i)
+            left -= sizes[i]
+    return "\n".join(sentences[i] for i in sorted(keep))
+
+
+class PromptBuilder:
+    """Assembles a prompt from fixed text and sections trimmed to a token budget.
+
+    Text added with ``add`` and sections without a ``query`` are always kept whole.
+    Sections with a ``query`` are trimmable: their sentences that already appear
+    elsewhere in the prompt are dropped, and if the prompt is still over ``budget`` the
+    tokens left are shared between them, smallest first so short sections stay whole,
+    each keeping its sentences most relevant to its query (see ``relevant_sentences``).
+    Built prompts are recorded in the ``prompt.<name>.tokens`` histogram, next to the
+    ``prompt.<name>.trimmed_tokens`` counter of tokens removed.
+    """
+
+    def __init__(self, name, budget=DEFAULT_TOKEN_BUDGET, embedder=None, count=count_tokens):
+        self.name = name
+        self.budget = budget
+        self.embedder = embedder
+        self.count = count
+        self._parts = []  # [heading, body, query, max_tokens]
+
+    def add(self, text):
+        """Fixed text, such as instructions; indentation common to its lines is removed."""
+        self._parts.append([None, textwrap.dedent(text).strip(), None, None])
+        return self
+
+    def section(self, heading, body, query=None, max_tokens=None):
+        """A headed block of context, trimmable when ``query`` is given; empty bodies are skipped."""
+        body = (body or "").strip()
+        if body:
+            self._parts.append([heading, body, query, max_tokens])
+        return self
+
+    def build(self):
+        parts = [list(part) for part in self._parts]
+        trimmable = [part for part in parts if part[2]]
+        original = self.count(self._render(parts))
+
+        seen = {_normalized(sentence) for part in parts if not part[2] for sentence in split_sentences(part[1])}
+        for part in trimmable:
+            sentences = split_sentences(part[1])
+            unique = [sentence for sentence in sentences if _normalized(sentence) not in seen]
+            seen.update(map(_normalized, unique))
+            if len(unique) < len(sentences):
+                part[1] = "\n".join(unique)
+
+        left = self.budget - self.count(self._render([part for part in parts if not part[2]]))
+        left -= sum(self.count(f"{part[0]}:") for part in trimmable)
+        wanted = sorted(((min(self.count(part[1]), part[3] or float("inf")), part) for part in trimmable),
+                        key=lambda item: item[0])
+        for i, (need, part) in enumerate(wanted):
+            allotted = max(min(need, left // (len(wanted) - i)), min(need, MIN_SECTION_TOKENS))
+            if self.count(part[1]) > allotted:
+                part[1] = relevant_sentences(part[1], part[2], allotted, self.embedder, self.count)
+            left -= self.count(part[1])
+
+        prompt = self._render(parts)
+        tokens = self.count(prompt)
+        metrics.histogram(f"prompt.{self.name}.tokens").observe(tokens)
+        metrics.counter(f"prompt.{self.name}.trimmed_tokens").inc(max(original - tokens, 0))
+        return prompt
+
+    @staticmethod
+    def _render(parts):
+        return "\n\n".join(body if heading is None else f"{heading}:\n{body}"
+                           for heading, body, _, _ in parts if body)
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import metrics
+
+
+def content_key(**fields):
+    """Content address of a cached value: a hash of the JSON-serializable ``fields``."""
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SqliteTTLCache:
+    """SQLite-backed text cache with LRU and TTL eviction.
+
+    Entries live under ``namespace``, so caches of different things can share a database
+    file without their keys or ``max_entries`` limits mixing. Pass ``":memory:"`` as the
+    path for a process-local cache. Hits, misses and evictions are reported through the
+    metrics registry under ``<name>.*``, by default ``<namespace>_cache.*``.
+    """
+
+    def __init__(self, path=":memory:", namespace="default", max_entries=10000, ttl_seconds=7 * 24 * 3600,
+                 name=None, clock=time.time):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (namespace, accessed)")
+        name = name or f"{namespace}_cache"
+        self.hits = metrics.counter(f"{name}.hits")
+        self.misses = metrics.counter(f"{name}.misses")
+        self.evictions = metrics.counter(f"{name}.evictions")
+        self.expirations = metrics.counter(f"{name}.expirations")
+
+    def get(self, key):
+        """Return the cached text for ``key`` or None, refreshing its LRU position on a hit."""
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM entries WHERE namespace = ? AND key = ?",
+                                     (self.namespace, key)).fetchone()
+            if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self.expirations.inc()
+                row = None
+            if row is None:
+                self.misses.inc()
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?",
+                               (now, self.namespace, key))
+        self.hits.inc()
+        return row[0]
+
+    def put(self, key, value):
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, value, now, now),
+            )
+            overflow = len(self) - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE namespace = ? AND key IN "
+                    "(SELECT key FROM entries WHERE namespace = ? ORDER BY accessed LIMIT ?)",
+                    (self.namespace, self.namespace, overflow))
+                self.evictions.inc(overflow)
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM entries WHERE namespace = ?",
+                                  (self.namespace,)).fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+
+    def stats(self):
+        lookups = self.hits.value + self.misses.value
+        return {
+            "entries": len(self),
+            "hits": self.hits.value,
+            "misses": self.misses.value,
+            "evictions": self.evictions.value,
+            "expirations": self.expirations.value,
+            "hit_rate": self.hits.value / lookups if lookups else 0.0,
+        }
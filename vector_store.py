@@ -0,0 +1,731 @@
+import os
+import threading
+import faiss
+import numpy as np
+from dedup import DEFAULT_NEAR_DUPLICATE_COSINE, Deduplicator, content_hash
+from document_store import ColumnarDocuments
+from index_factory import (IndexConfig, build_index, cosine_similarity, exact_search, id_mapped, index_mode,
+                           normalize, rebuild, remove_ids, rescore, search_parameters, set_search_params,
+                           snapshot, stored_ids)
+from metadata_filter import DEFAULT_FILTER_FIELDS, MetadataIndex
+from persistence import atomic_directory, resolve_directory
+
+INDEX_FILE = "index.faiss"
+METADATA_INDEX_FILE = "metadata_index.json"
+CONTENT_HASHES_FILE = "content_hashes.npy"
+VECTOR_DOCUMENTS_FILE = "vector_documents.npy"
+EXACT_VECTORS_FILE = "exact_vectors.npy"
+DEFAULT_COMPACT_FRACTION = 0.2
+
+
+def _with_room(array, size, fill):
+    """``array``, or a copy twice as large padded with ``fill``, so that it holds ``size`` rows."""
+    if size <= len(array):
+        return array
+    grown = np.full((max(size, 2 * len(array), 1024),) + array.shape[1:], fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class VectorStore:
+    """A FAISS index together with the documents its vectors belong to.
+
+    Documents keep the id they were added under. Index rows carry vector ids, held in the
+    inverted lists of IVF indexes and through an IndexIDMap2 otherwise, and each vector
+    id maps to a document id, so a document can be removed or replaced without
+    renumbering anything: its old vector becomes a tombstone that searches skip through
+    an ID selector. Once tombstones make up ``compact_fraction``
+    of the index, a background thread compacts it. IVF indexes drop the tombstones in
+    place, keeping their trained quantizers and the codes of every other vector; flat
+    and HNSW indexes are rebuilt from their exact vectors. Searches and updates take a
+    lock around index access while a rebuild happens outside it, so queries keep running
+    and see either the old or the new index, never a mix.
+
+    Vectors are L2-normalized in batches on the way in, for documents and queries alike,
+    and stored in an inner-product index, so search scores are cosine similarities in
+    [-1, 1] where higher is better. An ivf_pq index only holds PQ approximations of them,
+    so the store also keeps the exact vectors, saved next to the index and memory-mapped
+    with it, and reranks ``refine_factor`` times as many hits as asked for against those.
+    """
+
+    def __init__(self, embedder, dimension=None, index_config=None, filter_fields=DEFAULT_FILTER_FIELDS,
+                 near_duplicate_cosine=DEFAULT_NEAR_DUPLICATE_COSINE, deduplicate=True,
+                 compact_fraction=DEFAULT_COMPACT_FRACTION, metric=faiss.METRIC_INNER_PRODUCT):
+        self.embedder = embedder
+        self.dimension = dimension or embedder.dimension
+        self.index_config = index_config or IndexConfig()
+        self.metric = metric
+        self.index = id_mapped(build_index(IndexConfig("flat"), self.dimension, metric=metric))
+        self.documents = ColumnarDocuments(filter_fields)
+        self.metadata_index = MetadataIndex(filter_fields)
+        self.dedup = Deduplicator(near_duplicate_cosine) if deduplicate else None
+        self.compact_fraction = compact_fraction  # None disables background compaction
+        self.read_only = False
+        self._doc_ids = np.empty(0, dtype=np.int64)  # Vector id -> document id, -1 once tombstoned
+        self._vector_ids = np.empty(0, dtype=np.int64)  # Document id -> vector id, -1 once removed
+        self._vector_count = 0
+        self._vectors = None  # Vector id -> exact vector, kept while the index is ivf_pq
+        self._tombstones = set()  # Vector ids still in the index whose document is gone or replaced
+        self._tombstone_ids = None  # Sorted array of _tombstones, built on demand
+        self._lock = threading.Lock()  # Guards the index, the id maps and the metadata postings
+        self._write_lock = threading.RLock()  # One writer at a time
+        self._rebuild_lock = threading.Lock()
+        self._compactor = None
+
+    def __len__(self):
+        """Number of document ids handed out, including removed documents."""
+        return len(self.documents)
+
+    def __contains__(self, doc_id):
+        """Whether ``doc_id`` is a document that has not been removed."""
+        return 0 <= doc_id < len(self.documents) and self._vector_ids[doc_id] >= 0
+
+    def add(self, text, metadata=None):
+        """Add a single document; returns its id or None for empty text."""
+        return self.add_many([text], [metadata])[0]
+
+    def add_many(self, texts, metadatas=None, batch_size=None, embeddings=None):
+        """Embed texts in batches and append them with a single index add.
+
+        Returns one document id per input text, None where the text was empty. A text
+        that duplicates a stored document of the same type, exactly or nearly (see
+        Deduplicator), is not added again and gets the existing document's id.
+        ``embeddings`` are the texts' normalized vectors, one row per text, when the caller
+        already has them.
+        """
+        texts = list(texts)
+        metadatas = [metadata or {} for metadata in metadatas] if metadatas is not None else [{}] * len(texts)
+        if len(metadatas) != len(texts):
+            raise ValueError("texts and metadatas must have the same length")
+
+        with self._write_lock:
+            self._check_writable()
+            if self.dedup is None:
+                return self._append(texts, metadatas, batch_size, embeddings)
+
+            ids = [None] * len(texts)
+            same_as = {}  # Input position -> earlier input position with identical content
+            first_with = {}
+            keep, digests = [], []
+            for i, text in enumerate(texts):
+                if not text:
+                    continue
+                digest = content_hash(text, metadatas[i].get("type"))
+                if self.dedup.get(digest) is not None:
+                    ids[i] = self.dedup.get(digest)
+                elif digest in first_with:
+                    same_as[i] = first_with[digest]
+                else:
+                    first_with[digest] = i
+                    keep.append(i)
+                    digests.append(digest)
+                    continue
+                self.dedup.count_skipped()
+            if not keep:
+                return ids
+
+            if embeddings is None:
+                embeddings = self._embed([texts[i] for i in keep], batch_size)
+            else:
+                embeddings = np.ascontiguousarray(embeddings[keep], dtype="float32")
+            kinds = [metadatas[i].get("type") for i in keep]
+            matches = self.dedup.near_duplicates(self._nearest, embeddings, kinds,
+                                                 lambda doc_id: self.documents[doc_id]["metadata"].get("type"))
+            new_rows = [row for row, match in enumerate(matches) if match is None]
+            with self._lock:
+                new_ids = self._insert(np.ascontiguousarray(embeddings[new_rows]),
+                                       [texts[keep[row]] for row in new_rows],
+                                       [metadatas[keep[row]] for row in new_rows])
+            for row, doc_id in zip(new_rows, new_ids):
+                self.dedup.add(digests[row])
+                ids[keep[row]] = doc_id
+            for row, match in enumerate(matches):
+                if match is not None:
+                    ids[keep[row]] = match if match >= 0 else ids[keep[-1 - match]]
+                    self.dedup.count_merged()
+            for i, first in same_as.items():
+                ids[i] = ids[first]
+            self._maybe_promote()
+            return ids
+
+    def _append(self, texts, metadatas, batch_size, embeddings=None):
+        ids = [None] * len(texts)
+        keep = [i for i, text in enumerate(texts) if text]
+        if not keep:
+            return ids
+        if embeddings is None:
+            embeddings = self._embed([texts[i] for i in keep], batch_size)
+        else:
+            embeddings = np.ascontiguousarray(embeddings[keep], dtype="float32")
+        with self._lock:
+            new_ids = self._insert(embeddings, [texts[i] for i in keep], [metadatas[i] for i in keep])
+        for i, doc_id in zip(keep, new_ids):
+            ids[i] = doc_id
+        self._maybe_promote()
+        return ids
+
+    def _embed(self, texts, batch_size=None):
+        return normalize(self.embedder.embed(texts, batch_size=batch_size))
+
+    def embed_query(self, query_text):
+        """The normalized query vector ``search_ids`` and ``similarities`` also accept in place of text."""
+        return self._embed([query_text])
+
+    def _insert(self, embeddings, texts, metadatas):
+        """Store new documents and their vectors; the caller holds both locks."""
+        doc_ids = [self.documents.add(text, metadata) for text, metadata in zip(texts, metadatas)]
+        for doc_id, metadata in zip(doc_ids, metadatas):
+            self.metadata_index.add(doc_id, metadata)
+        self._add_vectors(embeddings, doc_ids)
+        return doc_ids
+
+    def _add_vectors(self, embeddings, doc_ids):
+        vector_ids = np.arange(self._vector_count, self._vector_count + len(doc_ids), dtype=np.int64)
+        self.index.add_with_ids(embeddings, vector_ids)
+        self._vector_count += len(doc_ids)
+        self._doc_ids = _with_room(self._doc_ids, self._vector_count, -1)
+        self._doc_ids[vector_ids] = doc_ids
+        if self._vectors is not None:
+            self._vectors = _with_room(self._vectors, self._vector_count, 0)
+            self._vectors[vector_ids] = embeddings
+        self._vector_ids = _with_room(self._vector_ids, len(self.documents), -1)
+        self._vector_ids[doc_ids] = vector_ids
+
+    def _retire(self, doc_id):
+        """Tombstone the vector of ``doc_id`` and drop its metadata postings; the caller holds both locks."""
+        vector_id = int(self._vector_ids[doc_id])
+        if vector_id < 0:
+            return
+        self.metadata_index.remove(doc_id, self.documents[doc_id].metadata)
+        self._doc_ids[vector_id] = -1
+        self._vector_ids[doc_id] = -1
+        self._tombstones.add(vector_id)
+        self._tombstone_ids = None
+
+    def remove(self, doc_id):
+        """Remove a document; returns False if there is no such document.
+
+        Its id is not reused. The vector stays in the index as a tombstone until the next
+        compaction.
+        """
+        with self._write_lock:
+            self._check_writable()
+            if doc_id not in self:
+                return False
+            with self._lock:
+                self._retire(doc_id)
+                self.documents.replace(doc_id, "", {})
+            if self.dedup is not None:
+                self.dedup.replace(doc_id)
+            self._maybe_compact()
+            return True
+
+    def upsert(self, doc_id, text, metadata=None):
+        """Replace the text and metadata of document ``doc_id``, restoring it if it was removed.
+
+        The id must have been returned by ``add``/``add_many``; new documents are added
+        with those. Returns ``doc_id``.
+        """
+        if not text:
+            raise ValueError("upsert needs a non-empty text; use remove to delete a document")
+        metadata = dict(metadata or {})
+        with self._write_lock:
+            self._check_writable()
+            if not 0 <= doc_id < len(self.documents):
+                raise KeyError(doc_id)
+            embedding = self._embed([text])
+            with self._lock:
+                self._retire(doc_id)
+                self.documents.replace(doc_id, text, metadata)
+                self.metadata_index.add(doc_id, metadata)
+                self._add_vectors(embedding, [doc_id])
+            if self.dedup is not None:
+                self.dedup.replace(doc_id, content_hash(text, metadata.get("type")))
+            self._maybe_promote()
+            self._maybe_compact()
+            return doc_id
+
+    def _check_writable(self):
+        if self.read_only:
+            raise ValueError("This vector store was memory-mapped read-only")
+
+    @property
+    def index_mode(self):
+        return index_mode(self.index)
+
+    @property
+    def fragmentation(self):
+        """Fraction of index rows that are tombstones."""
+        return len(self._tombstones) / self.index.ntotal if self.index.ntotal else 0.0
+
+    def _maybe_promote(self):
+        """Switch from exact search to the configured ANN index once the corpus is big enough."""
+        config = self.index_config
+        if (config.mode != "flat" and self.index_mode == "flat"
+                and self.index.ntotal - len(self._tombstones) >= config.promote_at):
+            self._rebuild(config.mode)
+
+    def _maybe_compact(self):
+        if (self.compact_fraction is None or self.fragmentation < self.compact_fraction
+                or (self._compactor is not None and self._compactor.is_alive())):
+            return
+        self._compactor = threading.Thread(target=self.compact, name="vector-store-compaction", daemon=True)
+        self._compactor.start()
+
+    def compact(self):
+        """Drop tombstones from the index; returns False if a compaction is already running."""
+        self._check_writable()
+        if self.index_mode in ("ivf_flat", "ivf_pq"):
+            return self._remove_tombstones()
+        return self._rebuild(self.index_mode)
+
+    def _remove_tombstones(self):
+        """Remove tombstones from an IVF index in place.
+
+        Rebuilding would retrain on vectors reconstructed from PQ codes, compounding the
+        quantization error with every compaction. Removal costs a hashtable lookup per
+        tombstone, so it runs under the lock.
+        """
+        if not self._rebuild_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._lock:
+                if self._tombstones:
+                    remove_ids(self.index, np.array(sorted(self._tombstones), dtype=np.int64))
+                self._tombstones = set()
+                self._tombstone_ids = None
+            return True
+        finally:
+            self._rebuild_lock.release()
+
+    def _rebuild(self, mode):
+        """Rebuild a flat or HNSW index as ``mode`` from its live vectors, without blocking searches or writers.
+
+        Vectors added while the new index is built are copied over before it is swapped
+        in; vectors tombstoned meanwhile stay tombstones in it.
+        """
+        if not self._rebuild_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._lock:
+                ids, vectors = snapshot(self.index)
+                watermark = self._vector_count
+            live = self._doc_ids[ids] >= 0
+            index = rebuild(ids[live], vectors[live], self.index_config, mode, self.dimension, self.metric)
+            with self._lock:
+                current = stored_ids(self.index)
+                added = current[current >= watermark]
+                added_vectors = self.index.reconstruct_batch(added) if len(added) else None
+                if len(added):
+                    index.add_with_ids(added_vectors, added)
+                if mode == "ivf_pq":
+                    # The flat or HNSW index held exact vectors; the PQ codes will not
+                    exact = np.zeros((self._vector_count, self.dimension), dtype="float32")
+                    exact[ids] = vectors
+                    if len(added):
+                        exact[added] = added_vectors
+                    self._vectors = exact
+                else:
+                    self._vectors = None
+                self.index = index
+                labels = stored_ids(index)
+                self._tombstones = set(labels[self._doc_ids[labels] < 0].tolist())
+                self._tombstone_ids = None
+            return True
+        finally:
+            self._rebuild_lock.release()
+
+    def _search(self, queries, k, vector_ids=None, excluded=None):
+        """(cosine similarities, document ids) of the k nearest live vectors, optionally among
+        ``vector_ids`` and skipping the sorted vector ids ``excluded`` along with the tombstones.
+
+        Missing results have document id -1. The caller holds ``self._lock``.
+        """
+        if vector_ids is None:
+            if self._tombstone_ids is None:
+                self._tombstone_ids = np.array(sorted(self._tombstones), dtype=np.int64)
+            skipped = self._tombstone_ids
+            if excluded is not None and len(excluded):
+                skipped = np.union1d(skipped, excluded)
+            available = self.index.ntotal - len(skipped)
+            params = (search_parameters(self.index, self.index_config, skipped, exclude=True)
+                      if len(skipped) and available > 0 else None)
+        else:
+            available = len(vector_ids)
+            params = search_parameters(self.index, self.index_config, vector_ids) if available > 0 else None
+        k = min(k, available)
+        if k <= 0:
+            return np.empty((len(queries), 0), dtype=np.float32), np.empty((len(queries), 0), dtype=np.int64)
+
+        # PQ distances misorder close neighbours, so ivf_pq over-fetches candidates to rescore
+        fetch = min(k * self.index_config.refine_factor, available) if self._vectors is not None else k
+        distances, labels = self.index.search(queries, fetch, params=params)
+        if vector_ids is not None and len(queries) == 1 and (labels[0] >= 0).sum() < k:
+            # Approximate indexes can miss selective filters; the matching subset is small then
+            if self._vectors is not None:
+                labels = vector_ids[None, :]
+            else:
+                distances, labels = exact_search(self.index, queries, vector_ids, k)
+        if self._vectors is not None:
+            cosines, labels = rescore(self._vectors, queries, labels, k)
+        else:
+            cosines = cosine_similarity(self.index, distances)
+        return cosines, np.where(labels >= 0, self._doc_ids[np.maximum(labels, 0)], -1)
+
+    def _excluded_vectors(self, doc_ids):
+        """Sorted vector ids of the live documents among ``doc_ids``; the caller holds ``self._lock``."""
+        if doc_ids is None or not len(doc_ids):
+            return None
+        vector_ids = self._vector_ids[np.asarray(doc_ids, dtype=np.int64)]
+        return np.unique(vector_ids[vector_ids >= 0])
+
+    def _nearest(self, embeddings, k, exclude=None):
+        """(cosine similarities, document ids) of the k nearest documents, for the Deduplicator."""
+        with self._lock:
+            return self._search(embeddings, k, excluded=self._excluded_vectors(exclude))
+
+    def search(self, query_text, top_k=3, where=None, min_score=None):
+        """Return (document, cosine similarity) pairs for the top_k most similar documents.
+
+        ``where`` restricts the search to documents whose metadata matches (see
+        MetadataIndex). The filter is applied inside FAISS through an ID selector, so up
+        to top_k matching documents come back without over-fetching. Documents less
+        similar than ``min_score`` are left out. Scores are exact cosines in every index
+        mode: under ivf_pq the hits are rescored against their exact vectors.
+        """
+        return [(self.documents[idx], score) for idx, score in self.search_ids(query_text, top_k, where, min_score)]
+
+    def search_ids(self, query, top_k=3, where=None, min_score=None, exclude=None):
+        """Like ``search`` but returns (document id, cosine similarity) pairs.
+
+        ``query`` is a text or a vector from ``embed_query``. Documents whose ids are in
+        ``exclude`` are skipped inside FAISS, like tombstones.
+        """
+        if self.index.ntotal == 0:
+            return []
+        query_embedding = self.embed_query(query) if isinstance(query, str) else query
+        with self._lock:
+            vector_ids = None
+            excluded = self._excluded_vectors(exclude)
+            if where:
+                vector_ids = self._vector_ids[self.metadata_index.match(where)]
+                vector_ids = vector_ids[vector_ids >= 0]
+                if excluded is not None:
+                    vector_ids = vector_ids[~np.isin(vector_ids, excluded)]
+                vector_ids, excluded = np.ascontiguousarray(vector_ids), None
+            scores, doc_ids = self._search(query_embedding, top_k, vector_ids, excluded)
+        return [(int(doc_id), float(score)) for doc_id, score in zip(doc_ids[0], scores[0])
+                if doc_id >= 0 and (min_score is None or score >= min_score)]
+
+    def match(self, where):
+        """Sorted int64 ids of the documents whose metadata satisfies ``where`` (see MetadataIndex)."""
+        return self.metadata_index.match(where)
+
+    def similarities(self, query, doc_ids):
+        """Cosine similarity of ``query`` (a text or ``embed_query`` vector) to each of ``doc_ids``.
+
+        Scores documents another retriever found, such as BM25 hits; removed documents get NaN.
+        Vectors are reconstructed from the index, or under ivf_pq read from the exact
+        vectors, so the scores are exact either way.
+        """
+        query_embedding = self.embed_query(query) if isinstance(query, str) else query
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        scores = np.full(len(doc_ids), np.nan, dtype="float32")
+        with self._lock:
+            vector_ids = self._vector_ids[doc_ids]
+            live = np.flatnonzero(vector_ids >= 0)
+            if not len(live):
+                return scores
+            if self._vectors is not None:
+                vectors = self._vectors[vector_ids[live]]
+            else:
+                vectors = self.index.reconstruct_batch(vector_ids[live])
+        scores[live] = vectors @ query_embedding[0]
+        return scores
+
+    def save(self, path):
+        """Atomically write the index, document sidecar and metadata postings to ``path``."""
+        with atomic_directory(path) as tmp_path:
+            self.write_to(tmp_path)
+
+    def write_to(self, directory):
+        """Write the store's files into an existing directory, without the atomic swap of ``save``."""
+        with self._write_lock:
+            with self._lock:
+                index = self.index  # A compaction may swap in another index while this one is written
+            faiss.write_index(index, os.path.join(directory, INDEX_FILE))
+            np.save(os.path.join(directory, VECTOR_DOCUMENTS_FILE), self._doc_ids[:self._vector_count])
+            if self._vectors is not None:
+                np.save(os.path.join(directory, EXACT_VECTORS_FILE), self._vectors[:self._vector_count])
+            self.documents.save(directory, dimension=self.dimension)
+            self.metadata_index.save(os.path.join(directory, METADATA_INDEX_FILE))
+            if self.dedup is not None:
+                self.dedup.save(os.path.join(directory, CONTENT_HASHES_FILE))
+
+    @classmethod
+    def load(cls, path, embedder, mmap=False, index_config=None, **kwargs):
+        """Open a store written by ``save``.
+
+        Documents are always memory-mapped and decoded lazily. With ``mmap=True`` the
+        FAISS index is memory-mapped too, which makes the store read-only.
+        """
+        path = resolve_directory(path)
+        # IO_FLAG_MMAP_IFC (faiss >= 1.8) maps flat codes too; older releases only map IVF lists
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) if mmap else 0
+        index = faiss.read_index(os.path.join(path, INDEX_FILE), flags)
+        filter_fields = kwargs.get("filter_fields", DEFAULT_FILTER_FIELDS)
+        documents = ColumnarDocuments.load(path)
+        doc_ids = np.load(os.path.join(path, VECTOR_DOCUMENTS_FILE))
+        if documents.header.get("dimension") != index.d or doc_ids.max(initial=-1) >= len(documents):
+            raise ValueError(f"Index and document store in {path} do not match")
+
+        store = cls(embedder, index.d, index_config, **kwargs)
+        set_search_params(index, store.index_config)
+        store.index = index
+        store.documents = documents
+        store._doc_ids = doc_ids
+        store._vector_count = len(doc_ids)
+        store._vector_ids = np.full(len(documents), -1, dtype=np.int64)
+        live = np.flatnonzero(doc_ids >= 0)
+        store._vector_ids[doc_ids[live]] = live
+        labels = stored_ids(index)
+        store._tombstones = set(labels[doc_ids[labels] < 0].tolist())
+        if index_mode(index) == "ivf_pq":
+            exact_vectors_path = os.path.join(path, EXACT_VECTORS_FILE)
+            if not os.path.exists(exact_vectors_path):
+                raise ValueError(f"No exact vectors for the ivf_pq index in {path}")
+            store._vectors = np.load(exact_vectors_path, mmap_mode="r" if mmap else None)
+
+        store.metadata_index = MetadataIndex.load(os.path.join(path, METADATA_INDEX_FILE))
+        if store.metadata_index.fields != tuple(filter_fields):  # Saved filtering on other fields
+            store.metadata_index = MetadataIndex(filter_fields)
+            for doc_id, doc in enumerate(documents):
+                if doc_id in store:
+                    store.metadata_index.add(doc_id, doc["metadata"])
+        if store.dedup is not None:
+            content_hashes_path = os.path.join(path, CONTENT_HASHES_FILE)
+            if not os.path.exists(content_hashes_path):
+                raise ValueError(f"No content hashes for the deduplicating store in {path}")
+            store.dedup = Deduplicator.load(content_hashes_path,
+                                            near_duplicate_cosine=store.dedup.near_duplicate_cosine)
+            if len(store.dedup) != len(documents):
+                raise ValueError(f"Content hashes and document store in {path} do not match")
+        store.read_only = mmap
+        if not mmap:
+            store._maybe_promote()
+        return store
+
+
+class _OverlayDocuments:
+    """The documents of a VectorStoreOverlay, addressed by overlay ids."""
+
+    def __init__(self, overlay):
+        self._overlay = overlay
+
+    def __len__(self):
+        return len(self._overlay)
+
+    def __getitem__(self, doc_id):
+        overlay = self._overlay
+        local = overlay._local_id(doc_id)
+        if local is not None:
+            return overlay.own.documents[local]
+        if 0 <= doc_id < overlay.offset:
+            return overlay.base.documents[doc_id]
+        return overlay.own.documents[doc_id - overlay.offset]  # The slot of a base document's new version
+
+    def __iter__(self):
+        for doc_id in range(len(self)):
+            yield self[doc_id]
+
+
+class VectorStoreOverlay:
+    """A writable view of a VectorStore that is shared and never written, such as one
+    memory-mapped read-only, for one user session.
+
+    The base is neither copied nor changed. Documents added through the overlay go to a
+    small VectorStore of its own and get ids after the base's. Removing or upserting a
+    base document hides it from this overlay only: its id joins a session-local list
+    that base searches skip through the same ID selector as tombstones, and an upserted
+    version lives in the overlay's store under the base id. Searches query both stores
+    and merge their hits by cosine similarity. New texts are deduplicated against the
+    base as well as the overlay's own documents.
+
+    The base must not grow while overlays of it are in use, since overlay ids start
+    where its ids end.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.offset = len(base)
+        self.own = VectorStore(base.embedder, base.dimension, base.index_config, base.metadata_index.fields,
+                               near_duplicate_cosine=base.dedup.near_duplicate_cosine if base.dedup else None,
+                               deduplicate=base.dedup is not None, compact_fraction=base.compact_fraction,
+                               metric=base.metric)
+        self.documents = _OverlayDocuments(self)
+        self.read_only = False
+        self._hidden = set()  # Base ids removed or replaced in this overlay
+        self._hidden_ids = None  # Sorted array of _hidden, built on demand
+        self._moved = {}  # Base id -> own id of its replacement
+        self._moved_from = {}  # Own id -> base id it replaces
+        self._lock = threading.Lock()  # Guards the hidden ids and the id maps
+        self._write_lock = threading.RLock()
+
+    def __len__(self):
+        return self.offset + len(self.own)
+
+    def __contains__(self, doc_id):
+        local = self._local_id(doc_id)
+        if local is not None:
+            return local in self.own
+        return 0 <= doc_id < self.offset and doc_id not in self._hidden and doc_id in self.base
+
+    @property
+    def dedup(self):
+        return self.own.dedup
+
+    def _local_id(self, doc_id):
+        """The own id behind overlay id ``doc_id``, or None for a base document."""
+        if doc_id >= self.offset:
+            local = doc_id - self.offset
+            return None if local in self._moved_from else local
+        return self._moved.get(doc_id)
+
+    def _overlay_id(self, local):
+        return self._moved_from.get(local, self.offset + local)
+
+    def _hidden_array(self):
+        with self._lock:
+            if self._hidden_ids is None:
+                self._hidden_ids = np.array(sorted(self._hidden), dtype=np.int64)
+            return self._hidden_ids
+
+    def _hide(self, doc_id, local=None):
+        with self._lock:
+            self._hidden.add(doc_id)
+            self._hidden_ids = None
+            if local is not None:
+                self._moved[doc_id] = local
+                self._moved_from[local] = doc_id
+
+    def embed_query(self, query_text):
+        return self.own.embed_query(query_text)
+
+    def add(self, text, metadata=None):
+        return self.add_many([text], [metadata])[0]
+
+    def add_many(self, texts, metadatas=None, batch_size=None):
+        """Add documents to the overlay; see VectorStore.add_many. Duplicates of visible base
+        documents get the base document's id."""
+        texts = list(texts)
+        metadatas = [metadata or {} for metadata in metadatas] if metadatas is not None else [{}] * len(texts)
+        if len(metadatas) != len(texts):
+            raise ValueError("texts and metadatas must have the same length")
+        base, own = self.base, self.own
+        with self._write_lock:
+            ids = [None] * len(texts)
+            if own.dedup is None:
+                rows = list(range(len(texts)))
+                embeddings = None
+            else:
+                keep = []
+                for i, text in enumerate(texts):
+                    if not text:
+                        continue
+                    match = base.dedup.get(content_hash(text, metadatas[i].get("type")))
+                    if match is not None and match in self:
+                        ids[i] = match
+                        own.dedup.count_skipped()
+                    else:
+                        keep.append(i)
+                if not keep:
+                    return ids
+                embeddings = own._embed([texts[i] for i in keep], batch_size)
+                hidden = self._hidden_array()
+                matches = base.dedup.near_duplicates(
+                    lambda vectors, k: base._nearest(vectors, k, hidden), embeddings,
+                    [metadatas[i].get("type") for i in keep],
+                    lambda doc_id: base.documents[doc_id]["metadata"].get("type"))
+                rows = []
+                for row, match in enumerate(matches):
+                    if match is not None and match >= 0:  # Matches within the batch are left to own
+                        ids[keep[row]] = match
+                        own.dedup.count_merged()
+                    else:
+                        rows.append(row)
+                embeddings = embeddings[rows]
+                rows = [keep[row] for row in rows]
+            local_ids = own.add_many([texts[i] for i in rows], [metadatas[i] for i in rows], batch_size, embeddings)
+            for i, local in zip(rows, local_ids):
+                ids[i] = None if local is None else self._overlay_id(local)
+            return ids
+
+    def remove(self, doc_id):
+        """Remove a document from this overlay; returns False if there is no such document."""
+        with self._write_lock:
+            local = self._local_id(doc_id)
+            if local is not None:
+                return self.own.remove(local)
+            if doc_id not in self:
+                return False
+            self._hide(doc_id)
+            return True
+
+    def upsert(self, doc_id, text, metadata=None):
+        """Replace document ``doc_id`` in this overlay; see VectorStore.upsert."""
+        if not text:
+            raise ValueError("upsert needs a non-empty text; use remove to delete a document")
+        with self._write_lock:
+            local = self._local_id(doc_id)
+            if local is not None:
+                self.own.upsert(local, text, metadata)
+                return doc_id
+            if not 0 <= doc_id < self.offset:
+                raise KeyError(doc_id)
+            metadata = dict(metadata or {})
+            with self.own._write_lock:
+                # Not deduplicated: the new version must keep its own row under doc_id
+                local = self.own._append([text], [metadata], None)[0]
+                if self.own.dedup is not None:
+                    self.own.dedup.add(content_hash(text, metadata.get("type")))
+            self._hide(doc_id, local)
+            return doc_id
+
+    def search(self, query_text, top_k=3, where=None, min_score=None):
+        return [(self.documents[idx], score) for idx, score in self.search_ids(query_text, top_k, where, min_score)]
+
+    def search_ids(self, query, top_k=3, where=None, min_score=None):
+        """(document id, cosine similarity) pairs of the top_k hits of the base and the overlay together."""
+        query_embedding = self.embed_query(query) if isinstance(query, str) else query
+        hits = self.base.search_ids(query_embedding, top_k, where, min_score, exclude=self._hidden_array())
+        hits += [(self._overlay_id(local), score)
+                 for local, score in self.own.search_ids(query_embedding, top_k, where, min_score)]
+        return sorted(hits, key=lambda hit: -hit[1])[:top_k]
+
+    def match(self, where):
+        """Sorted int64 ids of the visible documents whose metadata satisfies ``where``."""
+        base_ids = self.base.match(where)
+        hidden = self._hidden_array()
+        if len(hidden):
+            base_ids = base_ids[~np.isin(base_ids, hidden)]
+        own_ids = np.array([self._overlay_id(local) for local in self.own.match(where).tolist()], dtype=np.int64)
+        return np.union1d(base_ids, own_ids)
+
+    def similarities(self, query, doc_ids):
+        """Cosine similarity of ``query`` to each of ``doc_ids``; see VectorStore.similarities."""
+        query_embedding = self.embed_query(query) if isinstance(query, str) else query
+        doc_ids = [int(doc_id) for doc_id in doc_ids]
+        scores = np.full(len(doc_ids), np.nan, dtype="float32")
+        own_rows, own_ids, base_rows = [], [], []
+        for row, doc_id in enumerate(doc_ids):
+            local = self._local_id(doc_id)
+            if local is not None:
+                own_rows.append(row)
+                own_ids.append(local)
+            elif doc_id in self:
+                base_rows.append(row)
+        if own_rows:
+            scores[own_rows] = self.own.similarities(query_embedding, own_ids)
+        if base_rows:
+            scores[base_rows] = self.base.similarities(query_embedding, [doc_ids[row] for row in base_rows])
+        return scores